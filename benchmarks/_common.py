@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable
+
+from ev_agent import __version__
+
+
+def timeit(fn: Callable[[], Any], *, repeat: int = 5, number: int = 1) -> dict[str, float]:
+    """Run `fn` `number` times per sample, `repeat` samples; report per-call seconds."""
+    samples: list[float] = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - t0) / number)
+    return {
+        "min_s": min(samples),
+        "median_s": statistics.median(samples),
+        "mean_s": statistics.fmean(samples),
+        "repeat": repeat,
+        "number": number,
+    }
+
+
+def make_parser(prog: str, description: str) -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog=prog, description=description)
+    p.add_argument("--repeat", type=int, default=5, help="samples per case")
+    p.add_argument("--json-out", type=Path, default=None, help="also write results to this file")
+    return p
+
+
+def emit(name: str, results: dict[str, Any], json_out: Path | None = None) -> dict[str, Any]:
+    """Print results as JSON (and optionally write them) so versions can be compared."""
+    payload = {
+        "benchmark": name,
+        "ts": datetime.utcnow().isoformat(),
+        "ev_agent_version": __version__,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "results": results,
+    }
+    text = json.dumps(payload, ensure_ascii=False, indent=2)
+    print(text)
+    if json_out is not None:
+        json_out.parent.mkdir(parents=True, exist_ok=True)
+        json_out.write_text(text + "\n", encoding="utf-8")
+    return payload
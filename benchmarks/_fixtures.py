@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import random
+import shutil
+from pathlib import Path
+
+from ev_agent.llm.base import ChatMessage
+from ev_agent.llm.fake_server import default_response
+
+# Reproducible inputs shared by the benchmarks: same seed + sizes -> byte-identical projects.
+
+_TEMPLATE = '''
+
+class Widget{i}:
+    """Generated fixture class {i}."""
+
+    def __init__(self, size={size}):
+        self.size = size
+        self.items = [n * {mul} for n in range(size)]
+
+    def total(self):
+        return sum(x for x in self.items if x % {mod})
+'''
+
+
+def make_project(n_files: int, file_kb: int, *, seed: int = 0) -> dict[str, str]:
+    """`n_files` valid Python modules of ~`file_kb` KiB each (plus main.py importing none of them)."""
+    rng = random.Random(seed)
+    target = file_kb * 1024
+    files: dict[str, str] = {"main.py": "def main():\n    print('ok')\n\n\nif __name__ == '__main__':\n    main()\n"}
+    for f in range(n_files):
+        parts = [f'"""Fixture module {f}."""\n']
+        size = len(parts[0])
+        i = 0
+        while size < target:
+            block = _TEMPLATE.format(i=i, size=rng.randint(1, 50), mul=rng.randint(2, 9), mod=rng.randint(2, 7))
+            parts.append(block)
+            size += len(block)
+            i += 1
+        files[f"pkg/mod_{f:03d}.py"] = "".join(parts)
+    return files
+
+
+def write_project(workdir: Path, files: dict[str, str], *, clean: bool = True) -> Path:
+    if clean and workdir.exists():
+        shutil.rmtree(workdir)
+    for rel, content in files.items():
+        p = workdir / rel
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_text(content, encoding="utf-8", newline="\n")
+    return workdir
+
+
+def clear_bytecode(workdir: Path) -> None:
+    for d in workdir.rglob("__pycache__"):
+        shutil.rmtree(d, ignore_errors=True)
+
+
+class InstantLLM:
+    """
+    Zero-latency client with the fake server's canned replies. Unlike MockLLM it is not
+    special-cased by the nodes, so the real prompt building and coder parsing paths run.
+    """
+
+    def chat(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> str:
+        return default_response(messages)
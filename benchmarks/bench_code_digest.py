@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import tempfile
+from pathlib import Path
+
+from benchmarks._common import emit, make_parser, timeit
+from benchmarks._fixtures import make_project, write_project
+from ev_agent.utils.code_digest import build_code_digest, format_code_digest
+
+SIZES = [(10, 8), (100, 8), (50, 128), (500, 8)]  # (files, KiB per file)
+
+
+def main() -> None:
+    parser = make_parser("bench_code_digest", "build_code_digest / format_code_digest throughput")
+    args = parser.parse_args()
+
+    tmp = Path(tempfile.mkdtemp(prefix="ev_bench_digest_"))
+    results: dict = {}
+    for n_files, file_kb in SIZES:
+        files = make_project(n_files, file_kb)
+        workdir = write_project(tmp / f"p_{n_files}x{file_kb}", files)
+        rel_paths = list(files)
+        total = sum(len(c.encode("utf-8")) for c in files.values())
+
+        build = timeit(lambda: build_code_digest(workdir, rel_paths), repeat=args.repeat)
+        build["mb_per_s"] = total / 1e6 / build["median_s"]
+        digests = build_code_digest(workdir, rel_paths)
+        fmt = timeit(lambda: format_code_digest(digests), repeat=args.repeat)
+        results[f"{n_files}x{file_kb}KiB"] = {
+            "files": len(files),
+            "bytes": total,
+            "digest_chars": len(format_code_digest(digests)),
+            "build": build,
+            "format": fmt,
+        }
+    emit("code_digest", results, args.json_out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import dataclasses
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from benchmarks._common import emit, make_parser
+from benchmarks._fixtures import InstantLLM
+from ev_agent.config import load_settings
+from ev_agent.llm.factory import build_backend
+from ev_agent.llm.fake_server import FakeServerConfig, start_fake_server
+from ev_agent.llm.limiter import limiter_metrics
+from ev_agent.llm.router import ModelRouter
+from ev_agent.runner import build_graph, execute_run
+
+
+def main() -> None:
+    parser = make_parser("bench_e2e", "end-to-end runs per minute under concurrency")
+    parser.add_argument("--concurrency", type=str, default="1,2,4,8")
+    parser.add_argument("--runs", type=int, default=16, help="runs per concurrency level")
+    parser.add_argument(
+        "--llm",
+        choices=("instant", "fake-server"),
+        default="fake-server",
+        help="instant: in-process zero latency; fake-server: real HTTP clients against the local fake server",
+    )
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--tokens-per-s", type=float, default=2000.0)
+    parser.add_argument("--fault-inject", action="store_true", help="force one QA failure + fix per run")
+    parser.add_argument("--log", action="store_true", help="also write run logs (snapshot cost included)")
+    args = parser.parse_args()
+
+    levels = [int(x) for x in args.concurrency.split(",") if x.strip()]
+    settings = load_settings()
+    server = None
+    if args.llm == "fake-server":
+        server = start_fake_server(
+            FakeServerConfig(latency_ms=args.latency_ms, latency_dist="fixed", tokens_per_s=args.tokens_per_s)
+        )
+        settings = dataclasses.replace(
+            settings, ollama_base_url=server.base_url, llm_max_inflight=max(levels) * 2, llm_rpm=0, llm_tpm=0
+        )
+        client = build_backend(settings, "ollama", "fake")
+    else:
+        client = InstantLLM()
+    router = ModelRouter.fixed(client, client)
+
+    tmp = Path(tempfile.mkdtemp(prefix="ev_bench_e2e_"))
+    results: dict = {"llm": args.llm, "runs": args.runs, "latency_ms": args.latency_ms}
+    for level in levels:
+
+        def one(i: int, level: int = level) -> bool:
+            workdir = tmp / f"c{level}" / f"run_{i}"
+            graph = build_graph(settings, router=router, workdir=workdir, fault_inject=args.fault_inject)
+            r = execute_run(
+                graph,
+                "Build a minimal snake game",
+                workdir=workdir,
+                log_dir=tmp / "logs" if args.log else None,
+                run_id=f"c{level}_{i}",
+            )
+            return not r.state.error_log
+
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=level) as pool:
+            passed = sum(pool.map(one, range(args.runs)))
+        wall = time.perf_counter() - t0
+        results[f"concurrency_{level}"] = {
+            "wall_s": wall,
+            "runs_per_min": args.runs / wall * 60,
+            "mean_run_s": wall * level / args.runs,
+            "qa_passed": passed,
+        }
+    if server is not None:
+        results["server"] = server.stats.as_dict()
+        results["limiter"] = limiter_metrics()
+        server.shutdown()
+    emit("e2e", results, args.json_out)
+
+
+if __name__ == "__main__":
+    main()
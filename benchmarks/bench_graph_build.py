@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import tempfile
+from pathlib import Path
+
+from benchmarks._common import emit, make_parser, timeit
+from ev_agent.chains.team_graph import build_team_graph, compile_team_graph, get_team_graph
+from ev_agent.llm.mock import MockLLM
+from ev_agent.llm.router import ModelRouter
+from ev_agent.schema import TeamState
+
+
+def main() -> None:
+    parser = make_parser("bench_graph_build", "team graph compile cost vs per-run binding and a mock run")
+    parser.add_argument("--runs", type=int, default=5, help="mock runs per sample for the end-to-end cases")
+    args = parser.parse_args()
+
+    router = ModelRouter.fixed(MockLLM(), MockLLM())
+    tmp = Path(tempfile.mkdtemp(prefix="ev_bench_graph_"))
+    get_team_graph()  # warm the process-wide cache outside the timings
+
+    def run(graph) -> None:
+        list(graph.stream(TeamState(user_goal="bench").model_dump(), stream_mode="values"))
+
+    def legacy_run(i: int) -> None:
+        # Pre-change behaviour: a freshly compiled graph per run.
+        graph = compile_team_graph().with_config(
+            build_team_graph(workdir=tmp / f"legacy_{i}", max_iters=3, router=router).config
+        )
+        run(graph)
+
+    def cached_run(i: int) -> None:
+        run(build_team_graph(workdir=tmp / f"cached_{i}", max_iters=3, router=router))
+
+    results: dict = {"runs": args.runs}
+    results["compile"] = timeit(compile_team_graph, repeat=args.repeat, number=10)
+    results["bind_cached"] = timeit(
+        lambda: build_team_graph(workdir=tmp, max_iters=3, router=router), repeat=args.repeat, number=100
+    )
+    results["mock_run_compile_each"] = timeit(
+        lambda: [legacy_run(i) for i in range(args.runs)], repeat=args.repeat
+    )
+    results["mock_run_cached_graph"] = timeit(
+        lambda: [cached_run(i) for i in range(args.runs)], repeat=args.repeat
+    )
+    for k in ("mock_run_compile_each", "mock_run_cached_graph"):
+        results[k]["per_run_s"] = results[k]["median_s"] / args.runs
+    emit("graph_build", results, args.json_out)
+
+
+if __name__ == "__main__":
+    main()
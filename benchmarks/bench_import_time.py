@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from benchmarks._common import emit, make_parser
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# (case name, python args) — each runs in a fresh interpreter.
+CASES: list[tuple[str, list[str]]] = [
+    ("import ev_agent.llm", ["-c", "import ev_agent.llm"]),
+    ("import ev_agent.config", ["-c", "import ev_agent.config"]),
+    ("import ev_agent.runner", ["-c", "import ev_agent.runner"]),
+    ("import ev_agent.service.job_queue", ["-c", "import ev_agent.service.job_queue"]),
+    ("ev_agent.run --help", ["-m", "ev_agent.run", "--help"]),
+]
+
+HEAVY = {"rich", "langgraph", "langchain_core", "pydantic", "httpx", "tenacity"}
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int, int]]:
+    """`-X importtime` lines -> [(module, self_us, cumulative_us, depth)]; depth 0 = top level."""
+    out = []
+    for line in stderr.splitlines():
+        m = _LINE_RE.match(line)
+        if m:
+            out.append((m.group(4), int(m.group(1)), int(m.group(2)), (len(m.group(3)) - 1) // 2))
+    return out
+
+
+def run_case(args: list[str], repeat: int, top: int) -> dict:
+    env = {**os.environ, "PYTHONPATH": str(ROOT) + os.pathsep + os.environ.get("PYTHONPATH", "")}
+    walls: list[float] = []
+    imports: list[tuple[str, int, int, int]] = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", *args],
+            capture_output=True,
+            text=True,
+            env=env,
+            cwd=ROOT,
+        )
+        walls.append(time.perf_counter() - t0)
+        imports = parse_importtime(proc.stderr)
+    top_level = [r for r in imports if r[3] == 0]
+    heaviest = sorted(top_level, key=lambda r: r[2], reverse=True)[:top]
+    return {
+        "wall_s_median": statistics.median(walls),
+        "wall_s_min": min(walls),
+        "import_us_total": sum(r[2] for r in top_level),
+        "heaviest_top_level": [{"module": r[0], "cumulative_us": r[2]} for r in heaviest],
+        "loaded_heavy": sorted({r[0] for r in imports} & HEAVY),
+    }
+
+
+def main() -> None:
+    parser = make_parser("bench_import_time", "startup cost of ev_agent entry points (-X importtime)")
+    parser.add_argument("--top", type=int, default=8, help="heaviest top-level imports to list")
+    args = parser.parse_args()
+
+    results = {name: run_case(case_args, args.repeat, args.top) for name, case_args in CASES}
+    emit("import_time", results, args.json_out)
+
+
+if __name__ == "__main__":
+    main()
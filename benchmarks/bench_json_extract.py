@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import json
+import re
+from pathlib import Path
+
+from benchmarks._common import emit, make_parser, timeit
+from ev_agent.utils.json_extract import extract_first_json_object
+
+
+def _legacy_extract(text: str) -> dict:
+    """Pre-single-pass implementation (rescans from every '{'), kept for comparison."""
+    fenced = re.search(r"```json\s*([\s\S]*?)\s*```", text, flags=re.IGNORECASE)
+    if fenced:
+        return json.loads(fenced.group(1).strip())
+    for i in [m.start() for m in re.finditer(r"\{", text)]:
+        depth, in_str, esc, frag = 0, False, False, None
+        for j in range(i, len(text)):
+            ch = text[j]
+            if in_str:
+                if esc:
+                    esc = False
+                elif ch == "\\":
+                    esc = True
+                elif ch == '"':
+                    in_str = False
+                continue
+            if ch == '"':
+                in_str = True
+            elif ch == "{":
+                depth += 1
+            elif ch == "}":
+                depth -= 1
+                if depth == 0:
+                    frag = text[i : j + 1]
+                    break
+        if frag is None:
+            continue
+        try:
+            return json.loads(frag)
+        except Exception:
+            continue
+    raise ValueError("no json")
+
+
+def _code_file(i: int, size: int) -> str:
+    block = (
+        f"def handler_{i}(event):\n"
+        "    data = {'k': [1, 2, {'nested': True}], 'fmt': f\"{event!r}\"}\n"
+        "    return {**data, 'ok': {}}\n\n"
+    )
+    return (block * (size // len(block) + 1))[:size]
+
+
+def synthetic_outputs(total_kb: int = 300) -> dict[str, str]:
+    """Coder-style responses dominated by braces inside code strings."""
+    n_files = 12
+    files = [{"path": f"mod_{i}.py", "content": _code_file(i, total_kb * 1024 // n_files)} for i in range(n_files)]
+    payload = json.dumps({"files": files, "notes": "ok"}, ensure_ascii=False)
+    return {
+        "clean_json": payload,
+        "prose_wrapped": "好的，下面是代码：\n" + payload + "\n以上。",
+        # Worst case for the legacy scanner: the first object is unparseable, so every '{'
+        # inside it triggers a rescan to the end of the text.
+        "broken_prefix": "{draft: " + payload[:-1] + "\n\nFinal answer:\n" + payload,
+    }
+
+
+def load_corpus(corpus: Path) -> dict[str, str]:
+    """Recorded raw model outputs: one response per *.txt file."""
+    return {p.name: p.read_text(encoding="utf-8", errors="replace") for p in sorted(corpus.glob("*.txt"))}
+
+
+def main() -> None:
+    parser = make_parser("bench_json_extract", "extract_first_json_object on large model outputs")
+    parser.add_argument("--corpus", type=Path, default=None, help="directory of recorded outputs (*.txt)")
+    parser.add_argument("--size-kb", type=int, default=300)
+    parser.add_argument("--legacy", action="store_true", help="also time the pre-single-pass scanner")
+    args = parser.parse_args()
+
+    cases = load_corpus(args.corpus) if args.corpus else synthetic_outputs(args.size_kb)
+    results: dict[str, dict] = {}
+    for name, text in cases.items():
+        row = {"chars": len(text), "current": timeit(lambda: extract_first_json_object(text), repeat=args.repeat)}
+        if args.legacy:
+            row["legacy"] = timeit(lambda: _legacy_extract(text), repeat=max(1, args.repeat // 2))
+        results[name] = row
+    emit("json_extract", results, args.json_out)
+
+
+if __name__ == "__main__":
+    main()
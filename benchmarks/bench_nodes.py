@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import tempfile
+from pathlib import Path
+
+from benchmarks._common import emit, make_parser, timeit
+from benchmarks._fixtures import InstantLLM
+from ev_agent.agents.nodes import architect_node, coder_node, pm_node, qa_node, reviewer_node
+from ev_agent.chains.team_graph import build_team_graph
+from ev_agent.llm.router import ModelRouter
+from ev_agent.schema import TeamState
+
+
+def main() -> None:
+    parser = make_parser("bench_nodes", "per-node and whole-graph overhead with a zero-latency LLM")
+    args = parser.parse_args()
+
+    llm = InstantLLM()
+    tmp = Path(tempfile.mkdtemp(prefix="ev_bench_nodes_"))
+    workdir = tmp / "game"
+
+    # Each node is timed on a fresh copy of the state it would normally receive.
+    base = TeamState(user_goal="Build a minimal snake game")
+    after_pm = pm_node(base.model_copy(deep=True), llm)
+    after_arch = architect_node(after_pm.model_copy(deep=True), llm)
+    after_coder = coder_node(after_arch.model_copy(deep=True), llm, workdir=workdir)
+    after_qa = qa_node(after_coder.model_copy(deep=True), workdir=workdir)
+
+    cases = {
+        "pm": lambda: pm_node(base.model_copy(deep=True), llm),
+        "architect": lambda: architect_node(after_pm.model_copy(deep=True), llm),
+        "coder": lambda: coder_node(after_arch.model_copy(deep=True), llm, workdir=workdir),
+        "qa": lambda: qa_node(after_coder.model_copy(deep=True), workdir=workdir),
+        "reviewer": lambda: reviewer_node(after_qa.model_copy(deep=True), llm, workdir=workdir),
+    }
+    results: dict = {name: timeit(fn, repeat=args.repeat, number=5) for name, fn in cases.items()}
+
+    router = ModelRouter.fixed(llm, llm)
+    counter = iter(range(1_000_000))
+
+    def full_run() -> None:
+        graph = build_team_graph(workdir=tmp / f"run_{next(counter)}", max_iters=3, router=router)
+        list(graph.stream(TeamState(user_goal="bench").model_dump(), stream_mode="values"))
+
+    t = timeit(full_run, repeat=args.repeat)
+    node_sum = sum(results[n]["median_s"] for n in cases)
+    t["graph_overhead_s"] = max(t["median_s"] - node_sum, 0.0)
+    results["full_graph"] = t
+    emit("nodes", results, args.json_out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import tempfile
+from pathlib import Path
+
+from benchmarks._common import emit, make_parser, timeit
+from benchmarks._fixtures import clear_bytecode, make_project, write_project
+from ev_agent.agents.nodes import qa_node
+from ev_agent.schema import TeamState
+from ev_agent.utils.qa_cache import QACache
+
+SIZES = [(1, 4), (10, 8), (50, 8), (200, 8), (50, 64)]  # (files, KiB per file)
+
+
+def main() -> None:
+    parser = make_parser("bench_qa", "qa_node latency across project sizes (cold vs warm bytecode vs QA cache hit)")
+    parser.add_argument("--sizes", type=str, default=None, help="e.g. 10x8,50x64 (files x KiB)")
+    args = parser.parse_args()
+
+    sizes = (
+        [tuple(int(x) for x in s.split("x")) for s in args.sizes.split(",")] if args.sizes else SIZES
+    )
+    tmp = Path(tempfile.mkdtemp(prefix="ev_bench_qa_"))
+    results: dict = {}
+    cache = QACache(tmp / "qa_cache.db")
+    for n_files, file_kb in sizes:
+        files = make_project(n_files, file_kb)
+        workdir = write_project(tmp / f"p_{n_files}x{file_kb}", files)
+        state = TeamState(user_goal="bench", code_files=files)
+
+        def cold() -> None:
+            clear_bytecode(workdir)
+            qa_node(state.model_copy(), workdir=workdir)
+
+        row = {
+            "files": len(files),
+            "bytes": sum(len(c) for c in files.values()),
+            "cold": timeit(cold, repeat=args.repeat),
+            "warm": timeit(lambda: qa_node(state.model_copy(), workdir=workdir), repeat=args.repeat),
+        }
+        qa_node(state.model_copy(), workdir=workdir, qa_cache=cache)  # prime
+        # Hit cost is hashing the project; it grows with bytes, not with compile work.
+        row["cache_hit"] = timeit(
+            lambda: qa_node(state.model_copy(), workdir=workdir, qa_cache=cache), repeat=args.repeat
+        )
+        results[f"{n_files}x{file_kb}KiB"] = row
+    emit("qa", results, args.json_out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import tempfile
+from pathlib import Path
+
+from benchmarks._common import emit, make_parser, timeit
+from benchmarks._fixtures import make_project, write_project
+from ev_agent.schema import TeamState, TraceEvent
+from ev_agent.utils.run_log import append_snapshot, fingerprint_workdir, init_run_log
+
+SIZES = [(10, 8), (100, 8), (500, 8), (100, 256)]  # (files, KiB per file)
+
+
+def main() -> None:
+    parser = make_parser("bench_run_log", "fingerprint_workdir / append_snapshot cost as the workdir grows")
+    parser.add_argument("--trace", type=int, default=200, help="trace events in the logged state")
+    args = parser.parse_args()
+
+    tmp = Path(tempfile.mkdtemp(prefix="ev_bench_runlog_"))
+    trace = [TraceEvent(i, "", "bench", f"event {i}", 0) for i in range(args.trace)]
+    results: dict = {}
+    for n_files, file_kb in SIZES:
+        files = make_project(n_files, file_kb)
+        workdir = write_project(tmp / f"p_{n_files}x{file_kb}", files)
+        state = TeamState(user_goal="bench", code_files=files, trace=trace, trace_total=len(trace))
+        paths = init_run_log(tmp / "logs", f"bench_{n_files}x{file_kb}")
+        warm_fp = fingerprint_workdir(workdir)
+
+        def snapshot() -> None:
+            append_snapshot(paths, state, workdir=workdir, prev_fingerprints=warm_fp)
+
+        results[f"{n_files}x{file_kb}KiB"] = {
+            "files": len(files),
+            "bytes": sum(len(c) for c in files.values()),
+            # cold: every file hashed; warm: size+mtime match the previous snapshot, no hashing.
+            "fingerprint_cold": timeit(lambda: fingerprint_workdir(workdir), repeat=args.repeat),
+            "fingerprint_warm": timeit(lambda: fingerprint_workdir(workdir, prev=warm_fp), repeat=args.repeat),
+            "append_snapshot_warm": timeit(snapshot, repeat=args.repeat),
+        }
+    emit("run_log", results, args.json_out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+from langgraph.graph import END, StateGraph
+
+from benchmarks._common import emit, make_parser, timeit
+from ev_agent.chains.team_graph import CONFIG_KEY, _node
+from ev_agent.schema import TeamGraphState, TeamState, TraceEvent
+from ev_agent.schema.team_state import TRACE_LIMIT
+
+
+def heavy_state(n_files: int, file_kb: int, n_trace: int) -> TeamState:
+    content = ("x = 1\n" * (file_kb * 1024 // 6 + 1))[: file_kb * 1024]
+    return TeamState(
+        user_goal="bench",
+        code_files={f"mod_{i}.py": content for i in range(n_files)},
+        trace=[TraceEvent(i, "", "bench", f"event {i}", 0) for i in range(n_trace)],
+        trace_total=n_trace,
+    )
+
+
+def _touch(s: TeamState) -> TeamState:
+    s.iteration += 1
+    s.trace.append(TraceEvent(s.trace_total, "", "bench", "step", s.iteration))
+    s.trace_total += 1
+    return s
+
+
+def legacy_graph(steps: int):
+    """Pre-refactor wiring: pydantic state schema, nodes revalidate and return the full state."""
+    g = StateGraph(TeamState)
+    for i in range(steps):
+        g.add_node(f"n{i}", lambda s: _touch(TeamState.model_validate(s) if isinstance(s, dict) else s))
+    return _chain(g, steps)
+
+
+def partial_graph(steps: int):
+    """Current wiring: TypedDict channels, scratch models, partial updates, bounded trace append."""
+    g = StateGraph(TeamGraphState)
+    for i in range(steps):
+        g.add_node(f"n{i}", _node(lambda s, _ctx: _touch(s)))
+    # The nodes only read the trace limit from the run context.
+    return _chain(g, steps).with_config(configurable={CONFIG_KEY: SimpleNamespace(trace_limit=TRACE_LIMIT)})
+
+
+def _chain(g: StateGraph, steps: int):
+    g.set_entry_point("n0")
+    for i in range(steps - 1):
+        g.add_edge(f"n{i}", f"n{i + 1}")
+    g.add_edge(f"n{steps - 1}", END)
+    return g.compile()
+
+
+def main() -> None:
+    parser = make_parser("bench_state_overhead", "per-step graph overhead with a large TeamState")
+    parser.add_argument("--steps", type=int, default=10)
+    parser.add_argument("--files", type=int, default=50)
+    parser.add_argument("--file-kb", type=int, default=300)
+    parser.add_argument("--trace", type=int, default=200)
+    args = parser.parse_args()
+
+    state = heavy_state(args.files, args.file_kb, args.trace)
+    results = {"steps": args.steps, "files": args.files, "file_kb": args.file_kb, "trace": args.trace}
+    for name, graph, feed in (
+        ("legacy_pydantic_full_state", legacy_graph(args.steps), lambda: state),
+        ("typeddict_partial_updates", partial_graph(args.steps), state.model_dump),
+    ):
+        t = timeit(lambda: list(graph.stream(feed(), stream_mode="values")), repeat=args.repeat)
+        t["per_step_s"] = t["median_s"] / args.steps
+        results[name] = t
+    emit("state_overhead", results, args.json_out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from ev_agent import __version__
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Each entry runs in its own interpreter (import-time and global caches stay independent).
+# Extra args keep the default suite to a few minutes; run a module directly for full sweeps.
+SUITE: list[tuple[str, list[str]]] = [
+    ("bench_import_time", []),
+    ("bench_graph_build", []),
+    ("bench_state_overhead", []),
+    ("bench_nodes", []),
+    ("bench_json_extract", ["--legacy"]),
+    ("bench_code_digest", []),
+    ("bench_run_log", []),
+    ("bench_qa", []),
+    ("bench_e2e", []),
+]
+
+QUICK_ARGS: dict[str, list[str]] = {
+    "bench_state_overhead": ["--files", "10", "--file-kb", "50"],
+    "bench_qa": ["--sizes", "1x4,10x8,50x8"],
+    "bench_e2e": ["--concurrency", "1,4", "--runs", "8"],
+}
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(prog="benchmarks.run_all", description="run the benchmark suite and merge JSON results")
+    p.add_argument("--out", type=Path, default=ROOT / "benchmarks" / "results")
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--quick", action="store_true", help="fewer samples and smaller sizes (CI smoke)")
+    p.add_argument("--only", type=str, default=None, help="comma-separated module names")
+    args = p.parse_args()
+
+    only = {x.strip() for x in args.only.split(",")} if args.only else None
+    repeat = 2 if args.quick else args.repeat
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    run_dir = args.out / f"{stamp}_v{__version__}"
+    run_dir.mkdir(parents=True, exist_ok=True)
+    env = {**os.environ, "PYTHONPATH": str(ROOT) + os.pathsep + os.environ.get("PYTHONPATH", "")}
+
+    merged: dict = {
+        "ts": stamp,
+        "ev_agent_version": __version__,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "quick": args.quick,
+        "benchmarks": {},
+    }
+    failed = 0
+    for name, extra in SUITE:
+        if only and name not in only:
+            continue
+        out = run_dir / f"{name}.json"
+        cmd = [sys.executable, "-m", f"benchmarks.{name}", "--repeat", str(repeat), "--json-out", str(out), *extra]
+        if args.quick:
+            cmd += QUICK_ARGS.get(name, [])
+        t0 = time.perf_counter()
+        proc = subprocess.run(cmd, cwd=ROOT, env=env, capture_output=True, text=True)
+        took = time.perf_counter() - t0
+        if proc.returncode != 0 or not out.exists():
+            failed += 1
+            merged["benchmarks"][name] = {"error": proc.stderr[-4000:], "returncode": proc.returncode}
+            print(f"[FAIL] {name} ({took:.1f}s)", file=sys.stderr)
+            continue
+        merged["benchmarks"][name] = json.loads(out.read_text(encoding="utf-8"))["results"]
+        print(f"[ok]   {name} ({took:.1f}s)", file=sys.stderr)
+
+    summary = run_dir / "summary.json"
+    summary.write_text(json.dumps(merged, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    print(summary)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,5 +1,21 @@
-from .nodes import architect_node, coder_node, pm_node, qa_node, reviewer_node
-
-__all__ = ["pm_node", "architect_node", "coder_node", "qa_node", "reviewer_node"]
-
+from .nodes import (
+    architect_node,
+    coder_node,
+    fast_fix_node,
+    fix_memory_node,
+    pm_node,
+    progress_node,
+    qa_node,
+    reviewer_node,
+)
 
+__all__ = [
+    "pm_node",
+    "architect_node",
+    "coder_node",
+    "qa_node",
+    "fix_memory_node",
+    "fast_fix_node",
+    "progress_node",
+    "reviewer_node",
+]
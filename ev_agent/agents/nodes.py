@@ -1,39 +1,81 @@
 from __future__ import annotations
 
+import hashlib
+import re
+import time
+from dataclasses import asdict
 from datetime import datetime
-
-from rich.console import Console
+from pathlib import Path
 
 from ev_agent.llm import ChatMessage, LLMClient
 from ev_agent.llm.mock import MockLLM
-from ev_agent.schema import CoderOutput, TeamState
+from ev_agent.llm.usage import RunUsage
+from ev_agent.schema import (
+    CoderOutput,
+    Diagnostic,
+    TeamState,
+    TraceEvent,
+    categories,
+    diagnostic_files,
+)
+from ev_agent.utils.artifact_store import ArtifactStore
 from ev_agent.utils.code_digest import build_code_digest, format_code_digest
-from ev_agent.utils.exec import run_compileall
+from ev_agent.utils.deadline import DeadlineExceeded
+from ev_agent.utils.exec import compileall_diagnostics, run_compileall
+from ev_agent.utils.fast_fix import repair_source
 from ev_agent.utils.files import write_code_files
-from ev_agent.utils.json_extract import extract_first_json_object
+from ev_agent.utils.fix_memory import (
+    ErrorSignature,
+    FixMemory,
+    apply_hunks,
+    diff_hunks,
+    error_signature,
+    format_hunks,
+    qa_diagnostics,
+)
+from ev_agent.utils.json_extract import parse_coder_payload
+from ev_agent.utils.qa_cache import QACache, project_key
 
 from .prompts import ARCH_SYSTEM, CODER_SYSTEM, PM_SYSTEM, QA_SYSTEM, REVIEW_SYSTEM
 
-console = Console()
 
 def _ensure_state(state) -> TeamState:
     if isinstance(state, TeamState):
         return state
-    return TeamState.model_validate(state)
+    # Trusted internal transition: channel values were validated when the run started.
+    return TeamState.model_construct(**state)
 
 
 def _log(state: TeamState, who: str, msg: str) -> TeamState:
-    state.trace.append(
-        {
-            "ts": datetime.utcnow().isoformat(),
-            "node": who,
-            "message": msg,
-            "iteration": state.iteration,
-        }
-    )
+    state.trace.append(TraceEvent(state.trace_total, datetime.utcnow().isoformat(), who, msg, state.iteration))
+    state.trace_total += 1
     return state
 
 
+def pm_messages(goal: str) -> list[ChatMessage]:
+    return [ChatMessage("system", PM_SYSTEM), ChatMessage("user", goal)]
+
+
+def architect_messages(requirements: str) -> list[ChatMessage]:
+    return [
+        ChatMessage("system", ARCH_SYSTEM),
+        ChatMessage("user", f"PRD:\n{requirements}\n\n请给出架构方案。"),
+    ]
+
+
+def coder_messages(requirements: str, architecture: str, error_log: str, extra: str = "") -> list[ChatMessage]:
+    prompt = (
+        "基于以下信息生成可运行的代码文件（JSON 格式输出）：\n\n"
+        f"PRD:\n{requirements}\n\n"
+        f"ARCH:\n{architecture}\n\n"
+        f"上一次报错（如有）:\n{error_log}\n\n"
+        + (f"{extra}\n\n" if extra else "")
+        + "输出严格为 JSON：{\"files\":[{\"path\":\"...\",\"content\":\"...\"},...],\"notes\":\"...\"}\n"
+        "路径必须是相对路径，根目录为 game/（例如：\"main.py\"）。"
+    )
+    return [ChatMessage("system", CODER_SYSTEM), ChatMessage("user", prompt)]
+
+
 def pm_node(state: TeamState, llm: LLMClient) -> TeamState:
     state = _ensure_state(state)
     if state.requirements:
@@ -50,12 +92,7 @@ def pm_node(state: TeamState, llm: LLMClient) -> TeamState:
         )
         return _log(state, "pm", "Mock PRD ready")
 
-    out = llm.chat(
-        [
-            ChatMessage("system", PM_SYSTEM),
-            ChatMessage("user", state.user_goal),
-        ]
-    )
+    out = llm.chat(pm_messages(state.user_goal))
     state.requirements = out.strip()
     return _log(state, "pm", "PRD generated")
 
@@ -76,71 +113,195 @@ def architect_node(state: TeamState, llm: LLMClient) -> TeamState:
         )
         return _log(state, "architect", "Mock architecture ready")
 
-    out = llm.chat(
-        [
-            ChatMessage("system", ARCH_SYSTEM),
-            ChatMessage("user", f"PRD:\n{state.requirements}\n\n请给出架构方案。"),
-        ]
-    )
+    out = llm.chat(architect_messages(state.requirements))
     state.architecture = out.strip()
     return _log(state, "architect", "Architecture generated")
 
 
-def coder_node(state: TeamState, llm: LLMClient, *, workdir) -> TeamState:
+def coder_node(
+    state: TeamState,
+    llm: LLMClient,
+    *,
+    workdir,
+    atomic_writes: bool = False,
+    store: ArtifactStore | None = None,
+    temperature: float | None = None,
+    wide_context: bool = False,
+) -> TeamState:
+    """`temperature` / `wide_context` (current code + unresolved error history) are set on escalation."""
     state = _ensure_state(state)
     # Always try to (re)generate code when there's an error, until max iters stops the graph.
     if state.error_log:
         state.iteration += 1
 
     if isinstance(llm, MockLLM):
-        state.code_files = _mock_snake_project()
-        write_code_files(workdir, state.code_files)
-        state.error_log = ""  # reset before QA
-        return _log(state, "coder", f"Mock code written: {len(state.code_files)} files")
-
-    prompt = (
-        "基于以下信息生成可运行的代码文件（JSON 格式输出）：\n\n"
-        f"PRD:\n{state.requirements}\n\n"
-        f"ARCH:\n{state.architecture}\n\n"
-        f"上一次报错（如有）:\n{state.error_log}\n\n"
-        "输出严格为 JSON：{\"files\":[{\"path\":\"...\",\"content\":\"...\"},...],\"notes\":\"...\"}\n"
-        "路径必须是相对路径，根目录为 game/（例如：\"main.py\"）。"
-    )
-    out = llm.chat([ChatMessage("system", CODER_SYSTEM), ChatMessage("user", prompt)])
+        _commit_code(state, _mock_snake_project(), workdir, atomic=atomic_writes, store=store)
+        state.error_log, state.diagnostics = "", []  # reset before QA
+        return _log(state, "coder", f"Mock code written: {_describe_changes(state)}")
+
+    # Protocol failures get a plain reprompt: the parse error is the whole story, no wide context.
+    extra = _wide_context(state, workdir) if wide_context and "protocol" not in categories(state.diagnostics) else ""
+    messages = coder_messages(state.requirements, state.architecture, state.error_log, extra)
+    prompt = messages[-1].content
+    sampling = {} if temperature is None else {"temperature": temperature}
+    if state.coder_prefetch and not state.error_log:
+        # Produced (and validated) by the speculative front while PM/architect were streaming.
+        out, state.coder_prefetch = state.coder_prefetch, ""
+    else:
+        out = llm.chat(messages, **sampling)
 
     try:
-        obj = extract_first_json_object(out)
-        parsed = CoderOutput.model_validate(obj)
-        code_files: dict[str, str] = {}
-        for f in parsed.files:
-            path = f.path.strip().replace("\\", "/")
-            # Be tolerant: some models output paths like "game/main.py"
-            if path.lower().startswith("game/"):
-                path = path[5:]
-            if path.startswith("/"):
-                path = path[1:]
-            if not path:
+        payload = parse_coder_payload(out)
+        parsed = CoderOutput.model_validate(payload.obj)
+        code_files = _normalize_code_files(parsed)
+        if payload.repaired and not payload.truncated:
+            _log(state, "coder", "Coder output had JSON defects; repaired locally")
+
+        # Truncated output (e.g. max_tokens hit): keep the complete files and ask only for the rest.
+        # `cut` holds files that were cut mid-way and have not arrived complete since.
+        truncated = payload.truncated
+        cut = {_normalize_path(payload.partial_path)} if truncated and payload.partial_path else set()
+        continuations = 0
+        while (truncated or cut) and continuations < _MAX_CONTINUATIONS:
+            continuations += 1
+            _log(state, "coder", f"Output truncated after {len(code_files)} files; requesting the rest")
+            more = llm.chat(
+                [
+                    ChatMessage("system", CODER_SYSTEM),
+                    ChatMessage("user", prompt),
+                    ChatMessage("user", _continuation_prompt(code_files, sorted(cut))),
+                ],
+                **sampling,
+            )
+            try:
+                chunk = parse_coder_payload(more)
+                got = _normalize_code_files(CoderOutput.model_validate(chunk.obj)) if chunk.obj.get("files") else {}
+            except Exception as e:
+                # Files from earlier chunks stay; the next continuation asks for the rest again.
+                _log(state, "coder", f"Continuation {continuations} unparseable ({type(e).__name__}); asking again")
                 continue
-            code_files[path] = f.content
+            code_files.update(got)
+            cut -= got.keys()
+            if chunk.truncated and chunk.partial_path:
+                cut.add(_normalize_path(chunk.partial_path))
+            truncated = chunk.truncated
+            if not got and not cut:
+                break  # "done"
 
         if "main.py" not in code_files:
             raise ValueError("缺少必需文件：main.py（注意 path 应该是 workdir 内的相对路径，例如 main.py，而不是 game/main.py）")
 
-        state.code_files = code_files
-        write_code_files(workdir, state.code_files)
-        state.error_log = ""
-        return _log(state, "coder", f"Code written: {len(state.code_files)} files")
+        _commit_code(state, code_files, workdir, atomic=atomic_writes, store=store)
+        state.error_log, state.diagnostics = "", []
+        if truncated or cut:
+            missing = f"; never completed: {', '.join(sorted(cut))}" if cut else ""
+            _log(state, "coder", f"Output still truncated after {continuations} continuations{missing}")
+        return _log(state, "coder", f"Code written: {_describe_changes(state)}")
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         # Do not write anything. Turn this into an error so QA routes back to coder.
         state.error_log = f"CODER_OUTPUT_PARSE_ERROR: {type(e).__name__}: {e}\nRawOutput:\n{out[:2000]}"
         state.qa_report = state.error_log
+        state.diagnostics = [Diagnostic(category="protocol", check="coder_output", message=f"{type(e).__name__}: {e}")]
         return _log(state, "coder", "Coder output invalid; will retry")
 
 
-def qa_node(state: TeamState, *, workdir, fault_inject: bool = False) -> TeamState:
+_MAX_CONTINUATIONS = 3
+WIDE_CONTEXT_CHARS = 60_000
+
+
+def _attempt_history(state: TeamState) -> str:
+    lines = ["此前几轮的修复都没有解决问题（报错如下），请重新审视整体实现，不要重复同样的代码："]
+    lines += [f"- 第 {a['iteration']} 轮：{a['summary']}" for a in state.attempts]
+    return "\n".join(lines)
+
+
+def _wide_context(state: TeamState, workdir) -> str:
+    workdir = Path(workdir)
+    parts = [_attempt_history(state)]
+    budget = WIDE_CONTEXT_CHARS
+    code: list[str] = []
+    for p in state.code_paths():
+        f = workdir / p
+        if budget <= 0 or not f.is_file():
+            continue
+        text = f.read_text(encoding="utf-8")[:budget]
+        budget -= len(text)
+        code.append(f"# --- {p} ---\n{text}")
+    if code:
+        parts += ["", "当前代码（最近一次生成的版本）：", *code]
+    return "\n".join(parts)
+
+
+def _commit_code(
+    state: TeamState,
+    code_files: dict[str, str],
+    workdir,
+    *,
+    atomic: bool,
+    store: ArtifactStore | None,
+) -> None:
+    previous = state.code_paths()
+    if store is None:
+        changes = write_code_files(workdir, code_files, previous=previous, atomic=atomic)
+        state.code_files = code_files
+    else:
+        manifest = store.put_files(code_files)
+        changes = write_code_files(workdir, code_files, previous=previous, atomic=atomic, store=store)
+        if state.run_id:
+            store.save_manifest(state.run_id, state.iteration, manifest)
+        state.code_manifest = manifest
+        state.code_files = {}
+    state.code_changes = changes.as_dict()
+
+
+def _describe_changes(state: TeamState) -> str:
+    ch = state.code_changes
+    return (
+        f"{len(state.code_paths())} files (+{len(ch.get('added', []))} "
+        f"~{len(ch.get('modified', []))} -{len(ch.get('removed', []))})"
+    )
+
+
+def _normalize_path(path: str) -> str:
+    path = path.strip().replace("\\", "/")
+    # Be tolerant: some models output paths like "game/main.py"
+    if path.lower().startswith("game/"):
+        path = path[5:]
+    if path.startswith("/"):
+        path = path[1:]
+    return path
+
+
+def _normalize_code_files(parsed: CoderOutput) -> dict[str, str]:
+    code_files: dict[str, str] = {}
+    for f in parsed.files:
+        path = _normalize_path(f.path)
+        if not path:
+            continue
+        code_files[path] = f.content
+    return code_files
+
+
+def _continuation_prompt(received: dict[str, str], cut: list[str]) -> str:
+    lines = [
+        "你上一次的 JSON 输出被截断了。以下文件已经完整收到，【不要】重复输出：",
+        *[f"- {p}" for p in received],
+    ]
+    for path in cut:
+        lines.append(f"文件 {path} 在输出中途被截断，请完整重新输出它。")
+    lines.append(
+        "请只输出剩余尚未输出的文件，仍然严格使用同样的 JSON 格式；"
+        "如果已经没有剩余文件，输出 {\"files\": [], \"notes\": \"done\"}。"
+    )
+    return "\n".join(lines)
+
+
+def qa_node(state: TeamState, *, workdir, fault_inject: bool = False, qa_cache: QACache | None = None) -> TeamState:
     state = _ensure_state(state)
     # If coder already produced a parse/protocol error, short-circuit QA as failure.
-    if state.error_log.startswith("CODER_OUTPUT_PARSE_ERROR"):
+    if "protocol" in categories(state.diagnostics):
         return _log(state, "qa", "Coder output invalid (parse/protocol).")
 
     if fault_inject and not state.fault_injected:
@@ -150,25 +311,222 @@ def qa_node(state: TeamState, *, workdir, fault_inject: bool = False) -> TeamSta
         if main_py.exists():
             original = main_py.read_text(encoding="utf-8")
             injected = original + "\n\n# EV_FAULT_INJECT\n\ndef broken(:\n    pass\n"
-            main_py.write_text(injected, encoding="utf-8", newline="\n")
+            # Replace rather than edit in place, so QA never compiles a half-written file.
+            tmp = main_py.with_suffix(".py.tmp")
+            tmp.write_text(injected, encoding="utf-8", newline="\n")
+            tmp.replace(main_py)
             state.fault_injected = True
             _log(state, "qa", "Fault injected into main.py (intentional).")
-    res = run_compileall(workdir)
+    if qa_cache is None:
+        res = run_compileall(workdir)
+    else:
+        # Keyed after fault injection: the verdict belongs to the files QA actually sees.
+        key = project_key(workdir)
+        res = qa_cache.get(key, workdir)
+        hit = res is not None
+        if res is None:
+            res = run_compileall(workdir)
+            if res.returncode >= 0:  # a timeout says nothing about the files
+                qa_cache.put(key, workdir, res)
+        _log(state, "qa", f"QA cache {'hit' if hit else 'miss'} ({qa_cache.stats()})")
     state.qa_report = f"returncode={res.returncode}\nstdout:\n{res.stdout}\nstderr:\n{res.stderr}"
+    state.diagnostics = compileall_diagnostics(res, workdir)
     if res.returncode != 0:
         state.error_log = state.qa_report
-        return _log(state, "qa", "Compileall failed")
+        return _log(state, "qa", f"Compileall failed: {', '.join(sorted(categories(state.diagnostics)))}")
     state.error_log = ""
     return _log(state, "qa", "Compileall passed")
 
 
+def fast_fix_node(
+    state: TeamState,
+    *,
+    workdir,
+    atomic_writes: bool = False,
+    store: ArtifactStore | None = None,
+) -> TeamState:
+    """
+    Deterministic repairs for mechanical QA failures (fences, indentation, tabs, unclosed trailing
+    brackets; plus missing stdlib imports in the files QA flagged) checked with compile() in-process.
+    Writes only when every Python file compiles afterwards; QA then re-verifies. Runs at most once
+    per iteration.
+    """
+    state = _ensure_state(state)
+    workdir = Path(workdir)
+    state.fast_fix_iteration = state.iteration
+    t0 = time.perf_counter()
+
+    paths = [p for p in state.code_paths() if (workdir / p).is_file()]
+    files = {p: (workdir / p).read_text(encoding="utf-8") for p in paths}
+    flagged = set(diagnostic_files(state.diagnostics))
+    changed: dict[str, str] = {}
+    notes: list[str] = []
+    broken: list[str] = []
+    for path, source in files.items():
+        if not path.endswith(".py"):
+            continue
+        res = repair_source(source, path, add_imports=path in flagged)
+        if res.rules:
+            changed[path] = res.source
+            notes.append(f"{path}: {'+'.join(res.rules)}")
+        if not res.ok:
+            broken.append(path)
+    took_ms = (time.perf_counter() - t0) * 1000
+
+    if broken or not changed:
+        what = ", ".join(broken) if broken else "the QA failure"
+        return _log(state, "fast_fix", f"No mechanical fix for {what} ({took_ms:.1f} ms); handing over to coder")
+    _commit_code(state, {**files, **changed}, workdir, atomic=atomic_writes, store=store)
+    state.error_log, state.diagnostics = "", []  # QA re-verifies
+    return _log(state, "fast_fix", f"Fixed locally in {took_ms:.1f} ms: {'; '.join(notes)}; re-running QA")
+
+
+MAX_ESCALATIONS = 1
+
+
+def progress_node(
+    state: TeamState,
+    *,
+    workdir,
+    usage: RunUsage,
+    stall_repeats: int = 2,
+    budget_s: float = 0.0,
+    token_budget: int = 0,
+) -> TeamState:
+    """
+    Runs before each coder fix pass. Records the failed attempt (error signature + code hash),
+    escalates the coder once when progress stalls (same code as an earlier attempt, or the same
+    error `stall_repeats` times in a row), stops the run when it stalls again or a budget is spent.
+    """
+    state = _ensure_state(state)
+    workdir = Path(workdir)
+    found = qa_diagnostics(state.diagnostics, state.error_log, workdir)
+    sig = error_signature(found, workdir)
+    if sig is not None:
+        error_key, summary = sig.key, sig.describe()
+    else:
+        masked = "\n".join(re.sub(r"\d+", "N", f"{d.category}\0{d.check}\0{d.file}\0{d.message}") for d in found)
+        error_key = hashlib.sha256(masked.encode("utf-8")).hexdigest()[:32]
+        summary = found[0].describe()[:200] if found else ""
+    code_key = project_key(workdir)
+    earlier = list(state.attempts)
+    state.attempts = earlier + [
+        {"iteration": state.iteration, "error": error_key, "code": code_key, "summary": summary}
+    ]
+    _log(state, "progress", f"Attempt {state.iteration} failed: {summary[:120]} ({usage.summary()})")
+
+    if budget_s and usage.elapsed() >= budget_s:
+        state.stop_reason = f"wall-clock budget spent ({usage.elapsed():.1f}s >= {budget_s:g}s)"
+    elif token_budget and usage.tokens >= token_budget:
+        state.stop_reason = f"token budget spent (~{usage.tokens} >= {token_budget})"
+    if state.stop_reason:
+        return _log(state, "progress", f"Stopping early: {state.stop_reason}")
+
+    if stall_repeats <= 0:
+        return state
+    stall = ""
+    same_code = next((a for a in earlier if a["code"] == code_key), None)
+    repeats = 0
+    for a in reversed(state.attempts):
+        if a["error"] != error_key:
+            break
+        repeats += 1
+    if same_code is not None:
+        stall = f"code identical to attempt {same_code['iteration']}"
+    elif repeats >= stall_repeats:
+        stall = f"same error {repeats}x in a row"
+    if not stall:
+        return state
+    if state.escalation < MAX_ESCALATIONS:
+        state.escalation += 1
+        return _log(state, "progress", f"Stalled ({stall}); escalating the coder")
+    state.stop_reason = f"stalled after escalation ({stall})"
+    return _log(state, "progress", f"Stopping early: {state.stop_reason}")
+
+
+def fix_memory_node(
+    state: TeamState,
+    *,
+    workdir,
+    memory: FixMemory,
+    atomic_writes: bool = False,
+    store: ArtifactStore | None = None,
+) -> TeamState:
+    """
+    Runs after every QA pass when a fix memory is configured:
+    - confirms (or discredits) a known fix applied before this QA pass;
+    - learns the hunks that resolved the previous failure when the coder fixed it;
+    - on a failure with a known signature, applies the stored patch (then QA again) or, when it
+      no longer applies, hands it to the coder as a hint.
+    """
+    state = _ensure_state(state)
+    workdir = Path(workdir)
+    fm = dict(state.fix_memory_state)
+    tried = list(fm.get("tried", []))
+    # Coder protocol errors carry no QA verdict; keep everything pending until QA has run.
+    qa_ran = "protocol" not in categories(state.diagnostics)
+    sig = error_signature(qa_diagnostics(state.diagnostics, state.error_log, workdir), workdir)
+
+    applied = fm.pop("applied", None)
+    if applied and qa_ran:
+        ok = sig is None or sig.key != applied["signature"]
+        memory.record(applied["signature"], applied["patch_id"], ok=ok)
+        _log(state, "fix_memory", f"Known fix {applied['patch_id']} {'confirmed' if ok else 'did not help'}")
+
+    pending = fm.pop("pending", None)
+    if pending and qa_ran and (not state.error_log or (sig is not None and sig.key != pending["signature"]["key"])):
+        known = ErrorSignature(**pending["signature"])
+        target = workdir / known.path
+        after = target.read_text(encoding="utf-8") if target.is_file() else ""
+        hunks = diff_hunks(pending["before"], after, near_line=known.line) if after else []
+        if hunks:
+            patch_id = memory.learn(known, hunks)
+            _log(state, "fix_memory", f"Learned fix {patch_id} for {known.describe()}")
+    elif pending:
+        fm["pending"] = pending
+
+    if sig is not None and (workdir / sig.path).is_file():
+        target = workdir / sig.path
+        content = target.read_text(encoding="utf-8")
+        fixes = memory.lookup(sig) if sig.key not in tried else []
+        for fix in fixes:
+            patched = apply_hunks(content, fix.hunks, near_line=sig.line)
+            if patched is None:
+                continue
+            if sig.path.endswith(".py"):
+                try:
+                    compile(patched, sig.path, "exec")
+                except SyntaxError:
+                    continue
+            paths = [p for p in state.code_paths() if (workdir / p).is_file()]
+            files = {p: (workdir / p).read_text(encoding="utf-8") for p in paths}
+            files[sig.path] = patched
+            _commit_code(state, files, workdir, atomic=atomic_writes, store=store)
+            memory.record(sig.key, fix.patch_id, applied=True)
+            fm["applied"] = {"signature": sig.key, "patch_id": fix.patch_id}
+            fm["tried"] = tried + [sig.key]
+            fm.pop("pending", None)
+            state.fix_memory_state = fm
+            return _log(state, "fix_memory", f"Applied known fix {fix.patch_id} for {sig.describe()}; re-running QA")
+
+        fm["pending"] = {"signature": asdict(sig), "before": content}
+        if fixes:
+            state.error_log += "\n\n已知修复（历史记录，可能需要调整后使用）：\n" + format_hunks(fixes[0].hunks)
+            _log(state, "fix_memory", f"Known fix for {sig.describe()} no longer applies; passed to coder as a hint")
+        else:
+            _log(state, "fix_memory", f"No known fix for {sig.describe()}")
+
+    state.fix_memory_state = fm
+    return state
+
+
 def reviewer_node(state: TeamState, llm: LLMClient, *, workdir) -> TeamState:
     state = _ensure_state(state)
     if isinstance(llm, MockLLM):
         state.review_notes = "Mock review：建议后续加入单元测试与配置化参数（格子大小、帧率）。"
         return _log(state, "reviewer", "Mock review ready")
 
-    rel_paths = list(state.code_files.keys())
+    rel_paths = state.code_paths()
     digests = build_code_digest(workdir, rel_paths)
     digest_text = format_code_digest(digests)
 
@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import ast
+import contextvars
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from ev_agent.llm import ChatMessage, LLMClient
+from ev_agent.schema import CoderOutput, Diagnostic, TeamState, categories, diagnostic_files
+from ev_agent.utils.artifact_store import ArtifactStore
+from ev_agent.utils.deadline import DeadlineExceeded
+from ev_agent.utils.json_extract import parse_coder_payload
+
+from .nodes import (
+    _attempt_history,
+    _commit_code,
+    _describe_changes,
+    _ensure_state,
+    _log,
+    _normalize_code_files,
+)
+from .prompts import CODER_FILE_SYSTEM, CODER_STUBS_SYSTEM
+from .speculative import file_tree
+
+# Per-file code generation (EV_CODER_MODE=per_file):
+#
+# - The file list comes from the architecture's file tree (main.py is always included).
+# - First pass: one call drafts interface stubs for every Python file, then each file is generated
+#   by its own call with all stubs as shared context. Calls run concurrently (the limiter still
+#   caps in-flight requests per backend).
+# - Each file is validated on arrival (protocol + `compile()` for .py) and retried alone.
+# - Fix passes regenerate only the files named in the QA / coder error; the other files keep
+#   their current content and contribute stubs derived from the real code.
+# - On escalation every call runs at the escalated temperature, and each file prompt also gets the
+#   unresolved error history (the other files' code is already there as real stubs).
+
+MAX_FILES = 24
+FILE_ATTEMPTS = 2
+
+_DEFS = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+
+def plan_files(architecture: str) -> list[str]:
+    # Same normalization as the coder output: the project root is game/.
+    paths = (p[5:] if p.lower().startswith("game/") else p for p in file_tree(architecture))
+    files = list(dict.fromkeys(p for p in paths if p and ".." not in p.split("/")))[:MAX_FILES]
+    if "main.py" not in files:
+        files.insert(0, "main.py")
+    return files
+
+
+def interface_stub(source: str) -> str:
+    """Imports, module constants and signatures (with the docstring) of a module; bodies become `...`."""
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return ""
+
+    def strip(node):
+        doc = ast.get_docstring(node, clean=False)
+        body = [ast.Expr(ast.Constant(doc))] if doc is not None else []
+        if isinstance(node, ast.ClassDef):
+            body += [strip(n) for n in node.body if isinstance(n, _DEFS)]
+        node.body = body or [ast.Expr(ast.Constant(...))]
+        return node
+
+    tree.body = [
+        strip(n) if isinstance(n, _DEFS) else n
+        for n in tree.body
+        if isinstance(n, (ast.Import, ast.ImportFrom, ast.Assign, ast.AnnAssign, *_DEFS))
+    ]
+    return ast.unparse(tree)
+
+
+def failing_files(error_log: str, files: list[str]) -> list[str]:
+    """Files named in an error log (absolute workdir paths or relative ones)."""
+    # compileall lists every file it visits; only the error lines matter.
+    text = "\n".join(ln for ln in error_log.splitlines() if not ln.startswith(("Listing '", "Compiling '")))
+    return [p for p in files if re.search(r"(?<![\w.-])" + re.escape(p) + r"\b", text)]
+
+
+def _format_stubs(stubs: dict[str, str], skip: str) -> str:
+    parts = [f"# --- {p} ---\n{s.strip() or '# (无接口)'}" for p, s in stubs.items() if p != skip]
+    return "\n\n".join(parts) or "(无)"
+
+
+def _stub_messages(state: TeamState, files: list[str]) -> list[ChatMessage]:
+    prompt = (
+        f"PRD:\n{state.requirements}\n\nARCH:\n{state.architecture}\n\n"
+        "需要接口桩的 Python 文件：\n" + "\n".join(f"- {p}" for p in files if p.endswith(".py"))
+    )
+    return [ChatMessage("system", CODER_STUBS_SYSTEM), ChatMessage("user", prompt)]
+
+
+def _file_messages(
+    state: TeamState, path: str, stubs: dict[str, str], current: str, error: str, extra: str = ""
+) -> list[ChatMessage]:
+    prompt = (
+        f"PRD:\n{state.requirements}\n\nARCH:\n{state.architecture}\n\n"
+        f"其他文件的接口桩：\n{_format_stubs(stubs, path)}\n\n"
+        f"本文件的接口桩：\n{stubs.get(path, '').strip() or '(无，按架构自行设计)'}\n\n"
+    )
+    if current:
+        prompt += f"本文件当前内容：\n{current}\n\n"
+    if error:
+        prompt += f"本文件上一次的报错：\n{error}\n\n"
+    if extra:
+        prompt += f"{extra}\n\n"
+    prompt += f"请只实现文件 {path}，输出严格为 JSON。"
+    return [ChatMessage("system", CODER_FILE_SYSTEM), ChatMessage("user", prompt)]
+
+
+def _generate_file(
+    state: TeamState,
+    llm: LLMClient,
+    path: str,
+    stubs: dict[str, str],
+    current: str,
+    error: str,
+    extra: str = "",
+    sampling: dict | None = None,
+) -> tuple[str | None, str, int]:
+    """(content or None, last error, attempts) for one file; retries alone on invalid output."""
+    for attempt in range(1, FILE_ATTEMPTS + 1):
+        out = llm.chat(_file_messages(state, path, stubs, current, error, extra), **(sampling or {}))
+        try:
+            payload = parse_coder_payload(out)
+            if payload.truncated:
+                raise ValueError("输出被截断")
+            got = _normalize_code_files(CoderOutput.model_validate(payload.obj))
+            if path in got:
+                content = got[path]
+            elif len(got) == 1:
+                # A lone entry under a mangled path is still the file that was asked for.
+                content = next(iter(got.values()))
+            else:
+                raise ValueError(f"输出中没有文件 {path}")
+            if path.endswith(".py"):
+                compile(content, path, "exec")
+            return content, "", attempt
+        except SyntaxError as e:
+            error = f"SyntaxError: {path}:{e.lineno}: {e.msg}"
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}\nRawOutput:\n{out[:1000]}"
+    return None, error, FILE_ATTEMPTS
+
+
+def per_file_coder_node(
+    state: TeamState,
+    llm: LLMClient,
+    *,
+    workdir,
+    atomic_writes: bool = False,
+    store: ArtifactStore | None = None,
+    max_workers: int = 4,
+    temperature: float | None = None,
+    wide_context: bool = False,
+) -> TeamState:
+    """
+    Generate (or fix) the project one file per model call, concurrently. `temperature` /
+    `wide_context` (unresolved error history in every file prompt) are set on escalation.
+    """
+    state = _ensure_state(state)
+    if state.error_log:
+        state.iteration += 1
+    workdir = Path(workdir)
+    t0 = time.perf_counter()
+
+    current = {p: (workdir / p).read_text(encoding="utf-8") for p in state.code_paths() if (workdir / p).is_file()}
+    planned = plan_files(state.architecture)
+    files = planned + [p for p in current if p not in planned]
+
+    # Files named by the structured findings; the log scan covers findings without a file.
+    named = [p for p in diagnostic_files(state.diagnostics) if p in files]
+    todo = (named or failing_files(state.error_log, files)) if state.error_log and current else []
+    todo += [p for p in files if p not in current and p not in todo]  # never generated yet
+    if not todo:
+        todo = files
+    errors = {p: state.error_log for p in todo} if state.error_log else {}
+    # As in coder_node: protocol failures get a plain reprompt without the history.
+    extra = _attempt_history(state) if wide_context and "protocol" not in categories(state.diagnostics) else ""
+    sampling = {} if temperature is None else {"temperature": temperature}
+
+    # Shared context: real signatures for files that already exist, drafted stubs for the rest.
+    stubs = {p: interface_stub(src) for p, src in current.items() if p.endswith(".py")}
+    if any(p.endswith(".py") and p not in stubs for p in files):
+        try:
+            drafted = _normalize_code_files(
+                CoderOutput.model_validate(
+                    parse_coder_payload(llm.chat(_stub_messages(state, files), **sampling)).obj
+                )
+            )
+            stubs.update({p: s for p, s in drafted.items() if p not in stubs})
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            _log(state, "coder", f"Interface stubs unavailable ({type(e).__name__}); generating without them")
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(todo)))) as pool:
+        results = dict(
+            zip(
+                todo,
+                pool.map(
+                    # One context copy per task so each worker inherits the run deadline.
+                    lambda p: contextvars.copy_context().run(
+                        _generate_file, state, llm, p, stubs, current.get(p, ""), errors.get(p, ""), extra, sampling
+                    ),
+                    todo,
+                ),
+            )
+        )
+
+    code_files = dict(current)
+    failed: dict[str, str] = {}
+    for path, (content, error, _attempts) in results.items():
+        if content is None:
+            failed[path] = error
+        else:
+            code_files[path] = content
+    retried = sum(1 for _c, _e, attempts in results.values() if attempts > 1)
+    took = time.perf_counter() - t0
+
+    if "main.py" not in code_files:
+        failed.setdefault("main.py", "缺少必需文件：main.py")
+    if failed:
+        # Keep what validated; the next pass regenerates only the files listed here.
+        if len(failed) < len(results):
+            _commit_code(state, code_files, workdir, atomic=atomic_writes, store=store)
+        state.error_log = "CODER_OUTPUT_PARSE_ERROR: per-file generation failed:\n" + "\n".join(
+            f"- {p}: {e}" for p, e in failed.items()
+        )
+        state.qa_report = state.error_log
+        state.diagnostics = [
+            Diagnostic(category="protocol", check="per_file", message=e.splitlines()[0] if e else "", file=p)
+            for p, e in failed.items()
+        ]
+        return _log(state, "coder", f"Per-file output invalid for {len(failed)}/{len(todo)} files; will retry")
+
+    _commit_code(state, code_files, workdir, atomic=atomic_writes, store=store)
+    state.error_log, state.diagnostics = "", []
+    return _log(
+        state,
+        "coder",
+        f"Code written: {_describe_changes(state)}; per-file: generated {len(todo)}/{len(files)} "
+        f"({retried} retried) in {took:.2f}s",
+    )
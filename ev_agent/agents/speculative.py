@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import contextvars
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+
+from ev_agent.llm import LLMClient, stream_chat
+from ev_agent.schema import TeamState
+
+from .nodes import _ensure_state, _log, architect_messages, coder_messages, pm_messages
+
+# Speculative front: PM -> Architect -> Coder with overlapping model calls.
+#
+# - The architect starts as soon as the streamed PRD has passed its acceptance criteria
+#   (the risks section has begun), instead of waiting for the PRD to finish.
+# - The coder starts once the streamed architecture's file tree is complete.
+# - When upstream finishes, downstream work is validated: the architecture is kept if the PRD
+#   only grew by a small tail after the trigger point; the coder output is kept if the final
+#   architecture names the same files as the partial one it was prompted with. Otherwise the
+#   stage is redone on the full input (the coder simply falls back to coder_node's own call),
+#   and the abandoned stream is cancelled at its next chunk.
+
+# PRD sections per PM_SYSTEM: 目标、用户故事、范围、非目标、验收标准、风险.
+_PRD_READY_RE = re.compile(r"^\W*(风险|risks?)\b", re.IGNORECASE | re.MULTILINE)
+_FILE_RE = re.compile(r"(?<![\w/.-])((?:[\w-]+/)*[\w-]+\.(?:py|txt|json|toml|cfg|ini|md|yaml|yml))\b")
+
+MAX_PRD_TAIL_RATIO = 0.35  # PRD text the architect missed, as a share of the final PRD
+
+
+@dataclass
+class _Stage:
+    """One streamed model call: text so far, an early-ready snapshot, and timings."""
+
+    text: str = ""
+    ready_text: str | None = None
+    started: float = 0.0
+    finished: float = 0.0
+    error: BaseException | None = None
+    ready: threading.Event = field(default_factory=threading.Event)
+    done: threading.Event = field(default_factory=threading.Event)
+    cancelled: threading.Event = field(default_factory=threading.Event)
+
+    @property
+    def duration(self) -> float:
+        return self.finished - self.started
+
+
+def _run_stage(stage: _Stage, llm: LLMClient, messages, is_ready) -> None:
+    stage.started = time.perf_counter()
+    parts: list[str] = []
+    stream = stream_chat(llm, messages)
+    try:
+        for chunk in stream:
+            if stage.cancelled.is_set():
+                break  # abandoned: stop reading (closing the stream releases the connection)
+            parts.append(chunk)
+            if not stage.ready.is_set():
+                text = "".join(parts)
+                if is_ready(text):
+                    stage.ready_text = text
+                    stage.ready.set()
+        stage.text = "".join(parts).strip()
+    except BaseException as e:  # surfaced by the caller
+        stage.error = e
+    finally:
+        stream.close()
+        stage.finished = time.perf_counter()
+        if stage.ready_text is None:
+            stage.ready_text = stage.text
+        stage.ready.set()
+        stage.done.set()
+
+
+def _start(llm: LLMClient, messages, is_ready=lambda text: False) -> _Stage:
+    stage = _Stage()
+    ctx = contextvars.copy_context()  # inherit the run deadline
+    threading.Thread(target=ctx.run, args=(_run_stage, stage, llm, messages, is_ready), daemon=True).start()
+    return stage
+
+
+def _finish(stage: _Stage) -> str:
+    stage.done.wait()
+    if stage.error is not None:
+        raise stage.error
+    return stage.text
+
+
+def _missed(prefix: str, final: str) -> float:
+    """Share of the final text a stage started on a streamed prefix did not see."""
+    return max(0.0, 1.0 - len(prefix.strip()) / max(len(final.strip()), 1))
+
+
+def prd_ready(text: str) -> bool:
+    return _PRD_READY_RE.search(text) is not None
+
+
+def file_tree(text: str) -> list[str]:
+    seen: dict[str, None] = {}
+    for m in _FILE_RE.finditer(text):
+        seen.setdefault(m.group(1).lstrip("./"), None)
+    return list(seen)
+
+
+def file_tree_ready(text: str) -> bool:
+    """The tree is complete once main.py is listed and a finished line after the last file names none."""
+    lines = text.splitlines()[:-1]  # the last line may still be streaming
+    if "main.py" not in file_tree("\n".join(lines)):
+        return False
+    last_file_line = max(i for i, ln in enumerate(lines) if _FILE_RE.search(ln))
+    # Any finished line after the last file entry (a blank separator or prose) ends the tree.
+    return last_file_line < len(lines) - 1
+
+
+def speculative_front(
+    state: TeamState,
+    *,
+    pm_llm: LLMClient,
+    architect_llm: LLMClient,
+    coder_llm: LLMClient,
+) -> TeamState:
+    """
+    Fill requirements + architecture (and `coder_prefetch` when it validates) with overlapped
+    streaming calls. Logs what was accepted or redone and the latency saved versus running the
+    same calls back to back.
+
+    Limitations: the architect is accepted on size alone (how much of the final PRD it did not
+    see, `_missed`), not on what that tail says; only the coder check is structural (same file
+    paths). A cancelled stage stops at its next chunk, so a backend without streaming still
+    finishes its call in the background.
+    """
+    state = _ensure_state(state)
+    if state.requirements or state.architecture:
+        return state
+    t0 = time.perf_counter()
+
+    pm = _start(pm_llm, pm_messages(state.user_goal), prd_ready)
+    pm.ready.wait()
+    if pm.error is not None:
+        raise pm.error
+    prd_partial = pm.ready_text or ""
+    arch = _start(architect_llm, architect_messages(prd_partial.strip()), file_tree_ready)
+    arch_started_at = len(prd_partial)
+
+    arch.ready.wait()
+    if arch.error is not None:
+        raise arch.error
+    arch_partial = (arch.ready_text or "").strip()
+    partial_files = file_tree(arch_partial)
+    # The coder sees whatever PRD exists by now (often already complete).
+    prd_for_coder = pm.text if pm.done.is_set() else prd_partial.strip()
+    coder = _start(coder_llm, coder_messages(prd_for_coder, arch_partial, ""))
+
+    requirements = _finish(pm)
+    sequential = pm.duration
+    notes: list[str] = []
+
+    tail_ratio = _missed(prd_partial, requirements)
+    if tail_ratio <= MAX_PRD_TAIL_RATIO:
+        architecture = _finish(arch)
+        sequential += arch.duration
+        notes.append(f"architect accepted (started at {arch_started_at / max(len(requirements), 1):.0%} of PRD)")
+        arch_ok = True
+    else:
+        # Material change: the architect missed too much of the PRD. Redo it on the full text.
+        arch.cancelled.set()
+        t = time.perf_counter()
+        architecture = architect_llm.chat(architect_messages(requirements)).strip()
+        sequential += time.perf_counter() - t
+        notes.append(f"architect restarted (missed {tail_ratio:.0%} of PRD)")
+        arch_ok = False
+
+    final_files = file_tree(architecture)
+    state.requirements = requirements
+    state.architecture = architecture
+    coder_missed = _missed(prd_for_coder, requirements)
+    if arch_ok and coder_missed <= MAX_PRD_TAIL_RATIO and final_files == partial_files:
+        coder_out = _finish(coder)
+        state.coder_prefetch = coder_out
+        sequential += coder.duration
+        notes.append(f"coder accepted ({len(partial_files)} files in tree)")
+    else:
+        # The coder node will call the model itself on the final inputs.
+        coder.cancelled.set()
+        if not arch_ok:
+            reason = "architecture redone"
+        elif coder_missed > MAX_PRD_TAIL_RATIO:
+            reason = f"missed {coder_missed:.0%} of PRD"
+        else:
+            reason = f"file tree changed: {partial_files} -> {final_files}"
+        notes.append(f"coder restarted ({reason})")
+
+    wall = time.perf_counter() - t0
+    saved = sequential - wall
+    _log(state, "pm", "PRD generated")
+    _log(state, "architect", "Architecture generated")
+    return _log(
+        state,
+        "speculative",
+        f"{'; '.join(notes)}; wall {wall:.2f}s vs sequential {sequential:.2f}s (saved {saved:.2f}s)",
+    )
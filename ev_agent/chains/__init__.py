@@ -1,5 +1,3 @@
-from .team_graph import build_team_graph
-
-__all__ = ["build_team_graph"]
-
+from .team_graph import RunContext, build_team_graph, get_team_graph, run_config
 
+__all__ = ["RunContext", "build_team_graph", "get_team_graph", "run_config"]
@@ -1,37 +1,303 @@
 from __future__ import annotations
 
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import END, StateGraph
 
-from ev_agent.agents.nodes import architect_node, coder_node, pm_node, qa_node, reviewer_node
-from ev_agent.schema import TeamState
+from ev_agent.agents.nodes import (
+    architect_node,
+    coder_node,
+    fast_fix_node,
+    fix_memory_node,
+    pm_node,
+    progress_node,
+    qa_node,
+    reviewer_node,
+)
+from ev_agent.agents.per_file import per_file_coder_node
+from ev_agent.agents.speculative import speculative_front
+from ev_agent.llm.base import LLMClient
+from ev_agent.llm.mock import MockLLM
+from ev_agent.llm.router import ModelRouter
+from ev_agent.llm.usage import MeteredLLM, RunUsage
+from ev_agent.schema import TeamGraphState, TeamState, categories
+from ev_agent.schema.team_state import TRACE_LIMIT, append_trace
+from ev_agent.utils.artifact_store import ArtifactStore
+from ev_agent.utils.fix_memory import FixMemory
+from ev_agent.utils.qa_cache import QACache
+
+
+def partial_update(before: dict, after: TeamState, *, trace_limit: int = TRACE_LIMIT) -> dict:
+    """
+    Turn a node's resulting TeamState into a LangGraph partial update: only keys whose value
+    changed (identity first, so untouched large values are never compared) plus the trace with
+    the node's new events appended (newest `trace_limit` kept).
+    """
+    update = {
+        k: v
+        for k, v in after.__dict__.items()
+        if k != "trace" and (k not in before or (v is not before[k] and v != before[k]))
+    }
+    if after.trace:
+        update["trace"] = append_trace(before.get("trace"), after.trace, trace_limit)
+    return update
+
+
+CONFIG_KEY = "ev_run"
+ESCALATED_TEMPERATURE = 0.7  # coder temperature once a stalled run is escalated
+
+
+@dataclass(frozen=True)
+class RunContext:
+    """Per-run dependencies, passed via `config["configurable"][CONFIG_KEY]` instead of closures."""
+
+    router: ModelRouter
+    workdir: Path
+    max_iters: int
+    fault_inject: bool = False
+    atomic_writes: bool = False
+    store: ArtifactStore | None = None
+    qa_cache: QACache | None = None
+    fix_memory: FixMemory | None = None  # known fixes per error signature, tried before the coder
+    fast_fix: bool = True  # rule-based local repair before the coder (no model call)
+    review_inline: bool = True  # False: the run ends at QA pass (review happens elsewhere or not at all)
+    speculative: bool = False  # overlap PM / Architect / Coder calls (real clients only)
+    coder_mode: str = "whole"  # "per_file": one concurrent call per file (real clients only)
+    coder_workers: int = 4
+    stall_repeats: int = 2  # same error this many times in a row = stalled (0: no stall detection)
+    budget_s: float = 0.0  # wall-clock budget checked before each fix pass (0: none)
+    token_budget: int = 0  # estimated LLM tokens (0: none)
+    trace_limit: int = TRACE_LIMIT  # trace events kept in state (0: all)
+    usage: RunUsage = field(default_factory=RunUsage)
+
+    def llm(self, node: str, iteration: int) -> LLMClient:
+        """The routed client for `node`, metered into this run's usage (MockLLM stays unwrapped)."""
+        client = self.router.for_node(node, iteration)
+        return client if isinstance(client, MockLLM) else MeteredLLM(client, self.usage)
+
+
+def run_config(ctx: RunContext) -> RunnableConfig:
+    return {"configurable": {CONFIG_KEY: ctx}}
+
+
+def _ctx(config: RunnableConfig) -> RunContext:
+    try:
+        return config["configurable"][CONFIG_KEY]
+    except (KeyError, TypeError):
+        raise ValueError(f"团队图缺少运行上下文：请通过 config['configurable']['{CONFIG_KEY}'] 传入 RunContext") from None
+
+
+def _node(fn: Callable[[TeamState, RunContext], TeamState]) -> Callable[[dict, RunnableConfig], dict]:
+    def run(state: dict, config: RunnableConfig) -> dict:
+        # Scratch model without revalidation; a fresh trace list collects only this node's events.
+        scratch = TeamState.model_construct(**{**state, "trace": []})
+        ctx = _ctx(config)
+        return partial_update(state, fn(scratch, ctx), trace_limit=ctx.trace_limit)
+
+    return run
+
+
+def _coder_iteration(state: TeamState) -> int:
+    # coder_node bumps the iteration before generating when it is fixing a QA failure.
+    return state.iteration + 1 if state.error_log else state.iteration
+
+
+def _front(state: TeamState, ctx: RunContext) -> TeamState:
+    pm = ctx.llm("pm", state.iteration)
+    if not ctx.speculative:
+        return pm_node(state, pm)
+    architect = ctx.llm("architect", state.iteration)
+    coder = ctx.llm("coder", state.iteration)
+    if any(isinstance(llm, MockLLM) for llm in (pm, architect, coder)):
+        # MockLLM output is canned per node; nothing to overlap.
+        return pm_node(state, pm)
+    return speculative_front(state, pm_llm=pm, architect_llm=architect, coder_llm=coder)
 
 
-def build_team_graph(*, llm_general, llm_coder, workdir, max_iters: int, fault_inject: bool = False):
-    graph = StateGraph(TeamState)
+def _coder(state: TeamState, ctx: RunContext) -> TeamState:
+    iteration = _coder_iteration(state)
+    if state.escalation:
+        # Stalled: next model up when the routing table has one, plus a hotter, wider-context prompt.
+        iteration = ctx.router.escalation_iteration("coder", iteration) or iteration
+    llm = ctx.llm("coder", iteration)
+    kwargs = {"workdir": ctx.workdir, "atomic_writes": ctx.atomic_writes, "store": ctx.store}
+    # A validated speculative prefetch is a whole-project answer; coder_node consumes it.
+    prefetched = state.coder_prefetch and not state.error_log
+    if state.escalation:
+        kwargs.update(temperature=ESCALATED_TEMPERATURE, wide_context=True)
+    if ctx.coder_mode == "per_file" and not isinstance(llm, MockLLM) and not prefetched:
+        return per_file_coder_node(state, llm, max_workers=ctx.coder_workers, **kwargs)
+    return coder_node(state, llm, **kwargs)
 
-    # Wrap nodes to inject deps
-    graph.add_node("pm", lambda s: pm_node(s, llm_general))
-    graph.add_node("architect", lambda s: architect_node(s, llm_general))
-    graph.add_node("coder", lambda s: coder_node(s, llm_coder, workdir=workdir))
-    graph.add_node("qa", lambda s: qa_node(s, workdir=workdir, fault_inject=fault_inject))
-    graph.add_node("reviewer", lambda s: reviewer_node(s, llm_general, workdir=workdir))
+
+def _route_after_coder(state: dict, config: RunnableConfig) -> str:
+    # A protocol failure left nothing to check: skip QA / fix memory / fast fix and reprompt.
+    if "protocol" in categories(state.get("diagnostics") or []):
+        return _route_on_verdict(state, _ctx(config))
+    return "qa"
+
+
+def _route_after_qa(state: dict, config: RunnableConfig) -> str:
+    ctx = _ctx(config)
+    if ctx.fix_memory is not None:
+        return "fix_memory"
+    return _route_on_verdict(state, ctx)
+
+
+def _route_after_fix_memory(state: dict, config: RunnableConfig) -> str:
+    if (state.get("fix_memory_state") or {}).get("applied"):
+        return "qa"  # verify the known fix
+    return _route_on_verdict(state, _ctx(config))
+
+
+def _route_after_fast_fix(state: dict, config: RunnableConfig) -> str:
+    return "qa" if not state.get("error_log") else _route_on_verdict(state, _ctx(config))
+
+
+def _route_after_progress(state: dict, config: RunnableConfig) -> str:
+    return END if state.get("stop_reason") else "coder"
+
+
+def _route_on_verdict(state: dict, ctx: RunContext) -> str:
+    if not state.get("error_log"):
+        return "reviewer" if ctx.review_inline else END
+    found = categories(state.get("diagnostics") or [])
+    # Syntax failures get the local pass first; it costs no iteration, so it also runs when the
+    # budget is spent.
+    if ctx.fast_fix and "syntax" in found and state.get("fast_fix_iteration", -1) != state.get("iteration", 0):
+        return "fast_fix"
+    if state.get("iteration", 0) >= ctx.max_iters:
+        return END
+    return "progress"
+
+
+def compile_team_graph():
+    """
+    Build and compile the PM -> Architect -> Coder <-> QA -> Reviewer graph.
+
+    The compiled graph holds no per-run state: nodes read their `RunContext` from the
+    invocation config, so one instance can serve any number of (concurrent) runs.
+    """
+    graph = StateGraph(TeamGraphState)
+
+    # The router picks the client per node and iteration.
+    graph.add_node("pm", _node(_front))
+    graph.add_node(
+        "architect", _node(lambda s, c: architect_node(s, c.llm("architect", s.iteration)))
+    )
+    graph.add_node("coder", _node(_coder))
+    graph.add_node("qa", _node(lambda s, c: qa_node(s, workdir=c.workdir, fault_inject=c.fault_inject, qa_cache=c.qa_cache)))
+    graph.add_node(
+        "fix_memory",
+        _node(
+            lambda s, c: fix_memory_node(
+                s, workdir=c.workdir, memory=c.fix_memory, atomic_writes=c.atomic_writes, store=c.store
+            )
+        ),
+    )
+    graph.add_node(
+        "fast_fix",
+        _node(lambda s, c: fast_fix_node(s, workdir=c.workdir, atomic_writes=c.atomic_writes, store=c.store)),
+    )
+    graph.add_node(
+        "progress",
+        _node(
+            lambda s, c: progress_node(
+                s,
+                workdir=c.workdir,
+                usage=c.usage,
+                stall_repeats=c.stall_repeats,
+                budget_s=c.budget_s,
+                token_budget=c.token_budget,
+            )
+        ),
+    )
+    graph.add_node(
+        "reviewer",
+        _node(lambda s, c: reviewer_node(s, c.llm("reviewer", s.iteration), workdir=c.workdir)),
+    )
 
     graph.set_entry_point("pm")
     graph.add_edge("pm", "architect")
     graph.add_edge("architect", "coder")
-    graph.add_edge("coder", "qa")
+    verdict = {"progress": "progress", "fast_fix": "fast_fix", "reviewer": "reviewer", END: END}
+    graph.add_conditional_edges("coder", _route_after_coder, {**verdict, "qa": "qa"})
+    graph.add_conditional_edges("qa", _route_after_qa, {**verdict, "fix_memory": "fix_memory"})
+    graph.add_conditional_edges("fix_memory", _route_after_fix_memory, {**verdict, "qa": "qa"})
+    graph.add_conditional_edges("fast_fix", _route_after_fast_fix, {**verdict, "qa": "qa"})
+    graph.add_conditional_edges("progress", _route_after_progress, {"coder": "coder", END: END})
+    graph.add_edge("reviewer", END)
 
-    def route_after_qa(state: TeamState) -> str:
-        if state.error_log:
-            if state.iteration >= max_iters:
-                return END
-            return "coder"
-        return "reviewer"
+    return graph.compile()
 
-    graph.add_conditional_edges("qa", route_after_qa, {"coder": "coder", "reviewer": "reviewer", END: END})
-    graph.add_edge("reviewer", END)
 
-    compiled = graph.compile()
-    return compiled
+_COMPILED = None
+_COMPILED_LOCK = threading.Lock()
+
+
+def get_team_graph():
+    """The process-wide compiled team graph (compiled once, on first use)."""
+    global _COMPILED
+    if _COMPILED is None:
+        with _COMPILED_LOCK:
+            if _COMPILED is None:
+                _COMPILED = compile_team_graph()
+    return _COMPILED
+
 
+def build_team_graph(
+    *,
+    workdir,
+    max_iters: int,
+    router: ModelRouter | None = None,
+    llm_general=None,
+    llm_coder=None,
+    fault_inject: bool = False,
+    atomic_writes: bool = False,
+    store: ArtifactStore | None = None,
+    qa_cache: QACache | None = None,
+    fix_memory: FixMemory | None = None,
+    fast_fix: bool = True,
+    review_inline: bool = True,
+    speculative: bool = False,
+    coder_mode: str = "whole",
+    coder_workers: int = 4,
+    stall_repeats: int = 2,
+    budget_s: float = 0.0,
+    token_budget: int = 0,
+    trace_limit: int = TRACE_LIMIT,
+):
+    """
+    The shared team graph bound to one run's dependencies (a cheap config copy, no recompilation).
 
+    Pass a `router` (per-node, per-iteration model routing) or, for simple setups, the
+    historical `llm_general` / `llm_coder` pair.
+    """
+    if router is None:
+        if llm_general is None or llm_coder is None:
+            raise ValueError("build_team_graph 需要 router，或同时提供 llm_general 与 llm_coder")
+        router = ModelRouter.fixed(llm_general, llm_coder)
+    ctx = RunContext(
+        router=router,
+        workdir=Path(workdir),
+        max_iters=max_iters,
+        fault_inject=fault_inject,
+        atomic_writes=atomic_writes,
+        store=store,
+        qa_cache=qa_cache,
+        fix_memory=fix_memory,
+        fast_fix=fast_fix,
+        review_inline=review_inline,
+        speculative=speculative,
+        coder_mode=coder_mode,
+        coder_workers=coder_workers,
+        stall_repeats=stall_repeats,
+        budget_s=budget_s,
+        token_budget=token_budget,
+        trace_limit=trace_limit,
+    )
+    return get_team_graph().with_config(run_config(ctx))
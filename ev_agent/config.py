@@ -1,11 +1,29 @@
 from __future__ import annotations
 
+import json
 import os
 from dataclasses import dataclass
 from pathlib import Path
 
 from dotenv import load_dotenv
 
+ROUTE_NODES = ("pm", "architect", "coder", "reviewer")
+CASSETTE_MODES = ("off", "record", "replay")
+REVIEW_MODES = ("inline", "async", "off")
+CODER_MODES = ("whole", "per_file")
+
+
+@dataclass(frozen=True)
+class ModelRoute:
+    """One routing rule: `node` is served by backend/model from `min_iteration` on (escalation)."""
+
+    node: str  # pm | architect | coder | reviewer | "*"
+    backend: str
+    model: str | None = None
+    temperature: float = 0.2
+    max_tokens: int | None = None
+    min_iteration: int = 0
+
 
 @dataclass(frozen=True)
 class Settings:
@@ -18,14 +36,51 @@ class Settings:
 
     anthropic_api_key: str | None
     anthropic_model: str
+    anthropic_base_url: str
 
     openai_api_key: str | None
     openai_model: str
+    openai_base_url: str
+
+    # Client-side limits, applied per backend and shared by every client of that backend
+    llm_rpm: float
+    llm_tpm: float
+    llm_max_inflight: int
+    llm_max_retries: int
+
+    # Ordered fallback backends ("backend:model") tried after the primary; optional hedging
+    llm_fallback: tuple[str, ...]
+    llm_hedge_ms: float
+    llm_hedge_roles: tuple[str, ...]
+
+    # Record live LLM traffic to a cassette, or replay one offline ("off" | "record" | "replay")
+    cassette_mode: str
+    cassette_path: Path
+    cassette_latency: str | float | None
+
+    # Per-node routing table (user rules from EV_ROUTES first, then defaults)
+    routes: tuple[ModelRoute, ...]
 
     max_iters: int
+    stall_repeats: int
+    run_budget_s: float
+    run_token_budget: int
+    run_deadline_s: float
     workdir: Path
+    atomic_writes: bool
     fault_inject: bool
+    fast_fix: bool
+    coder_mode: str
+    coder_workers: int
+    review_mode: str
+    speculative: bool
     log_dir: Path
+    trace_limit: int
+    artifact_dir: Path | None
+    qa_cache_path: Path | None
+    fix_memory_path: Path | None
+    service_dir: Path
+    service_workers: int
 
 
 def load_settings() -> Settings:
@@ -47,14 +102,63 @@ def load_settings() -> Settings:
 
     anthropic_api_key = getenv("ANTHROPIC_API_KEY", None)
     anthropic_model = getenv("EV_ANTHROPIC_MODEL", "claude-3-5-sonnet-latest") or ""
+    anthropic_base_url = getenv("EV_ANTHROPIC_BASE_URL", "https://api.anthropic.com/v1") or ""
 
     openai_api_key = getenv("OPENAI_API_KEY", None)
     openai_model = getenv("EV_OPENAI_MODEL", "gpt-4o-mini") or ""
+    openai_base_url = getenv("EV_OPENAI_BASE_URL", "https://api.openai.com/v1") or ""
+
+    llm_rpm = float(getenv("EV_LLM_RPM", "0") or "0")
+    llm_tpm = float(getenv("EV_LLM_TPM", "0") or "0")
+    llm_max_inflight = int(getenv("EV_LLM_MAX_INFLIGHT", "4") or "4")
+    llm_max_retries = int(getenv("EV_LLM_MAX_RETRIES", "4") or "4")
+
+    llm_fallback = tuple(x.strip() for x in (getenv("EV_LLM_FALLBACK", "") or "").split(",") if x.strip())
+    llm_hedge_ms = float(getenv("EV_LLM_HEDGE_MS", "0") or "0")
+    llm_hedge_roles = tuple(
+        x.strip().lower() for x in (getenv("EV_LLM_HEDGE_ROLES", "coder") or "").split(",") if x.strip()
+    )
+
+    general_model = ollama_model_general if llm_backend == "ollama" else None
+    coder_model = ollama_model_coder if llm_backend == "ollama" else None
+    routes = _parse_routes(getenv("EV_ROUTES", "") or "") + tuple(
+        ModelRoute(node=n, backend=llm_backend, model=coder_model if n == "coder" else general_model)
+        for n in ROUTE_NODES
+    )
+
+    cassette_mode = (getenv("EV_CASSETTE_MODE", "off") or "off").strip().lower()
+    if cassette_mode not in CASSETTE_MODES:
+        raise ValueError(f"未知 EV_CASSETTE_MODE={cassette_mode!r}，可选：{'|'.join(CASSETTE_MODES)}")
+    cassette_path = Path(getenv("EV_CASSETTE", "cassette.jsonl") or "cassette.jsonl").resolve()
+    cassette_latency = _parse_cassette_latency(getenv("EV_CASSETTE_LATENCY", "") or "")
 
     max_iters = int(getenv("EV_MAX_ITERS", "3") or "3")
+    stall_repeats = int(getenv("EV_STALL_REPEATS", "2") or "2")
+    run_budget_s = float(getenv("EV_RUN_BUDGET_S", "0") or "0")
+    run_token_budget = int(getenv("EV_RUN_TOKEN_BUDGET", "0") or "0")
+    run_deadline_s = float(getenv("EV_RUN_DEADLINE_S", "0") or "0")
     workdir = Path(getenv("EV_WORKDIR", "game") or "game").resolve()
+    atomic_writes = (getenv("EV_ATOMIC_WRITES", "0") or "0").strip().lower() in {"1", "true", "yes", "y"}
     fault_inject = (getenv("EV_FAULT_INJECT", "0") or "0").strip().lower() in {"1", "true", "yes", "y"}
+    fast_fix = (getenv("EV_FAST_FIX", "1") or "1").strip().lower() in {"1", "true", "yes", "y"}
+    coder_mode = (getenv("EV_CODER_MODE", "whole") or "whole").strip().lower()
+    if coder_mode not in CODER_MODES:
+        raise ValueError(f"未知 EV_CODER_MODE={coder_mode!r}，可选：{'|'.join(CODER_MODES)}")
+    coder_workers = max(1, int(getenv("EV_CODER_WORKERS", "4") or "4"))
+    review_mode = (getenv("EV_REVIEW_MODE", "inline") or "inline").strip().lower()
+    if review_mode not in REVIEW_MODES:
+        raise ValueError(f"未知 EV_REVIEW_MODE={review_mode!r}，可选：{'|'.join(REVIEW_MODES)}")
+    speculative = (getenv("EV_SPECULATIVE", "0") or "0").strip().lower() in {"1", "true", "yes", "y"}
     log_dir = Path(getenv("EV_LOG_DIR", "logs") or "logs").resolve()
+    trace_limit = int(getenv("EV_TRACE_LIMIT", "200") or "200")
+    artifact_dir_raw = getenv("EV_ARTIFACT_DIR", "") or ""
+    artifact_dir = Path(artifact_dir_raw).resolve() if artifact_dir_raw else None
+    qa_cache_raw = getenv("EV_QA_CACHE", "") or ""
+    qa_cache_path = Path(qa_cache_raw).resolve() if qa_cache_raw else None
+    fix_memory_raw = getenv("EV_FIX_MEMORY", "") or ""
+    fix_memory_path = Path(fix_memory_raw).resolve() if fix_memory_raw else None
+    service_dir = Path(getenv("EV_SERVICE_DIR", ".ev_service") or ".ev_service").resolve()
+    service_workers = max(1, int(getenv("EV_SERVICE_WORKERS", "2") or "2"))
 
     return Settings(
         llm_backend=llm_backend,
@@ -64,12 +168,89 @@ def load_settings() -> Settings:
         ollama_model_coder=ollama_model_coder,
         anthropic_api_key=anthropic_api_key,
         anthropic_model=anthropic_model,
+        anthropic_base_url=anthropic_base_url,
         openai_api_key=openai_api_key,
         openai_model=openai_model,
+        openai_base_url=openai_base_url,
+        llm_rpm=llm_rpm,
+        llm_tpm=llm_tpm,
+        llm_max_inflight=llm_max_inflight,
+        llm_max_retries=llm_max_retries,
+        llm_fallback=llm_fallback,
+        llm_hedge_ms=llm_hedge_ms,
+        llm_hedge_roles=llm_hedge_roles,
+        cassette_mode=cassette_mode,
+        cassette_path=cassette_path,
+        cassette_latency=cassette_latency,
+        routes=routes,
         max_iters=max_iters,
+        stall_repeats=stall_repeats,
+        run_budget_s=run_budget_s,
+        run_token_budget=run_token_budget,
+        run_deadline_s=run_deadline_s,
         workdir=workdir,
+        atomic_writes=atomic_writes,
         fault_inject=fault_inject,
+        fast_fix=fast_fix,
+        coder_mode=coder_mode,
+        coder_workers=coder_workers,
+        review_mode=review_mode,
+        speculative=speculative,
         log_dir=log_dir,
+        trace_limit=trace_limit,
+        artifact_dir=artifact_dir,
+        qa_cache_path=qa_cache_path,
+        fix_memory_path=fix_memory_path,
+        service_dir=service_dir,
+        service_workers=service_workers,
     )
 
 
+def _parse_routes(raw: str) -> tuple[ModelRoute, ...]:
+    """
+    Parse EV_ROUTES: a JSON list of rules, or `@path` to a JSON file, e.g.
+    [{"node": "coder", "backend": "ollama", "model": "qwen2.5-coder:7b"},
+     {"node": "coder", "min_iteration": 2, "backend": "openai", "model": "gpt-4o", "max_tokens": 8192}]
+    """
+    raw = raw.strip()
+    if not raw:
+        return ()
+    if raw.startswith("@"):
+        raw = Path(raw[1:]).read_text(encoding="utf-8")
+    try:
+        items = json.loads(raw)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"EV_ROUTES 不是合法 JSON：{e}") from e
+    if not isinstance(items, list):
+        raise ValueError("EV_ROUTES 必须是 JSON 数组")
+
+    routes: list[ModelRoute] = []
+    for it in items:
+        node = str(it.get("node", "")).strip().lower()
+        if node not in ROUTE_NODES and node != "*":
+            raise ValueError(f"EV_ROUTES 未知 node={node!r}，可选：{'|'.join(ROUTE_NODES)}|*")
+        if not it.get("backend"):
+            raise ValueError(f"EV_ROUTES 规则缺少 backend：{it!r}")
+        routes.append(
+            ModelRoute(
+                node=node,
+                backend=str(it["backend"]).strip().lower(),
+                model=it.get("model") or None,
+                temperature=float(it.get("temperature", 0.2)),
+                max_tokens=int(it["max_tokens"]) if it.get("max_tokens") else None,
+                min_iteration=int(it.get("min_iteration", 0)),
+            )
+        )
+    return tuple(routes)
+
+
+def _parse_cassette_latency(raw: str) -> str | float | None:
+    raw = raw.strip().lower()
+    if raw in ("", "0", "none", "off"):
+        return None
+    if raw == "recorded":
+        return "recorded"
+    try:
+        return max(float(raw), 0.0)
+    except ValueError:
+        raise ValueError(f"EV_CASSETTE_LATENCY 需为 recorded 或秒数，收到 {raw!r}") from None
@@ -1,6 +1,53 @@
-from .base import ChatMessage, LLMClient
-from .factory import build_llm, build_llms
+from __future__ import annotations
 
-__all__ = ["ChatMessage", "LLMClient", "build_llm", "build_llms"]
+from importlib import import_module
+from typing import TYPE_CHECKING
 
+from .base import ChatMessage, LLMClient, stream_chat
 
+if TYPE_CHECKING:
+    from .factory import build_llm, build_llms
+    from .fallback import FallbackLLM
+    from .limiter import limiter_metrics
+    from .router import ModelRouter, build_router
+    from .usage import MeteredLLM, RunUsage
+
+# Everything beyond the protocol types resolves on first access (PEP 562), so importing
+# `ev_agent.llm` does not pull in httpx/tenacity or any backend module.
+_LAZY = {
+    "FallbackLLM": ".fallback",
+    "ModelRouter": ".router",
+    "build_llm": ".factory",
+    "build_llms": ".factory",
+    "build_router": ".router",
+    "limiter_metrics": ".limiter",
+    "MeteredLLM": ".usage",
+    "RunUsage": ".usage",
+}
+
+__all__ = [
+    "ChatMessage",
+    "LLMClient",
+    "ModelRouter",
+    "FallbackLLM",
+    "build_llm",
+    "build_llms",
+    "build_router",
+    "limiter_metrics",
+    "MeteredLLM",
+    "RunUsage",
+    "stream_chat",
+]
+
+
+def __getattr__(name: str):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
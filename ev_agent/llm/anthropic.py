@@ -1,11 +1,15 @@
 from __future__ import annotations
 
-import httpx
+import json
+from typing import Iterator
+
+from ev_agent.utils.deadline import check_deadline
 
 from .base import ChatMessage
+from .http import PooledHTTP
 
 
-class AnthropicLLM:
+class AnthropicLLM(PooledHTTP):
     """Minimal Anthropic Messages API client via raw HTTP."""
 
     def __init__(
@@ -15,21 +19,22 @@ class AnthropicLLM:
         model: str,
         base_url: str = "https://api.anthropic.com/v1",
         timeout_s: float = 120.0,
+        max_tokens: int | None = None,
     ) -> None:
         self.api_key = api_key
         self.model = model
         self.base_url = base_url.rstrip("/")
         self.timeout_s = timeout_s
+        # The Messages API requires max_tokens; keep the historical default when unset.
+        self.max_tokens = max_tokens or 2048
 
-    def chat(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> str:
+    def _request(self, messages: list[ChatMessage], temperature: float) -> tuple[dict, dict]:
         # Anthropic "messages" API: separate system string; user/assistant messages list.
         system = "\n".join([m.content for m in messages if m.role == "system"]).strip()
         convo = [{"role": m.role, "content": m.content} for m in messages if m.role != "system"]
-
-        url = f"{self.base_url}/messages"
         payload = {
             "model": self.model,
-            "max_tokens": 2048,
+            "max_tokens": self.max_tokens,
             "temperature": temperature,
             "system": system or None,
             "messages": convo,
@@ -39,10 +44,14 @@ class AnthropicLLM:
             "anthropic-version": "2023-06-01",
             "content-type": "application/json",
         }
-        with httpx.Client(timeout=self.timeout_s) as client:
-            r = client.post(url, json=payload, headers=headers)
-            r.raise_for_status()
-            data = r.json()
+        return payload, headers
+
+    def chat(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> str:
+        url = f"{self.base_url}/messages"
+        payload, headers = self._request(messages, temperature)
+        r = self.http.post(url, json=payload, headers=headers, timeout=self.request_timeout())
+        r.raise_for_status()
+        data = r.json()
 
         # Anthropic returns: content: [{type:"text", text:"..."}]
         blocks = data.get("content") or []
@@ -52,4 +61,22 @@ class AnthropicLLM:
                 texts.append((b or {}).get("text", ""))
         return "\n".join(t for t in texts if t)
 
-
+    def stream(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> Iterator[str]:
+        # Server-sent events; text arrives as content_block_delta / text_delta.
+        url = f"{self.base_url}/messages"
+        payload, headers = self._request(messages, temperature)
+        payload["stream"] = True
+        with self.http.stream("POST", url, json=payload, headers=headers, timeout=self.request_timeout()) as r:
+            r.raise_for_status()
+            for line in r.iter_lines():
+                check_deadline()
+                if not line.startswith("data:"):
+                    continue
+                event = json.loads(line[5:].strip() or "{}")
+                if event.get("type") == "message_stop":
+                    break
+                if event.get("type") != "content_block_delta":
+                    continue
+                chunk = (event.get("delta") or {}).get("text") or ""
+                if chunk:
+                    yield chunk
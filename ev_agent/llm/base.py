@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Protocol
+from typing import Iterator, Protocol
 
 
 @dataclass(frozen=True)
@@ -16,3 +16,15 @@ class LLMClient(Protocol):
         raise NotImplementedError
 
 
+def stream_chat(llm: LLMClient, messages: list[ChatMessage], *, temperature: float | None = None) -> Iterator[str]:
+    """
+    Yield output chunks as they arrive.
+    Clients exposing `stream()` are streamed; others yield their full `chat()` result once.
+    `temperature` is only forwarded when set, so a wrapped client's own default (e.g. a route's) applies.
+    """
+    kw = {} if temperature is None else {"temperature": temperature}
+    stream = getattr(llm, "stream", None)
+    if stream is None:
+        yield llm.chat(messages, **kw)
+        return
+    yield from stream(messages, **kw)
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator
+
+from .base import ChatMessage, LLMClient, stream_chat
+
+# Cassette format: JSONL, one interaction per line:
+#   {"key", "label", "messages", "temperature", "response", "latency_s", "ttft_s", "ts"}
+# `key` hashes the request messages only (not temperature or backend), so a cassette recorded
+# through any route/fallback setup replays under any other. Absolute paths are masked before
+# hashing: QA output quoted into the coder prompt names the workdir, which differs per run.
+# Repeated identical requests are served in recorded order; once exhausted, replay cycles.
+
+
+class CassetteMiss(LookupError):
+    """Replay was asked for a request that the cassette never recorded."""
+
+
+_ABS_PATH_RE = re.compile(r"(?<![\w.])(?:[A-Za-z]:)?(?:[\\/][\w.\-]+){2,}[\\/]?")
+
+
+def request_key(messages: list[ChatMessage]) -> str:
+    payload = json.dumps(
+        [[m.role, _ABS_PATH_RE.sub("<path>", m.content)] for m in messages],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CassetteWriter:
+    """Thread-safe appender shared by every RecordingLLM of a process."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def write(
+        self,
+        label: str,
+        messages: list[ChatMessage],
+        temperature: float | None,
+        response: str,
+        latency_s: float,
+        ttft_s: float | None = None,
+    ) -> None:
+        rec = {
+            "key": request_key(messages),
+            "label": label,
+            "messages": [{"role": m.role, "content": m.content} for m in messages],
+            "temperature": temperature,
+            "response": response,
+            "latency_s": round(latency_s, 4),
+            "ttft_s": round(ttft_s, 4) if ttft_s is not None else None,
+            "ts": datetime.utcnow().isoformat(),
+        }
+        line = json.dumps(rec, ensure_ascii=False) + "\n"
+        with self._lock:
+            # Append + flush per interaction: a crashed live run still leaves a usable prefix.
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(line)
+            self.count += 1
+
+
+class RecordingLLM:
+    """Pass-through client that saves every request/response pair of `inner` to a cassette."""
+
+    def __init__(self, inner: LLMClient, writer: CassetteWriter, *, label: str = "") -> None:
+        self.inner = inner
+        self.writer = writer
+        self.label = label
+
+    def chat(self, messages: list[ChatMessage], *, temperature: float | None = None) -> str:
+        t0 = time.perf_counter()
+        out = self.inner.chat(messages, **_temp(temperature))
+        self.writer.write(self.label, messages, temperature, out, time.perf_counter() - t0)
+        return out
+
+    def stream(self, messages: list[ChatMessage], *, temperature: float | None = None) -> Iterator[str]:
+        t0 = time.perf_counter()
+        ttft: float | None = None
+        chunks: list[str] = []
+        for chunk in stream_chat(self.inner, messages, **_temp(temperature)):
+            if ttft is None:
+                ttft = time.perf_counter() - t0
+            chunks.append(chunk)
+            yield chunk
+        self.writer.write(self.label, messages, temperature, "".join(chunks), time.perf_counter() - t0, ttft)
+
+
+class ReplayLLM:
+    """
+    Serve recorded responses deterministically, without any network access.
+
+    `latency`: None/0 replays instantly, "recorded" sleeps for each interaction's recorded
+    latency, a number sleeps that many seconds per call.
+    """
+
+    def __init__(self, path: Path, *, latency: str | float | None = None) -> None:
+        if not path.exists():
+            raise FileNotFoundError(f"cassette 不存在: {path}")
+        self.path = path
+        self.latency = latency
+        self._records: dict[str, list[dict]] = {}
+        with path.open("r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    rec = json.loads(line)
+                    self._records.setdefault(rec["key"], []).append(rec)
+        self._served: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self._records.values())
+
+    def _next(self, messages: list[ChatMessage]) -> dict:
+        key = request_key(messages)
+        recs = self._records.get(key)
+        if not recs:
+            last_user = next((m.content for m in reversed(messages) if m.role == "user"), "")
+            raise CassetteMiss(f"cassette 中没有该请求的录制（key={key[:12]}）：{last_user[:80]!r}")
+        with self._lock:
+            i = self._served.get(key, 0)
+            self._served[key] = i + 1
+        return recs[i % len(recs)]
+
+    def _delay(self, rec: dict) -> float:
+        if not self.latency:
+            return 0.0
+        if self.latency == "recorded":
+            return float(rec.get("latency_s") or 0.0)
+        return float(self.latency)
+
+    def chat(self, messages: list[ChatMessage], *, temperature: float | None = None) -> str:
+        rec = self._next(messages)
+        delay = self._delay(rec)
+        if delay:
+            time.sleep(delay)
+        return rec["response"]
+
+    def stream(self, messages: list[ChatMessage], *, temperature: float | None = None) -> Iterator[str]:
+        rec = self._next(messages)
+        delay = self._delay(rec)
+        text = rec["response"]
+        chunks = [text[i : i + 64] for i in range(0, len(text), 64)] or [""]
+        ttft = min(float(rec.get("ttft_s") or 0.0), delay) if self.latency == "recorded" else 0.0
+        if ttft:
+            time.sleep(ttft)
+        per_chunk = (delay - ttft) / len(chunks)
+        for chunk in chunks:
+            yield chunk
+            if per_chunk:
+                time.sleep(per_chunk)
+
+
+def _temp(temperature: float | None) -> dict:
+    # Let the wrapped client (e.g. a RoutedLLM) apply its own default when none was given.
+    return {} if temperature is None else {"temperature": temperature}
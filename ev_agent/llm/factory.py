@@ -2,43 +2,114 @@ from __future__ import annotations
 
 from ev_agent.config import Settings
 
-from .anthropic import AnthropicLLM
 from .mock import MockLLM
-from .ollama import OllamaLLM
-from .openai_compat import OpenAICompatLLM
 
+# Backend modules (and httpx behind them) are imported in the branch that needs them.
 
-def build_llm(settings: Settings):
-    backend = settings.llm_backend
+
+def _limited(settings: Settings, key: str, client):
+    """Wrap a network client with the limiter shared by every client of the same backend."""
+    from .limiter import RateLimitedLLM, get_limiter
+
+    limiter = get_limiter(
+        key,
+        rpm=settings.llm_rpm,
+        tpm=settings.llm_tpm,
+        max_inflight=settings.llm_max_inflight,
+    )
+    return RateLimitedLLM(client, limiter, max_attempts=settings.llm_max_retries)
+
+
+def build_backend(
+    settings: Settings,
+    backend: str,
+    model: str | None = None,
+    *,
+    max_tokens: int | None = None,
+):
+    """Build one client for `backend`, using `model` or the backend's configured default."""
+    backend = backend.strip().lower()
     if backend == "mock":
         return MockLLM()
     if backend == "ollama":
-        return OllamaLLM(base_url=settings.ollama_base_url, model=settings.ollama_model)
+        from .ollama import OllamaLLM
+
+        client = OllamaLLM(
+            base_url=settings.ollama_base_url,
+            model=model or settings.ollama_model,
+            max_tokens=max_tokens,
+        )
+        return _limited(settings, f"ollama:{client.base_url}", client)
     if backend == "anthropic":
         if not settings.anthropic_api_key:
             raise RuntimeError("ANTHROPIC_API_KEY 未配置，但 EV_LLM_BACKEND=anthropic")
-        return AnthropicLLM(api_key=settings.anthropic_api_key, model=settings.anthropic_model)
+        from .anthropic import AnthropicLLM
+
+        client = AnthropicLLM(
+            api_key=settings.anthropic_api_key,
+            model=model or settings.anthropic_model,
+            base_url=settings.anthropic_base_url,
+            max_tokens=max_tokens,
+        )
+        return _limited(settings, f"anthropic:{client.base_url}", client)
     if backend == "openai":
         if not settings.openai_api_key:
             raise RuntimeError("OPENAI_API_KEY 未配置，但 EV_LLM_BACKEND=openai")
-        return OpenAICompatLLM(api_key=settings.openai_api_key, model=settings.openai_model)
+        from .openai_compat import OpenAICompatLLM
+
+        client = OpenAICompatLLM(
+            api_key=settings.openai_api_key,
+            model=model or settings.openai_model,
+            base_url=settings.openai_base_url,
+            max_tokens=max_tokens,
+        )
+        return _limited(settings, f"openai:{client.base_url}", client)
     raise ValueError(f"未知 EV_LLM_BACKEND={backend!r}，可选：mock|ollama|anthropic|openai")
 
 
+def parse_backend_spec(spec: str) -> tuple[str, str | None]:
+    """'ollama:qwen2.5-coder:7b' -> ('ollama', 'qwen2.5-coder:7b'); 'openai' -> ('openai', None)."""
+    backend, _, model = spec.strip().partition(":")
+    return backend.strip().lower(), (model.strip() or None)
+
+
+def with_fallback(settings: Settings, primary, *, role: str, name: str | None = None):
+    """Compose `primary` with EV_LLM_FALLBACK backends; hedge when the role is listed."""
+    if not settings.llm_fallback or isinstance(primary, MockLLM):
+        return primary
+    from .fallback import FallbackLLM
+
+    clients = [(f"{name or settings.llm_backend}(primary)", primary)]
+    for spec in settings.llm_fallback:
+        backend, model = parse_backend_spec(spec)
+        clients.append((spec, build_backend(settings, backend, model)))
+    hedge_s = settings.llm_hedge_ms / 1000.0 if role in settings.llm_hedge_roles else None
+    return FallbackLLM(clients, hedge_after_s=hedge_s)
+
+
+def build_llm(settings: Settings):
+    return build_backend(settings, settings.llm_backend)
+
+
 def build_llms(settings: Settings):
     """
     Build (general_llm, coder_llm).
 
     - For Ollama: can use different models per role via EV_OLLAMA_MODEL_GENERAL / EV_OLLAMA_MODEL_CODER
     - For other backends: returns the same client twice.
+    - Network clients are rate-limited per backend (EV_LLM_RPM / EV_LLM_TPM / EV_LLM_MAX_INFLIGHT).
+    - With EV_LLM_FALLBACK set, each role fails over (and optionally hedges) to further backends.
     """
     backend = settings.llm_backend
     if backend == "ollama":
-        general = OllamaLLM(base_url=settings.ollama_base_url, model=settings.ollama_model_general)
-        coder = OllamaLLM(base_url=settings.ollama_base_url, model=settings.ollama_model_coder)
-        return general, coder
-
-    llm = build_llm(settings)
-    return llm, llm
-
+        general = build_backend(settings, "ollama", settings.ollama_model_general)
+        coder = build_backend(settings, "ollama", settings.ollama_model_coder)
+    else:
+        general = coder = build_llm(settings)
 
+    if settings.llm_fallback:
+        return (
+            with_fallback(settings, general, role="general"),
+            with_fallback(settings, coder, role="coder"),
+        )
+    return general, coder
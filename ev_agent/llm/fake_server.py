@@ -0,0 +1,363 @@
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from .base import ChatMessage
+
+# Local stand-in for the three chat protocols the backends speak, for load/latency testing
+# without network access. Point the clients at it:
+#   EV_OLLAMA_BASE_URL=http://127.0.0.1:11999
+#   EV_OPENAI_BASE_URL=http://127.0.0.1:11999/v1     (OPENAI_API_KEY=any)
+#   EV_ANTHROPIC_BASE_URL=http://127.0.0.1:11999/v1  (ANTHROPIC_API_KEY=any)
+#
+# Routes: POST /api/chat (Ollama, NDJSON when streaming), POST [/v1]/chat/completions (OpenAI,
+# SSE), POST [/v1]/messages (Anthropic, SSE), GET /stats, POST /stats/reset.
+
+_CHARS_PER_TOKEN = 4
+
+_CANNED_MAIN = '''import random
+
+
+def step(snake, direction, size=20):
+    head = ((snake[0][0] + direction[0]) % size, (snake[0][1] + direction[1]) % size)
+    return [head] + snake[:-1]
+
+
+def main():
+    snake = [(5, 5), (4, 5), (3, 5)]
+    for _ in range(10):
+        snake = step(snake, random.choice([(1, 0), (0, 1)]))
+    print("snake:", snake)
+
+
+if __name__ == "__main__":
+    main()
+'''
+
+
+@dataclass(frozen=True)
+class FakeServerConfig:
+    """
+    Behaviour knobs. Latency is time-to-first-token; streaming then emits tokens at
+    `tokens_per_s` (0 = all at once). Non-streaming responses wait for the full generation.
+    """
+
+    latency_ms: float = 200.0
+    latency_dist: str = "lognormal"  # fixed | uniform | lognormal
+    latency_jitter: float = 0.5  # uniform: +-fraction; lognormal: sigma
+    tokens_per_s: float = 200.0
+    error_rate: float = 0.0  # fraction of requests answered with 500
+    throttle_rate: float = 0.0  # fraction of requests answered with 429 + Retry-After
+    retry_after_s: float = 1.0
+    script: tuple[tuple[str, str], ...] = ()  # (regex on the last user message, response), first match wins
+    cassette: Path | None = None  # serve recorded responses (see ev_agent.llm.cassette)
+    seed: int | None = None
+
+
+@dataclass
+class _Stats:
+    requests: int = 0
+    streamed: int = 0
+    errors: int = 0
+    throttled: int = 0
+    by_protocol: dict[str, int] = field(default_factory=dict)
+    tokens_out: int = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        return dict(self.__dict__)
+
+
+def default_response(messages: list[ChatMessage]) -> str:
+    """Canned replies good enough to drive the whole team graph to a QA pass."""
+    system = next((m.content for m in messages if m.role == "system"), "")
+    if '"files"' in system:
+        return json.dumps(
+            {"files": [{"path": "main.py", "content": _CANNED_MAIN}], "notes": "fake server"},
+            ensure_ascii=False,
+        )
+    last_user = next((m.content for m in reversed(messages) if m.role == "user"), "")
+    return f"[fake-llm] {len(last_user)} chars received.\n- point one\n- point two\n- point three"
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, addr: tuple[str, int], config: FakeServerConfig) -> None:
+        super().__init__(addr, _Handler)
+        self.config = config
+        self.stats = _Stats()
+        self._lock = threading.Lock()
+        self._rng = random.Random(config.seed)
+        self._script = [(re.compile(p, re.S), r) for p, r in config.script]
+        self._replay = None
+        if config.cassette is not None:
+            from .cassette import ReplayLLM
+
+            self._replay = ReplayLLM(config.cassette)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, protocol: str, *, stream: bool) -> None:
+        with self._lock:
+            self.stats.requests += 1
+            self.stats.streamed += int(stream)
+            self.stats.by_protocol[protocol] = self.stats.by_protocol.get(protocol, 0) + 1
+
+    def fault(self) -> HTTPStatus | None:
+        with self._lock:
+            r = self._rng.random()
+            if r < self.config.throttle_rate:
+                self.stats.throttled += 1
+                return HTTPStatus.TOO_MANY_REQUESTS
+            if r < self.config.throttle_rate + self.config.error_rate:
+                self.stats.errors += 1
+                return HTTPStatus.INTERNAL_SERVER_ERROR
+        return None
+
+    def first_token_delay(self) -> float:
+        c = self.config
+        base = max(c.latency_ms, 0.0) / 1000.0
+        with self._lock:
+            if c.latency_dist == "uniform":
+                return max(0.0, base * (1 + self._rng.uniform(-c.latency_jitter, c.latency_jitter)))
+            if c.latency_dist == "lognormal" and base > 0:
+                # Median = latency_ms; a long right tail like real inference queues.
+                return base * self._rng.lognormvariate(0.0, c.latency_jitter)
+        return base
+
+    def respond(self, messages: list[ChatMessage]) -> str:
+        last_user = next((m.content for m in reversed(messages) if m.role == "user"), "")
+        for pattern, response in self._script:
+            if pattern.search(last_user):
+                return response
+        if self._replay is not None:
+            return self._replay.chat(messages)
+        return default_response(messages)
+
+    def tokens(self, text: str) -> Iterator[str]:
+        """Split into ~token-sized pieces, paced at tokens_per_s."""
+        pieces = [text[i : i + _CHARS_PER_TOKEN] for i in range(0, len(text), _CHARS_PER_TOKEN)] or [""]
+        with self._lock:
+            self.stats.tokens_out += len(pieces)
+        interval = 1.0 / self.config.tokens_per_s if self.config.tokens_per_s > 0 else 0.0
+        for piece in pieces:
+            yield piece
+            if interval:
+                time.sleep(interval)
+
+    def generation_time(self, text: str) -> float:
+        if self.config.tokens_per_s <= 0:
+            return 0.0
+        return (len(text) / _CHARS_PER_TOKEN) / self.config.tokens_per_s
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: FakeLLMServer
+    protocol_version = "HTTP/1.1"  # keep-alive, so client connection pooling is exercised
+
+    def log_message(self, format: str, *args: Any) -> None:
+        return
+
+    def _send_json(self, obj: Any, status: HTTPStatus = HTTPStatus.OK, headers: dict | None = None) -> None:
+        body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _start_stream(self, content_type: str) -> None:
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")  # no chunked encoding: the body ends with the socket
+        self.end_headers()
+        self.close_connection = True
+
+    def _write(self, data: str) -> None:
+        self.wfile.write(data.encode("utf-8"))
+        self.wfile.flush()
+
+    def do_GET(self) -> None:
+        if self.path.rstrip("/") == "/stats":
+            return self._send_json(self.server.stats.as_dict())
+        self._send_json({"error": "not found"}, HTTPStatus.NOT_FOUND)
+
+    def do_POST(self) -> None:
+        path = self.path.split("?", 1)[0].rstrip("/")
+        n = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(n) or b"{}") if n else {}
+        if path == "/stats/reset":
+            self.server.stats = _Stats()
+            return self._send_json({"ok": True})
+
+        handlers: dict[str, tuple[str, Callable[[dict], None]]] = {
+            "/api/chat": ("ollama", self._ollama),
+            "/chat/completions": ("openai", self._openai),
+            "/v1/chat/completions": ("openai", self._openai),
+            "/messages": ("anthropic", self._anthropic),
+            "/v1/messages": ("anthropic", self._anthropic),
+        }
+        if path not in handlers:
+            return self._send_json({"error": "not found"}, HTTPStatus.NOT_FOUND)
+        protocol, handler = handlers[path]
+        self.server.count(protocol, stream=bool(body.get("stream")))
+
+        fault = self.server.fault()
+        if fault is HTTPStatus.TOO_MANY_REQUESTS:
+            return self._send_json(
+                {"error": {"type": "rate_limit_error", "message": "injected 429"}},
+                fault,
+                {"Retry-After": f"{self.server.config.retry_after_s:g}"},
+            )
+        if fault is not None:
+            return self._send_json({"error": {"type": "server_error", "message": "injected 500"}}, fault)
+
+        time.sleep(self.server.first_token_delay())
+        try:
+            handler(body)
+        except LookupError as e:  # cassette miss
+            self._send_json({"error": {"type": "not_found_error", "message": str(e)}}, HTTPStatus.NOT_FOUND)
+
+    # --- protocols ---------------------------------------------------------------------------
+
+    def _messages(self, body: dict) -> list[ChatMessage]:
+        msgs = [ChatMessage(m.get("role", "user"), _text(m.get("content"))) for m in body.get("messages") or []]
+        if body.get("system"):  # Anthropic keeps the system prompt outside the list
+            msgs.insert(0, ChatMessage("system", _text(body["system"])))
+        return msgs
+
+    def _ollama(self, body: dict) -> None:
+        text = self.server.respond(self._messages(body))
+        model = body.get("model", "fake")
+        if not body.get("stream"):
+            time.sleep(self.server.generation_time(text))
+            return self._send_json(
+                {"model": model, "message": {"role": "assistant", "content": text}, "done": True}
+            )
+        self._start_stream("application/x-ndjson")
+        for piece in self.server.tokens(text):
+            self._write(json.dumps({"model": model, "message": {"role": "assistant", "content": piece}, "done": False}) + "\n")
+        self._write(json.dumps({"model": model, "message": {"role": "assistant", "content": ""}, "done": True}) + "\n")
+
+    def _openai(self, body: dict) -> None:
+        text = self.server.respond(self._messages(body))
+        rid = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        if not body.get("stream"):
+            time.sleep(self.server.generation_time(text))
+            return self._send_json(
+                {
+                    "id": rid,
+                    "object": "chat.completion",
+                    "model": body.get("model", "fake"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                }
+            )
+        self._start_stream("text/event-stream")
+        for piece in self.server.tokens(text):
+            chunk = {"id": rid, "object": "chat.completion.chunk", "choices": [{"index": 0, "delta": {"content": piece}}]}
+            self._write(f"data: {json.dumps(chunk)}\n\n")
+        self._write("data: [DONE]\n\n")
+
+    def _anthropic(self, body: dict) -> None:
+        text = self.server.respond(self._messages(body))
+        mid = f"msg_{uuid.uuid4().hex[:12]}"
+        if not body.get("stream"):
+            time.sleep(self.server.generation_time(text))
+            return self._send_json(
+                {
+                    "id": mid,
+                    "type": "message",
+                    "role": "assistant",
+                    "model": body.get("model", "fake"),
+                    "content": [{"type": "text", "text": text}],
+                    "stop_reason": "end_turn",
+                }
+            )
+        self._start_stream("text/event-stream")
+        self._write(f"event: message_start\ndata: {json.dumps({'type': 'message_start', 'message': {'id': mid}})}\n\n")
+        for piece in self.server.tokens(text):
+            ev = {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": piece}}
+            self._write(f"event: content_block_delta\ndata: {json.dumps(ev)}\n\n")
+        self._write(f"event: message_stop\ndata: {json.dumps({'type': 'message_stop'})}\n\n")
+
+
+def _text(content: Any) -> str:
+    # Accept both plain strings and content-block lists.
+    if isinstance(content, list):
+        return "".join(b.get("text", "") for b in content if isinstance(b, dict))
+    return str(content or "")
+
+
+def start_fake_server(
+    config: FakeServerConfig | None = None, *, host: str = "127.0.0.1", port: int = 0
+) -> FakeLLMServer:
+    """Start a server on a background thread (port 0 = pick a free one); stop with .shutdown()."""
+    server = FakeLLMServer((host, port), config or FakeServerConfig())
+    threading.Thread(target=server.serve_forever, name="fake-llm", daemon=True).start()
+    return server
+
+
+def load_script(path: Path) -> tuple[tuple[str, str], ...]:
+    """Script file: JSON list of {"match": regex, "response": str}."""
+    rules = json.loads(path.read_text(encoding="utf-8"))
+    return tuple((r["match"], r["response"]) for r in rules)
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(prog="ev-agent-fake-llm", description="本地模拟 LLM 服务（Ollama / OpenAI / Anthropic 协议）")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=11999)
+    p.add_argument("--latency-ms", type=float, default=200.0, help="首 token 延迟（中位数）")
+    p.add_argument("--latency-dist", choices=("fixed", "uniform", "lognormal"), default="lognormal")
+    p.add_argument("--latency-jitter", type=float, default=0.5)
+    p.add_argument("--tokens-per-s", type=float, default=200.0, help="0 = 瞬间输出")
+    p.add_argument("--error-rate", type=float, default=0.0)
+    p.add_argument("--throttle-rate", type=float, default=0.0)
+    p.add_argument("--retry-after-s", type=float, default=1.0)
+    p.add_argument("--script", type=Path, default=None, help='JSON 列表：[{"match": 正则, "response": 文本}]')
+    p.add_argument("--cassette", type=Path, default=None, help="用录制的 cassette 作答")
+    p.add_argument("--seed", type=int, default=None)
+    args = p.parse_args()
+
+    config = FakeServerConfig(
+        latency_ms=args.latency_ms,
+        latency_dist=args.latency_dist,
+        latency_jitter=args.latency_jitter,
+        tokens_per_s=args.tokens_per_s,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after_s=args.retry_after_s,
+        script=load_script(args.script) if args.script else (),
+        cassette=args.cassette,
+        seed=args.seed,
+    )
+    server = FakeLLMServer((args.host, args.port), config)
+    print(f"fake LLM server on {server.base_url} (ollama: /api/chat, openai/anthropic: {server.base_url}/v1)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
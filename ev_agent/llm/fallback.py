@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import contextvars
+import queue
+import threading
+import time
+from typing import Any
+
+from ev_agent.utils.deadline import DeadlineExceeded
+
+from .base import ChatMessage, LLMClient, stream_chat
+
+
+class FallbackExhausted(RuntimeError):
+    """Raised when every backend in a FallbackLLM failed."""
+
+
+class FallbackLLM:
+    """
+    Composite client over an ordered list of (name, client) backends.
+
+    - Sequential mode: try each backend in order, failing over on any error (HTTP errors,
+      timeouts, connection failures).
+    - Hedged mode (`hedge_after_s` set): stream from the primary; if no first token has arrived
+      within the threshold, fire the same request at the next backend and keep whichever
+      finishes first. Losers are abandoned (their stream stops at the next chunk).
+    """
+
+    def __init__(self, clients: list[tuple[str, LLMClient]], *, hedge_after_s: float | None = None) -> None:
+        if not clients:
+            raise ValueError("FallbackLLM 至少需要一个后端")
+        self.clients = clients
+        self.hedge_after_s = hedge_after_s if hedge_after_s and hedge_after_s > 0 else None
+        self.last_backend = ""
+        self._lock = threading.Lock()
+        self._stats: dict[str, dict[str, int]] = {name: {"wins": 0, "errors": 0} for name, _ in clients}
+        self._stats["_hedges"] = {"fired": 0}
+
+    def _record(self, name: str, key: str) -> None:
+        with self._lock:
+            self._stats[name][key] += 1
+
+    def metrics(self) -> dict[str, Any]:
+        with self._lock:
+            return {k: dict(v) for k, v in self._stats.items()}
+
+    def chat(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> str:
+        if self.hedge_after_s is not None and len(self.clients) > 1:
+            return self._hedged(messages, temperature)
+
+        errors: list[str] = []
+        for name, client in self.clients:
+            try:
+                out = client.chat(messages, temperature=temperature)
+            except DeadlineExceeded:
+                raise  # the run is out of time; another backend would not help
+            except Exception as e:
+                self._record(name, "errors")
+                errors.append(f"{name}: {type(e).__name__}: {e}")
+                continue
+            self._record(name, "wins")
+            self.last_backend = name
+            return out
+        raise FallbackExhausted("所有后端均失败：\n" + "\n".join(errors))
+
+    def _hedged(self, messages: list[ChatMessage], temperature: float) -> str:
+        results: queue.Queue[tuple[str, int, Any]] = queue.Queue()
+        cancel = threading.Event()
+        first_token = threading.Event()  # primary only: hedging is decided on its TTFT
+        launched = 0
+        pending = 0
+        hedged = False
+        errors: list[str] = []
+
+        def attempt(idx: int) -> None:
+            name, client = self.clients[idx]
+            parts: list[str] = []
+            try:
+                for chunk in stream_chat(client, messages, temperature=temperature):
+                    if idx == 0:
+                        first_token.set()
+                    if cancel.is_set():
+                        return
+                    parts.append(chunk)
+                results.put(("ok", idx, "".join(parts)))
+            except Exception as e:
+                results.put(("err", idx, e))
+
+        def launch() -> None:
+            nonlocal launched, pending
+            # Copy the context so the attempt inherits the run deadline.
+            ctx = contextvars.copy_context()
+            threading.Thread(target=ctx.run, args=(attempt, launched), daemon=True).start()
+            launched += 1
+            pending += 1
+
+        launch()
+        hedge_at = time.monotonic() + (self.hedge_after_s or 0)
+        while True:
+            timeout = None
+            if not hedged and launched < len(self.clients) and not first_token.is_set():
+                timeout = max(hedge_at - time.monotonic(), 0.0)
+            try:
+                kind, idx, payload = results.get(timeout=timeout)
+            except queue.Empty:
+                if not first_token.is_set():
+                    hedged = True
+                    self._record("_hedges", "fired")
+                    launch()
+                continue
+
+            pending -= 1
+            name = self.clients[idx][0]
+            if kind == "ok":
+                cancel.set()
+                self._record(name, "wins")
+                self.last_backend = name
+                return payload
+            self._record(name, "errors")
+            if isinstance(payload, DeadlineExceeded):
+                cancel.set()
+                raise payload
+            errors.append(f"{name}: {type(payload).__name__}: {payload}")
+            if launched < len(self.clients):
+                launch()
+            elif pending == 0:
+                raise FallbackExhausted("所有后端均失败：\n" + "\n".join(errors))
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import threading
+
+import httpx
+
+from ev_agent.utils.deadline import timeout_for
+
+
+class PooledHTTP:
+    """
+    Base for HTTP backends: one lazily created `httpx.Client` per instance, so requests reuse
+    kept-alive connections. Timeouts are passed per request (`request_timeout`), capped by the
+    run deadline, instead of being baked into the shared client.
+    """
+
+    timeout_s: float
+    _http: httpx.Client | None = None
+    _http_lock = threading.Lock()  # guards creation / close only
+
+    @property
+    def http(self) -> httpx.Client:
+        client = self._http
+        if client is None:
+            with self._http_lock:
+                if self._http is None:
+                    self._http = httpx.Client(timeout=self.timeout_s)
+                client = self._http
+        return client
+
+    def request_timeout(self) -> float | None:
+        return timeout_for(self.timeout_s)
+
+    def close(self) -> None:
+        with self._http_lock:
+            client, self._http = self._http, None
+        if client is not None:
+            client.close()
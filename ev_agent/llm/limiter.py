@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING, Any, Iterator
+
+from ev_agent.utils.deadline import check_deadline, remaining
+
+from .base import ChatMessage, LLMClient, stream_chat
+
+if TYPE_CHECKING:
+    import httpx
+
+# httpx / tenacity are imported where they are used: the registry and metrics must stay cheap
+# to import (mock runs read them too), and only network clients ever hit the retry paths.
+
+# Status codes that are worth retrying: throttling, timeouts and transient server errors.
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at `rate_per_min`.
+
+    `reserve()` debits immediately (the balance may go negative) and returns how long the
+    caller must wait, so concurrent callers queue up in arrival order instead of racing.
+    A rate <= 0 disables the bucket.
+    """
+
+    def __init__(self, rate_per_min: float, *, burst: float | None = None) -> None:
+        self.rate_per_s = max(rate_per_min, 0.0) / 60.0
+        self.capacity = float(burst if burst is not None else max(rate_per_min, 0.0))
+        self._tokens = self.capacity
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate_per_s > 0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate_per_s)
+        self._stamp = now
+
+    def reserve(self, amount: float) -> float:
+        if not self.enabled or amount <= 0:
+            return 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate_per_s
+
+    def debit(self, amount: float) -> None:
+        """Charge usage discovered after the fact (e.g. output tokens) without waiting."""
+        if not self.enabled or amount <= 0:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= amount
+
+
+class BackendLimiter:
+    """Requests/min + tokens/min buckets and a max in-flight semaphore shared by one backend."""
+
+    def __init__(self, name: str, *, rpm: float = 0, tpm: float = 0, max_inflight: int = 0) -> None:
+        self.name = name
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_inflight = max_inflight
+        self._sem = threading.BoundedSemaphore(max_inflight) if max_inflight > 0 else None
+        self._lock = threading.Lock()
+        self._blocked_until = 0.0
+        self._stats: dict[str, float] = {
+            "requests": 0,
+            "retries": 0,
+            "throttled": 0,
+            "inflight": 0,
+            "queue_wait_s_total": 0.0,
+            "queue_wait_s_max": 0.0,
+            "queue_wait_s_last": 0.0,
+        }
+
+    @contextmanager
+    def slot(self, est_tokens: int) -> Iterator[float]:
+        """Block until the request may be sent; yields the time spent queueing (seconds)."""
+        t0 = time.monotonic()
+        if self._sem is not None:
+            self._sem.acquire()
+        try:
+            wait = max(self.requests.reserve(1), self.tokens.reserve(est_tokens))
+            with self._lock:
+                wait = max(wait, self._blocked_until - time.monotonic())
+            if wait > 0:
+                time.sleep(wait)
+            waited = time.monotonic() - t0
+            with self._lock:
+                self._stats["requests"] += 1
+                self._stats["inflight"] += 1
+                self._stats["queue_wait_s_total"] += waited
+                self._stats["queue_wait_s_max"] = max(self._stats["queue_wait_s_max"], waited)
+                self._stats["queue_wait_s_last"] = waited
+            try:
+                yield waited
+            finally:
+                with self._lock:
+                    self._stats["inflight"] -= 1
+        finally:
+            if self._sem is not None:
+                self._sem.release()
+
+    def record_tokens(self, n: int) -> None:
+        self.tokens.debit(n)
+
+    def pause_for(self, seconds: float) -> None:
+        """Honour a server-side Retry-After: every caller of this backend waits it out."""
+        if seconds <= 0:
+            return
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    def metrics(self) -> dict[str, Any]:
+        with self._lock:
+            out: dict[str, Any] = dict(self._stats)
+        n = out["requests"] or 1
+        out["queue_wait_s_avg"] = out["queue_wait_s_total"] / n
+        out["backend"] = self.name
+        return out
+
+
+_LIMITERS: dict[str, BackendLimiter] = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+def get_limiter(key: str, *, rpm: float = 0, tpm: float = 0, max_inflight: int = 0) -> BackendLimiter:
+    """Return the process-wide limiter for `key` (first caller's limits win)."""
+    with _LIMITERS_LOCK:
+        lim = _LIMITERS.get(key)
+        if lim is None:
+            lim = BackendLimiter(key, rpm=rpm, tpm=tpm, max_inflight=max_inflight)
+            _LIMITERS[key] = lim
+        return lim
+
+
+def limiter_metrics() -> dict[str, dict[str, Any]]:
+    with _LIMITERS_LOCK:
+        return {k: v.metrics() for k, v in _LIMITERS.items()}
+
+
+def estimate_tokens(text: str) -> int:
+    # Rough heuristic (~4 chars/token for English, denser for CJK); good enough for budgeting.
+    return max(1, len(text) // 3)
+
+
+def retry_after_seconds(exc: BaseException) -> float:
+    """Parse `Retry-After` (seconds or HTTP date) from an HTTP error; 0 when absent."""
+    import httpx
+
+    if not isinstance(exc, httpx.HTTPStatusError):
+        return 0.0
+    raw = exc.response.headers.get("retry-after")
+    if not raw:
+        return 0.0
+    try:
+        return max(float(raw), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(raw).timestamp() - time.time(), 0.0)
+    except Exception:
+        return 0.0
+
+
+def is_retryable(exc: BaseException) -> bool:
+    import httpx
+
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in RETRYABLE_STATUS
+    return isinstance(exc, httpx.TransportError)
+
+
+class RateLimitedLLM:
+    """
+    Wrap any LLMClient with a shared BackendLimiter plus retries.
+
+    Retries use full-jitter exponential backoff; a Retry-After header pauses the whole backend
+    so parallel graphs back off together instead of hammering it with 429s.
+    """
+
+    def __init__(
+        self,
+        inner: LLMClient,
+        limiter: BackendLimiter,
+        *,
+        max_attempts: int = 4,
+        backoff_base_s: float = 0.6,
+        backoff_max_s: float = 20.0,
+    ) -> None:
+        self.inner = inner
+        self.limiter = limiter
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.last_queue_wait_s = 0.0
+
+    def _backoff(self, attempt_number: int) -> float:
+        cap = min(self.backoff_max_s, self.backoff_base_s * (2 ** (attempt_number - 1)))
+        return random.uniform(0, cap)
+
+    def _wait(self, retry_state) -> float:
+        # Never sleep past the run deadline; the next attempt then fails fast with DeadlineExceeded.
+        left = remaining()
+        wait = self._backoff(retry_state.attempt_number)
+        return wait if left is None else max(0.0, min(wait, left))
+
+    def _on_http_error(self, e: httpx.HTTPStatusError) -> None:
+        if e.response.status_code == 429:
+            self.limiter.count("throttled")
+        self.limiter.pause_for(retry_after_seconds(e))
+
+    def _before_retry(self, retry_state) -> None:
+        self.limiter.count("retries")
+
+    def chat(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> str:
+        import httpx
+        from tenacity import Retrying, retry_if_exception, stop_after_attempt
+
+        est = sum(estimate_tokens(m.content) for m in messages)
+        retrying = Retrying(
+            reraise=True,
+            stop=stop_after_attempt(self.max_attempts),
+            wait=self._wait,
+            retry=retry_if_exception(is_retryable),
+            before_sleep=self._before_retry,
+        )
+        for attempt in retrying:
+            with attempt:
+                check_deadline()
+                with self.limiter.slot(est) as waited:
+                    self.last_queue_wait_s = waited
+                    try:
+                        out = self.inner.chat(messages, temperature=temperature)
+                    except httpx.HTTPStatusError as e:
+                        self._on_http_error(e)
+                        raise
+                    except httpx.TransportError:
+                        check_deadline()  # the request timeout was the run deadline's, not the backend's
+                        raise
+                self.limiter.record_tokens(estimate_tokens(out))
+        return out
+
+    def stream(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> Iterator[str]:
+        # Retrying is only safe before the first chunk has been handed to the caller.
+        import httpx
+
+        est = sum(estimate_tokens(m.content) for m in messages)
+        attempt = 0
+        while True:
+            attempt += 1
+            produced: list[str] = []
+            check_deadline()
+            try:
+                with self.limiter.slot(est) as waited:
+                    self.last_queue_wait_s = waited
+                    try:
+                        for chunk in stream_chat(self.inner, messages, temperature=temperature):
+                            produced.append(chunk)
+                            yield chunk
+                    except httpx.HTTPStatusError as e:
+                        self._on_http_error(e)
+                        raise
+                    except httpx.TransportError:
+                        check_deadline()
+                        raise
+            except Exception as e:
+                if produced or attempt >= self.max_attempts or not is_retryable(e):
+                    raise
+                self.limiter.count("retries")
+                left = remaining()
+                time.sleep(self._backoff(attempt) if left is None else max(0.0, min(self._backoff(attempt), left)))
+                continue
+            self.limiter.record_tokens(estimate_tokens("".join(produced)))
+            return
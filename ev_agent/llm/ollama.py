@@ -1,36 +1,60 @@
 from __future__ import annotations
 
-import httpx
-from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
+import json
+from typing import Iterator
+
+from ev_agent.utils.deadline import check_deadline
 
 from .base import ChatMessage
+from .http import PooledHTTP
 
 
-class OllamaLLM:
-    def __init__(self, *, base_url: str, model: str, timeout_s: float = 120.0) -> None:
+class OllamaLLM(PooledHTTP):
+    def __init__(
+        self,
+        *,
+        base_url: str,
+        model: str,
+        timeout_s: float = 120.0,
+        max_tokens: int | None = None,
+    ) -> None:
         self.base_url = base_url.rstrip("/")
         self.model = model
         self.timeout_s = timeout_s
+        self.max_tokens = max_tokens
 
-    @retry(
-        reraise=True,
-        stop=stop_after_attempt(4),
-        wait=wait_exponential(multiplier=0.6, min=0.6, max=6),
-        retry=retry_if_exception_type(httpx.HTTPError),
-    )
-    def chat(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> str:
-        payload = {
+    def _payload(self, messages: list[ChatMessage], temperature: float, stream: bool) -> dict:
+        options: dict = {"temperature": temperature}
+        if self.max_tokens:
+            options["num_predict"] = self.max_tokens
+        return {
             "model": self.model,
-            "stream": False,
+            "stream": stream,
             "messages": [{"role": m.role, "content": m.content} for m in messages],
-            "options": {"temperature": temperature},
+            "options": options,
         }
+
+    def chat(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> str:
         url = f"{self.base_url}/api/chat"
-        with httpx.Client(timeout=self.timeout_s) as client:
-            r = client.post(url, json=payload)
-            r.raise_for_status()
-            data = r.json()
+        r = self.http.post(url, json=self._payload(messages, temperature, False), timeout=self.request_timeout())
+        r.raise_for_status()
+        data = r.json()
         # Ollama returns: {"message": {"role": "...", "content": "..."}, ...}
         return (data.get("message") or {}).get("content", "")
 
-
+    def stream(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> Iterator[str]:
+        # Streaming responses are NDJSON: one {"message": {...}, "done": bool} per line.
+        url = f"{self.base_url}/api/chat"
+        payload = self._payload(messages, temperature, True)
+        with self.http.stream("POST", url, json=payload, timeout=self.request_timeout()) as r:
+            r.raise_for_status()
+            for line in r.iter_lines():
+                check_deadline()
+                if not line.strip():
+                    continue
+                data = json.loads(line)
+                chunk = (data.get("message") or {}).get("content", "")
+                if chunk:
+                    yield chunk
+                if data.get("done"):
+                    break
@@ -1,11 +1,15 @@
 from __future__ import annotations
 
-import httpx
+import json
+from typing import Iterator
+
+from ev_agent.utils.deadline import check_deadline
 
 from .base import ChatMessage
+from .http import PooledHTTP
 
 
-class OpenAICompatLLM:
+class OpenAICompatLLM(PooledHTTP):
     """
     Minimal OpenAI-compatible ChatCompletions client via raw HTTP.
     Works with OpenAI or any OpenAI-compatible gateway if you point base_url accordingly.
@@ -18,24 +22,31 @@ class OpenAICompatLLM:
         model: str,
         base_url: str = "https://api.openai.com/v1",
         timeout_s: float = 120.0,
+        max_tokens: int | None = None,
     ) -> None:
         self.api_key = api_key
         self.model = model
         self.base_url = base_url.rstrip("/")
         self.timeout_s = timeout_s
+        self.max_tokens = max_tokens
 
-    def chat(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> str:
-        url = f"{self.base_url}/chat/completions"
-        payload = {
+    def _payload(self, messages: list[ChatMessage], temperature: float) -> dict:
+        payload: dict = {
             "model": self.model,
             "messages": [{"role": m.role, "content": m.content} for m in messages],
             "temperature": temperature,
         }
+        if self.max_tokens:
+            payload["max_tokens"] = self.max_tokens
+        return payload
+
+    def chat(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> str:
+        url = f"{self.base_url}/chat/completions"
         headers = {"Authorization": f"Bearer {self.api_key}"}
-        with httpx.Client(timeout=self.timeout_s) as client:
-            r = client.post(url, json=payload, headers=headers)
-            r.raise_for_status()
-            data = r.json()
+        payload = self._payload(messages, temperature)
+        r = self.http.post(url, json=payload, headers=headers, timeout=self.request_timeout())
+        r.raise_for_status()
+        data = r.json()
         # OpenAI returns: choices[0].message.content
         choices = data.get("choices") or []
         if not choices:
@@ -43,4 +54,23 @@ class OpenAICompatLLM:
         msg = (choices[0] or {}).get("message") or {}
         return msg.get("content", "") or ""
 
-
+    def stream(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> Iterator[str]:
+        # Server-sent events: `data: {choices:[{delta:{content:"..."}}]}` ... `data: [DONE]`
+        url = f"{self.base_url}/chat/completions"
+        headers = {"Authorization": f"Bearer {self.api_key}"}
+        payload = {**self._payload(messages, temperature), "stream": True}
+        with self.http.stream("POST", url, json=payload, headers=headers, timeout=self.request_timeout()) as r:
+            r.raise_for_status()
+            for line in r.iter_lines():
+                check_deadline()
+                if not line.startswith("data:"):
+                    continue
+                body = line[5:].strip()
+                if body == "[DONE]":
+                    break
+                choices = json.loads(body).get("choices") or []
+                if not choices:
+                    continue
+                chunk = ((choices[0] or {}).get("delta") or {}).get("content") or ""
+                if chunk:
+                    yield chunk
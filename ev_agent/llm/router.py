@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import threading
+from typing import Callable, Iterator
+
+from ev_agent.config import ModelRoute, Settings
+
+from .base import ChatMessage, LLMClient, stream_chat
+from .factory import build_backend, with_fallback
+from .mock import MockLLM
+
+
+class RoutedLLM:
+    """Client bound to a route: the route's temperature applies unless the caller passes one."""
+
+    def __init__(self, inner: LLMClient, route: ModelRoute) -> None:
+        self.inner = inner
+        self.route = route
+
+    def chat(self, messages: list[ChatMessage], *, temperature: float | None = None) -> str:
+        t = self.route.temperature if temperature is None else temperature
+        return self.inner.chat(messages, temperature=t)
+
+    def stream(self, messages: list[ChatMessage], *, temperature: float | None = None) -> Iterator[str]:
+        t = self.route.temperature if temperature is None else temperature
+        yield from stream_chat(self.inner, messages, temperature=t)
+
+
+class ModelRouter:
+    """
+    Resolve the client serving a graph node at a given iteration.
+
+    Rules are matched on node name (or "*"); among the matches whose `min_iteration` has been
+    reached, the highest threshold wins (ties: first listed). This gives escalation, e.g. a small
+    fast coder model first and a larger one after N failed QA passes.
+    Clients are built lazily and cached per (node, backend, model, max_tokens, temperature).
+    """
+
+    def __init__(self, routes: tuple[ModelRoute, ...], build: Callable[[ModelRoute], LLMClient]) -> None:
+        self.routes = routes
+        self._build = build
+        self._cache: dict[tuple, LLMClient] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def fixed(cls, general: LLMClient, coder: LLMClient) -> "ModelRouter":
+        """Router over two prebuilt clients (the historical general/coder split)."""
+        routes = tuple(ModelRoute(node=n, backend="fixed") for n in ("pm", "architect", "reviewer"))
+        routes += (ModelRoute(node="coder", backend="fixed"),)
+        return cls(routes, lambda r: coder if r.node == "coder" else general)
+
+    def route_for(self, node: str, iteration: int = 0) -> ModelRoute:
+        matches = [r for r in self.routes if r.node in (node, "*") and r.min_iteration <= iteration]
+        if not matches:
+            raise LookupError(f"没有可用的路由规则：node={node!r} iteration={iteration}")
+        best = max(r.min_iteration for r in matches)
+        return next(r for r in matches if r.min_iteration == best)
+
+    def escalation_iteration(self, node: str, iteration: int) -> int | None:
+        """The lowest `min_iteration` above the rule serving `iteration`, i.e. the next model up (if any)."""
+        current = self.route_for(node, iteration).min_iteration
+        higher = [r.min_iteration for r in self.routes if r.node in (node, "*") and r.min_iteration > current]
+        return min(higher) if higher else None
+
+    def for_node(self, node: str, iteration: int = 0) -> LLMClient:
+        route = self.route_for(node, iteration)
+        key = (node, route.backend, route.model, route.max_tokens, route.temperature)
+        with self._lock:
+            client = self._cache.get(key)
+            if client is None:
+                client = self._build(route)
+                if route.backend != "fixed" and not isinstance(client, MockLLM):
+                    client = RoutedLLM(client, route)
+                self._cache[key] = client
+        return client
+
+    def close(self) -> None:
+        """Close the pooled connections of every client built so far (they reconnect if used again)."""
+        with self._lock:
+            clients = list(self._cache.values())
+        seen: set[int] = set()
+        while clients:
+            client = clients.pop()
+            if id(client) in seen:
+                continue
+            seen.add(id(client))
+            # Walk the wrappers (limiter, fallback, routing, recording) down to the backends.
+            if hasattr(client, "inner"):
+                clients.append(client.inner)
+            clients.extend(c for _name, c in getattr(client, "clients", ()))
+            if callable(getattr(client, "close", None)):
+                client.close()
+
+
+def build_router(settings: Settings) -> ModelRouter:
+    """
+    Router over `settings.routes`; network clients share per-backend limiters and fallbacks.
+
+    EV_CASSETTE_MODE=record wraps every built client so its traffic is saved to the cassette;
+    =replay serves all nodes from the cassette instead, through the same (non-mock) node paths.
+    """
+    if settings.cassette_mode == "replay":
+        from .cassette import ReplayLLM
+
+        replay = ReplayLLM(settings.cassette_path, latency=settings.cassette_latency)
+        return ModelRouter(settings.routes, lambda route: replay)
+
+    writer = None
+    if settings.cassette_mode == "record":
+        from .cassette import CassetteWriter
+
+        writer = CassetteWriter(settings.cassette_path)
+
+    def build(route: ModelRoute) -> LLMClient:
+        primary = build_backend(settings, route.backend, route.model, max_tokens=route.max_tokens)
+        client = with_fallback(settings, primary, role=route.node, name=route.backend)
+        if writer is not None and not isinstance(client, MockLLM):
+            from .cassette import RecordingLLM
+
+            client = RecordingLLM(client, writer, label=route.node)
+        return client
+
+    return ModelRouter(settings.routes, build)
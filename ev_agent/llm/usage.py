@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Iterator
+
+from .base import ChatMessage, LLMClient, stream_chat
+from .limiter import estimate_tokens
+
+
+class RunUsage:
+    """Per-run LLM accounting (estimated tokens, calls) and wall clock; shared by the run's nodes."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._lock = threading.Lock()
+
+    def add(self, prompt_tokens: int, completion_tokens: int) -> None:
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+
+    @property
+    def tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def summary(self) -> str:
+        return f"{self.calls} calls, ~{self.tokens} tokens, {self.elapsed():.1f}s"
+
+
+class MeteredLLM:
+    """Counts a run's traffic into `usage`; the inner client (often shared across runs) is untouched."""
+
+    def __init__(self, inner: LLMClient, usage: RunUsage) -> None:
+        self.inner = inner
+        self.usage = usage
+
+    def chat(self, messages: list[ChatMessage], *, temperature: float | None = None) -> str:
+        kw = {} if temperature is None else {"temperature": temperature}
+        out = self.inner.chat(messages, **kw)
+        self.usage.add(sum(estimate_tokens(m.content) for m in messages), estimate_tokens(out))
+        return out
+
+    def stream(self, messages: list[ChatMessage], *, temperature: float | None = None) -> Iterator[str]:
+        kw = {} if temperature is None else {"temperature": temperature}
+        produced: list[str] = []
+        try:
+            for chunk in stream_chat(self.inner, messages, **kw):
+                produced.append(chunk)
+                yield chunk
+        finally:
+            self.usage.add(sum(estimate_tokens(m.content) for m in messages), estimate_tokens("".join(produced)))
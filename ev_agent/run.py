@@ -2,15 +2,7 @@ from __future__ import annotations
 
 import argparse
 import sys
-import traceback
-
-from rich.console import Console
-
-from ev_agent.chains import build_team_graph
-from ev_agent.config import load_settings
-from ev_agent.llm import build_llms
-from ev_agent.schema import TeamState
-from ev_agent.utils.run_log import append_snapshot, init_run_log, make_run_id
+import time
 
 
 def main() -> int:
@@ -33,87 +25,94 @@ def main() -> int:
         action="store_true",
         help="不写运行日志（默认会写入 logs/run_*.jsonl，供 Streamlit 实时展示）",
     )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="整次运行的截止时间（秒）；到期后停止并记录已完成的部分状态（默认取 EV_RUN_DEADLINE_S）",
+    )
     args = parser.parse_args()
 
+    # Heavy imports (rich, langgraph, pydantic, backends) only after argument parsing,
+    # so `--help` and usage errors return immediately.
+    from rich.console import Console
+
+    from ev_agent.config import load_settings
+    from ev_agent.llm import build_router, limiter_metrics
+    from ev_agent.runner import ReviewQueue, build_graph, execute_run
+    from ev_agent.utils.artifact_store import ArtifactStore
+    from ev_agent.utils.fix_memory import FixMemory
+    from ev_agent.utils.qa_cache import QACache
+
     console = Console()
     settings = load_settings()
-    llm_general, llm_coder = build_llms(settings)
+    router = build_router(settings)
 
     settings.workdir.mkdir(parents=True, exist_ok=True)
     settings.log_dir.mkdir(parents=True, exist_ok=True)
 
-    graph = build_team_graph(
-        llm_general=llm_general,
-        llm_coder=llm_coder,
+    store = ArtifactStore(settings.artifact_dir) if settings.artifact_dir else None
+    qa_cache = QACache(settings.qa_cache_path) if settings.qa_cache_path else None
+    fix_memory = FixMemory(settings.fix_memory_path) if settings.fix_memory_path else None
+    graph = build_graph(
+        settings,
+        router=router,
         workdir=settings.workdir,
-        max_iters=settings.max_iters,
-        fault_inject=bool(args.fault_inject or settings.fault_inject),
+        store=store,
+        qa_cache=qa_cache,
+        fix_memory=fix_memory,
+        fault_inject=bool(args.fault_inject),
     )
 
-    do_log = not bool(args.no_log)
-    run_id = make_run_id()
-    log_paths = init_run_log(settings.log_dir, run_id)
-    prev_fp = {}
-
-    state = TeamState(user_goal=args.goal)
-    if do_log:
-        prev_fp = append_snapshot(
-            log_paths,
-            state,
-            workdir=settings.workdir,
-            prev_fingerprints=prev_fp,
-            extra={"event": "start", "workdir": str(settings.workdir)},
-        )
-
-    # Prefer streaming so UI can update in real time.
-    final_state: TeamState
-    try:
-        last = None
-        for step in graph.stream(state, stream_mode="values"):
-            last = step
-            s = TeamState.model_validate(step)
-            if do_log:
-                prev_fp = append_snapshot(
-                    log_paths,
-                    s,
-                    workdir=settings.workdir,
-                    prev_fingerprints=prev_fp,
-                    extra={"event": "step"},
-                )
-        if last is None:
-            last = graph.invoke(state)
-        final_state = TeamState.model_validate(last)
-    except Exception:
-        tb = traceback.format_exc()
-        if do_log:
-            append_snapshot(
-                log_paths,
-                state,
-                workdir=settings.workdir,
-                prev_fingerprints=prev_fp,
-                extra={"event": "exception", "traceback": tb},
-            )
-        raise
-
-    if do_log:
-        append_snapshot(
-            log_paths,
-            final_state,
-            workdir=settings.workdir,
-            prev_fingerprints=prev_fp,
-            extra={"event": "final"},
-        )
+    review_queue = ReviewQueue(router) if settings.review_mode == "async" else None
+    t0 = time.perf_counter()
+    result = execute_run(
+        graph,
+        args.goal,
+        workdir=settings.workdir,
+        log_dir=None if args.no_log else settings.log_dir,
+        review_queue=review_queue,
+        deadline_s=settings.run_deadline_s if args.deadline is None else args.deadline,
+    )
+    build_s = time.perf_counter() - t0
+    if store is not None:
+        store.prune_raw()  # decompressed copies unused for a while
+    final_state = result.state
+    run_id = result.run_id
+    log_paths = result.log_paths
 
     console.rule("EV-Agent Result")
     console.print(f"[bold]workdir[/bold]: {settings.workdir}")
-    if do_log:
+    if log_paths is not None:
         console.print(f"[bold]run_log[/bold]: {log_paths.jsonl_path}")
-    console.print(f"[bold]files[/bold]: {list(final_state.code_files.keys())}")
-    console.print(f"[bold]qa_passed[/bold]: {final_state.error_log == ''}")
+        console.print(f"[bold]trace_log[/bold]: {log_paths.trace_path}")
+    console.print(f"[bold]files[/bold]: {final_state.code_paths()}")
+    if store is not None:
+        console.print(f"[bold]artifacts[/bold]: {store.root} (manifests/{run_id})")
+    console.print(f"[bold]qa_passed[/bold]: {not result.cancelled and final_state.error_log == ''}")
     console.print(f"[bold]iterations[/bold]: {final_state.iteration}")
+    if final_state.stop_reason:
+        console.print(f"[bold]stopped_early[/bold]: {final_state.stop_reason}")
+    console.print(f"[bold]time_to_build[/bold]: {build_s:.2f}s")
+    for name, m in limiter_metrics().items():
+        console.print(
+            f"[bold]llm[/bold] {name}: requests={m['requests']:.0f} retries={m['retries']:.0f} "
+            f"throttled={m['throttled']:.0f} queue_wait_avg={m['queue_wait_s_avg']:.2f}s "
+            f"max={m['queue_wait_s_max']:.2f}s"
+        )
     if final_state.error_log:
         console.print("[bold red]error_log[/bold red]")
         console.print(final_state.error_log)
+    if result.review is not None:
+        # The build is usable now; the review is advisory and only printed once it lands.
+        console.print("[bold]review[/bold]: running in background ...")
+        try:
+            final_state = result.review.result()
+        except Exception as e:
+            console.print(f"[bold red]review failed[/bold red]: {type(e).__name__}: {e}")
+        finally:
+            review_queue.shutdown()
     if final_state.review_notes:
         console.print("[bold]review_notes[/bold]")
         console.print(final_state.review_notes)
@@ -122,7 +121,8 @@ def main() -> int:
     if final_state.trace:
         console.print("[bold]trace[/bold]")
         for e in final_state.trace[-12:]:
-            console.print(f"- {e.get('node')} :: {e.get('message')}")
+            console.print(f"- {e.node} :: {e.message}")
+    router.close()
     return 0
 
 
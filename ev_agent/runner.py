@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+from ev_agent.agents.nodes import reviewer_node
+from ev_agent.chains import build_team_graph
+from ev_agent.config import Settings
+from ev_agent.llm import limiter_metrics
+from ev_agent.llm.router import ModelRouter
+from ev_agent.schema import TeamState
+from ev_agent.utils.artifact_store import ArtifactStore
+from ev_agent.utils.deadline import DeadlineExceeded, run_deadline
+from ev_agent.utils.files import recover_workdir
+from ev_agent.utils.fix_memory import FixMemory
+from ev_agent.utils.qa_cache import QACache
+from ev_agent.utils.run_log import (
+    RunLogPaths,
+    append_snapshot,
+    init_run_log,
+    make_run_id,
+    spill_trace,
+)
+
+
+@dataclass(frozen=True)
+class RunResult:
+    state: TeamState
+    run_id: str
+    log_paths: RunLogPaths | None
+    cancelled: bool = False
+    # Background review (EV_REVIEW_MODE=async): resolves to the final state plus review notes.
+    review: Future[TeamState] | None = None
+
+
+class ReviewQueue:
+    """
+    Runs the reviewer off the critical path: a run ends at QA pass and its review is appended
+    to the run log (event "review") when ready.
+    """
+
+    def __init__(self, router: ModelRouter, *, workers: int = 1) -> None:
+        self.router = router
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="ev-review")
+
+    def submit(
+        self,
+        state: TeamState,
+        *,
+        workdir: Path,
+        on_done: Callable[[TeamState], None] | None = None,
+    ) -> Future[TeamState]:
+        # Review a copy: the caller keeps (and may already have returned) the QA-passed state.
+        snapshot = state.model_copy(update={"trace": list(state.trace)})
+
+        def review() -> TeamState:
+            reviewed = reviewer_node(snapshot, self.router.for_node("reviewer", snapshot.iteration), workdir=workdir)
+            if on_done is not None:
+                on_done(reviewed)
+            return reviewed
+
+        return self._pool.submit(review)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
+
+
+def build_graph(
+    settings: Settings,
+    *,
+    router: ModelRouter,
+    workdir: Path,
+    store: ArtifactStore | None = None,
+    qa_cache: QACache | None = None,
+    fix_memory: FixMemory | None = None,
+    fault_inject: bool = False,
+):
+    """Bind the shared compiled team graph to one run in `workdir` with the knobs from settings."""
+    return build_team_graph(
+        router=router,
+        workdir=workdir,
+        max_iters=settings.max_iters,
+        fault_inject=bool(fault_inject or settings.fault_inject),
+        atomic_writes=settings.atomic_writes,
+        store=store,
+        qa_cache=qa_cache,
+        fix_memory=fix_memory,
+        fast_fix=settings.fast_fix,
+        review_inline=settings.review_mode == "inline",
+        speculative=settings.speculative,
+        coder_mode=settings.coder_mode,
+        coder_workers=settings.coder_workers,
+        stall_repeats=settings.stall_repeats,
+        budget_s=settings.run_budget_s,
+        token_budget=settings.run_token_budget,
+        trace_limit=settings.trace_limit,
+    )
+
+
+def execute_run(
+    graph,
+    goal: str,
+    *,
+    workdir: Path,
+    log_dir: Path | None,
+    run_id: str | None = None,
+    on_step: Callable[[TeamState], None] | None = None,
+    should_stop: Callable[[], bool] | None = None,
+    review_queue: ReviewQueue | None = None,
+    deadline_s: float | None = None,
+) -> RunResult:
+    """
+    Stream one goal through a compiled team graph, logging a snapshot per step.
+
+    - `log_dir=None` disables run logs.
+    - `on_step` sees every intermediate state (e.g. to publish events).
+    - `should_stop` is polled between steps; when it returns True the run ends early and is
+      logged as cancelled with its partial state.
+    - With a `review_queue`, a QA-passed run returns immediately and `RunResult.review`
+      completes later (use with a graph bound with `review_inline=False`).
+    - `deadline_s` bounds the whole run: LLM and QA timeouts shrink to the time left, and once it
+      passes the run stops (`stop_reason` set) and is logged as cancelled, like `should_stop`.
+    """
+    run_id = run_id or make_run_id()
+    recover_workdir(workdir)  # a previous process may have died mid-swap (atomic writes)
+    log_paths = init_run_log(log_dir, run_id) if log_dir is not None else None
+    prev_fp: dict = {}
+    trace_seq = 0
+
+    def snapshot(s: TeamState, extra: dict[str, Any]) -> None:
+        nonlocal prev_fp, trace_seq
+        if log_paths is None:
+            return
+        trace_seq = spill_trace(log_paths, s, trace_seq)
+        prev_fp = append_snapshot(log_paths, s, workdir=workdir, prev_fingerprints=prev_fp, extra=extra)
+
+    state = TeamState(run_id=run_id, user_goal=goal)
+    snapshot(state, {"event": "start", "workdir": str(workdir)})
+
+    # Prefer streaming so UI can update in real time.
+    current = state
+    cancelled = False
+    try:
+        with run_deadline(deadline_s):
+            for step in graph.stream(state.model_dump(), stream_mode="values"):
+                # Internal transitions are trusted: rebuild the model without revalidating.
+                current = TeamState.model_construct(**step)
+                snapshot(current, {"event": "step"})
+                if on_step is not None:
+                    on_step(current)
+                if should_stop is not None and should_stop():
+                    cancelled = True
+                    break
+    except DeadlineExceeded as e:
+        # The interrupted node's partial update is lost; the last completed step is what we keep.
+        cancelled = True
+        current = current.model_copy(update={"stop_reason": f"deadline: {e}"})
+    except Exception:
+        snapshot(current, {"event": "exception", "traceback": traceback.format_exc()})
+        raise
+
+    snapshot(current, {"event": "cancelled" if cancelled else "final", "llm_limits": limiter_metrics()})
+
+    review = None
+    if review_queue is not None and not cancelled and not current.error_log and not current.review_notes:
+        review = review_queue.submit(current, workdir=workdir, on_done=lambda s: snapshot(s, {"event": "review"}))
+    return RunResult(state=current, run_id=run_id, log_paths=log_paths, cancelled=cancelled, review=review)
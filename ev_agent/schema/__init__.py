@@ -1,6 +1,16 @@
 from .coder_output import CoderOutput
-from .team_state import TeamState
+from .diagnostics import Diagnostic, categories, diagnostic_files, format_diagnostics
+from .team_state import TeamGraphState, TeamState, TraceEvent
 
-__all__ = ["TeamState", "CoderOutput"]
+__all__ = [
+    "TeamState",
+    "TeamGraphState",
+    "TraceEvent",
+    "CoderOutput",
+    "Diagnostic",
+    "categories",
+    "diagnostic_files",
+    "format_diagnostics",
+]
 
 
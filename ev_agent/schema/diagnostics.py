@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from typing import Literal
+
+from pydantic import BaseModel, ConfigDict
+
+# Categories drive routing after QA:
+# - protocol: the coder's answer broke the JSON/file contract (nothing was checked) -> coder reprompt
+# - syntax:   a file does not compile (SyntaxError / IndentationError / TabError) -> fast-fix first
+# - timeout:  the check itself ran out of time; says nothing about the code
+# - error:    any other failed check
+DiagnosticCategory = Literal["protocol", "syntax", "timeout", "error"]
+
+
+class Diagnostic(BaseModel):
+    """One structured QA / coder finding; `error_log` keeps the raw text for prompts and logs."""
+
+    model_config = ConfigDict(frozen=True)
+
+    category: DiagnosticCategory
+    check: str  # what produced it, e.g. "compileall", "coder_output", "per_file"
+    message: str
+    file: str = ""  # workdir-relative path, if the finding points at one
+    line: int = 0  # 1-based; 0 = unknown
+
+    def location(self) -> str:
+        if not self.file:
+            return ""
+        return f"{self.file}:{self.line}" if self.line else self.file
+
+    def describe(self) -> str:
+        where = self.location()
+        return f"[{self.category}] {where + ': ' if where else ''}{self.message}"
+
+
+def categories(diagnostics: list[Diagnostic]) -> set[str]:
+    return {d.category for d in diagnostics}
+
+
+def diagnostic_files(diagnostics: list[Diagnostic]) -> list[str]:
+    """Files the findings point at, in order of first appearance."""
+    return list(dict.fromkeys(d.file for d in diagnostics if d.file))
+
+
+def format_diagnostics(diagnostics: list[Diagnostic]) -> str:
+    return "\n".join(f"- {d.describe()}" for d in diagnostics)
@@ -1,32 +1,103 @@
 from __future__ import annotations
 
-from typing import Any
+from typing import Any, NamedTuple, TypedDict
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
+
+from .diagnostics import Diagnostic
+
+# Default max trace events kept in state (per run: RunContext.trace_limit / EV_TRACE_LIMIT); older
+# ones only live in the run's trace spill file.
+TRACE_LIMIT = 200
+
+
+class TraceEvent(NamedTuple):
+    """One trace record. A plain tuple keeps the in-state ring buffer compact."""
+
+    seq: int  # position in the run's full trace history
+    ts: str
+    node: str
+    message: str
+    iteration: int
+
+    def as_dict(self) -> dict[str, Any]:
+        return self._asdict()
 
 
 class TeamState(BaseModel):
     """LangGraph shared state for the multi-agent dev team."""
 
     # Inputs / planning artifacts
+    run_id: str = ""
     user_goal: str = ""
     requirements: str = ""
     architecture: str = ""
 
     # Code artifacts (in-memory before writing to disk)
     code_files: dict[str, str] = Field(default_factory=dict)  # path -> content
+    # With an artifact store, contents live there and state only carries path -> sha256.
+    code_manifest: dict[str, str] = Field(default_factory=dict)
+    code_changes: dict[str, list[str]] = Field(default_factory=dict)  # last write: added/modified/removed
+    # Raw coder response produced ahead of time by the speculative front; consumed by coder_node.
+    coder_prefetch: str = ""
 
     # Execution / feedback
     error_log: str = ""
     qa_report: str = ""
+    # Structured findings behind the current error_log (empty when it is empty); routing uses these.
+    diagnostics: list[Diagnostic] = Field(default_factory=list)
     review_notes: str = ""
 
     # Control / routing
     iteration: int = 0
     next_node: str = "pm"
     fault_injected: bool = False
+    fast_fix_iteration: int = -1  # iteration the local fast-fix pass last ran in (once per iteration)
+    # Failed attempts ({iteration, error, code, summary}) for stall detection, coder escalation level,
+    # and why the run stopped before max_iters (stall or budget), if it did.
+    attempts: list[dict[str, Any]] = Field(default_factory=list)
+    escalation: int = 0
+    stop_reason: str = ""
+    # Fix memory bookkeeping: {"applied": {...}, "pending": {"signature", "before"}, "tried": [keys]}
+    fix_memory_state: dict[str, Any] = Field(default_factory=dict)
+
+    # Observability: the newest events (up to the run's trace limit); `trace_total` counts every event ever logged
+    trace: list[TraceEvent] = Field(default_factory=list)
+    trace_total: int = 0
+
+    @field_validator("trace", mode="before")
+    @classmethod
+    def _trace_from_dicts(cls, v: Any) -> Any:
+        # Accept the dict form written to run logs.
+        if isinstance(v, list):
+            return [
+                TraceEvent(**{k: e.get(k, 0 if k in ("seq", "iteration") else "") for k in TraceEvent._fields})
+                if isinstance(e, dict)
+                else e
+                for e in v
+            ]
+        return v
+
+    def code_paths(self) -> list[str]:
+        """Paths of the current generation, whether held inline or in the artifact store."""
+        return list(self.code_manifest or self.code_files)
+
 
-    # Observability
-    trace: list[dict[str, Any]] = Field(default_factory=list)  # simple structured log
+def append_trace(
+    left: list[TraceEvent] | None, right: list[TraceEvent] | None, limit: int = TRACE_LIMIT
+) -> list[TraceEvent]:
+    """Append a node's new events and keep only the newest `limit` (0 = unbounded)."""
+    merged = (left or []) + (right or [])
+    return merged[-limit:] if limit > 0 else merged
 
 
+# LangGraph channel layout mirroring TeamState. Using a TypedDict keeps LangGraph from rebuilding
+# (and revalidating) the pydantic model for every node input; nodes return only changed keys, and
+# the node wrapper appends new trace events bounded by the run's own limit (the compiled graph is
+# shared by concurrent runs, so the limit cannot live in the graph). TeamState stays the validated
+# boundary type.
+TeamGraphState = TypedDict(  # type: ignore[misc]
+    "TeamGraphState",
+    {name: f.annotation for name, f in TeamState.model_fields.items()},
+    total=False,
+)
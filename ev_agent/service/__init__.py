@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+from .job_queue import Job, JobQueue
+
+if TYPE_CHECKING:
+    from .server import ServiceServer
+    from .workers import WorkerPool
+
+# The server and workers pull in the graph runtime; resolve them on first access only.
+_LAZY = {"ServiceServer": ".server", "WorkerPool": ".workers"}
+
+__all__ = ["Job", "JobQueue", "ServiceServer", "WorkerPool"]
+
+
+def __getattr__(name: str):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import argparse
+import sys
+
+from ev_agent.config import load_settings
+
+from .job_queue import JobQueue
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="ev-agent-service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None, help="并发运行数（默认 EV_SERVICE_WORKERS）")
+    args = parser.parse_args()
+
+    from .server import ServiceServer
+    from .workers import WorkerPool
+
+    settings = load_settings()
+    settings.service_dir.mkdir(parents=True, exist_ok=True)
+    settings.log_dir.mkdir(parents=True, exist_ok=True)
+
+    queue = JobQueue(settings.service_dir / "jobs.sqlite3")
+    # Jobs that were running when the previous process died start over.
+    requeued = queue.requeue_running()
+    pool = WorkerPool(settings, queue, workers=args.workers or settings.service_workers)
+    pool.start()
+
+    server = ServiceServer((args.host, args.port), queue, pool)
+    print(
+        f"ev-agent service on http://{args.host}:{server.server_port} "
+        f"(workers={pool.workers}, requeued={requeued}, dir={settings.service_dir})",
+        flush=True,
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pool.stop(timeout_s=5)
+        queue.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
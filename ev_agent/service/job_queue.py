@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import uuid
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+JOB_STATUSES = ("queued", "running", "succeeded", "failed", "cancelled")
+TERMINAL_STATUSES = {"succeeded", "failed", "cancelled"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    goal TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    options TEXT NOT NULL DEFAULT '{}',
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT,
+    worker TEXT,
+    run_id TEXT,
+    workdir TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    result TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs (status, priority DESC, created_at);
+CREATE TABLE IF NOT EXISTS events (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    ts TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+"""
+
+
+@dataclass(frozen=True)
+class Job:
+    id: str
+    goal: str
+    priority: int
+    status: str
+    options: dict[str, Any]
+    created_at: str
+    started_at: str | None = None
+    finished_at: str | None = None
+    worker: str | None = None
+    run_id: str | None = None
+    workdir: str | None = None
+    cancel_requested: bool = False
+    error: str | None = None
+    result: dict[str, Any] | None = None
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat()
+
+
+class JobQueue:
+    """
+    Persistent priority job queue on SQLite (WAL), safe to share between threads.
+    Higher `priority` runs first; ties run in submission order.
+    """
+
+    def __init__(self, db_path: Path) -> None:
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _row_to_job(self, row: sqlite3.Row) -> Job:
+        return Job(
+            id=row["id"],
+            goal=row["goal"],
+            priority=row["priority"],
+            status=row["status"],
+            options=json.loads(row["options"] or "{}"),
+            created_at=row["created_at"],
+            started_at=row["started_at"],
+            finished_at=row["finished_at"],
+            worker=row["worker"],
+            run_id=row["run_id"],
+            workdir=row["workdir"],
+            cancel_requested=bool(row["cancel_requested"]),
+            error=row["error"],
+            result=json.loads(row["result"]) if row["result"] else None,
+        )
+
+    def submit(self, goal: str, *, priority: int = 0, options: dict[str, Any] | None = None) -> Job:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, goal, priority, status, options, created_at) VALUES (?, ?, ?, 'queued', ?, ?)",
+                (job_id, goal, priority, json.dumps(options or {}, ensure_ascii=False), _now()),
+            )
+        self.add_event(job_id, "queued", {"priority": priority})
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Job:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            raise KeyError(job_id)
+        return self._row_to_job(row)
+
+    def list(self, *, status: str | None = None, limit: int = 100) -> list[Job]:
+        sql = "SELECT * FROM jobs"
+        params: tuple = ()
+        if status:
+            sql += " WHERE status = ?"
+            params = (status,)
+        sql += " ORDER BY created_at DESC LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(sql, (*params, limit)).fetchall()
+        return [self._row_to_job(r) for r in rows]
+
+    def claim_next(self, worker: str) -> Job | None:
+        """Atomically move the best queued job to running and return it."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id FROM jobs WHERE status = 'queued' ORDER BY priority DESC, created_at LIMIT 1"
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'running', started_at = ?, worker = ? WHERE id = ?",
+                    (_now(), worker, row["id"]),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        self.add_event(row["id"], "running", {"worker": worker})
+        return self.get(row["id"])
+
+    def set_run(self, job_id: str, *, run_id: str, workdir: str) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET run_id = ?, workdir = ? WHERE id = ?", (run_id, workdir, job_id))
+
+    def finish(
+        self,
+        job_id: str,
+        status: str,
+        *,
+        result: dict[str, Any] | None = None,
+        error: str | None = None,
+    ) -> Job:
+        if status not in TERMINAL_STATUSES:
+            raise ValueError(f"非终止状态: {status}")
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, result = ?, error = ? WHERE id = ?",
+                (status, _now(), json.dumps(result, ensure_ascii=False) if result else None, error, job_id),
+            )
+        self.add_event(job_id, status, {"error": error} if error else {})
+        return self.get(job_id)
+
+    def update_result(self, job_id: str, patch: dict[str, Any]) -> Job:
+        """Merge `patch` into a job's result (e.g. a background review landing after finish)."""
+        with self._lock:
+            row = self._conn.execute("SELECT result FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                raise KeyError(job_id)
+            result = {**(json.loads(row["result"]) if row["result"] else {}), **patch}
+            self._conn.execute(
+                "UPDATE jobs SET result = ? WHERE id = ?", (json.dumps(result, ensure_ascii=False), job_id)
+            )
+        return self.get(job_id)
+
+    def request_cancel(self, job_id: str) -> Job:
+        """Queued jobs are cancelled immediately; running jobs stop at their next graph step."""
+        job = self.get(job_id)
+        if job.status == "queued":
+            with self._lock:
+                cur = self._conn.execute(
+                    "UPDATE jobs SET status = 'cancelled', finished_at = ?, cancel_requested = 1 "
+                    "WHERE id = ? AND status = 'queued'",
+                    (_now(), job_id),
+                )
+            if cur.rowcount:
+                self.add_event(job_id, "cancelled", {})
+                return self.get(job_id)
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ?", (job_id,))
+        return self.get(job_id)
+
+    def is_cancel_requested(self, job_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    def requeue_running(self) -> int:
+        """Crash recovery: jobs left `running` by a dead process go back to the queue."""
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL, worker = NULL WHERE status = 'running'"
+            )
+        return cur.rowcount
+
+    # --- events ------------------------------------------------------------------------------
+
+    def add_event(self, job_id: str, kind: str, payload: dict[str, Any]) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COALESCE(MAX(seq), -1) + 1 AS next FROM events WHERE job_id = ?", (job_id,)
+            ).fetchone()
+            seq = row["next"]
+            self._conn.execute(
+                "INSERT INTO events (job_id, seq, ts, kind, payload) VALUES (?, ?, ?, ?, ?)",
+                (job_id, seq, _now(), kind, json.dumps(payload, ensure_ascii=False)),
+            )
+        return seq
+
+    def events(self, job_id: str, *, after: int = -1, limit: int = 500) -> list[dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, ts, kind, payload FROM events WHERE job_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+                (job_id, after, limit),
+            ).fetchall()
+        return [{"seq": r["seq"], "ts": r["ts"], "kind": r["kind"], "data": json.loads(r["payload"])} for r in rows]
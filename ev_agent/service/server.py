@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import json
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+from urllib.parse import parse_qs, unquote, urlparse
+
+from .job_queue import TERMINAL_STATUSES, JobQueue
+from .workers import WorkerPool
+
+# Routes (JSON unless noted):
+#   GET  /health
+#   POST /jobs                         {"goal": str, "priority"?: int, "fault_inject"?: bool, "deadline_s"?: float}
+#   GET  /jobs?status=&limit=
+#   GET  /jobs/<id>
+#   POST /jobs/<id>/cancel
+#   GET  /jobs/<id>/events?after=N     add &stream=1 for server-sent events until the job ends
+#   GET  /jobs/<id>/artifacts          file list of the job's workdir
+#   GET  /jobs/<id>/artifacts/<path>   raw file content (text/plain)
+
+
+class ServiceServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, addr: tuple[str, int], queue: JobQueue, pool: WorkerPool) -> None:
+        super().__init__(addr, _Handler)
+        self.queue = queue
+        self.pool = pool
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: ServiceServer
+
+    def log_message(self, format: str, *args: Any) -> None:  # keep stdout quiet
+        return
+
+    # --- helpers -----------------------------------------------------------------------------
+
+    def _send_json(self, obj: Any, status: HTTPStatus = HTTPStatus.OK) -> None:
+        body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status: HTTPStatus, message: str) -> None:
+        self._send_json({"error": message}, status)
+
+    def _read_json(self) -> dict[str, Any]:
+        """The request body as a JSON object; ValueError (-> 400) for anything else."""
+        n = int(self.headers.get("Content-Length") or 0)
+        if n <= 0:
+            return {}
+        try:
+            body = json.loads(self.rfile.read(n).decode("utf-8"))
+        except ValueError as e:  # JSONDecodeError / UnicodeDecodeError
+            raise ValueError(f"请求体不是合法的 JSON：{e}") from None
+        if not isinstance(body, dict):
+            raise ValueError("请求体必须是 JSON 对象")
+        return body
+
+    def _route(self) -> tuple[list[str], dict[str, list[str]]]:
+        u = urlparse(self.path)
+        parts = [unquote(p) for p in u.path.split("/") if p]
+        return parts, parse_qs(u.query)
+
+    # --- verbs -------------------------------------------------------------------------------
+
+    def do_GET(self) -> None:
+        parts, qs = self._route()
+        q = self.server.queue
+        try:
+            if parts == ["health"]:
+                return self._send_json({"ok": True, "workers": self.server.pool.workers})
+            if parts == ["jobs"]:
+                status = (qs.get("status") or [None])[0]
+                limit = int((qs.get("limit") or ["100"])[0])
+                return self._send_json([j.as_dict() for j in q.list(status=status, limit=limit)])
+            if len(parts) == 2 and parts[0] == "jobs":
+                return self._send_json(q.get(parts[1]).as_dict())
+            if len(parts) == 3 and parts[0] == "jobs" and parts[2] == "events":
+                after = int((qs.get("after") or ["-1"])[0])
+                if (qs.get("stream") or ["0"])[0] in ("1", "true"):
+                    return self._stream_events(parts[1], after)
+                return self._send_json(q.events(parts[1], after=after))
+            if len(parts) >= 3 and parts[0] == "jobs" and parts[2] == "artifacts":
+                return self._artifacts(parts[1], "/".join(parts[3:]))
+        except KeyError:
+            return self._error(HTTPStatus.NOT_FOUND, "job 不存在")
+        self._error(HTTPStatus.NOT_FOUND, "未知路径")
+
+    def do_POST(self) -> None:
+        parts, _ = self._route()
+        q = self.server.queue
+        try:
+            if parts == ["jobs"]:
+                body = self._read_json()
+                goal = str(body.get("goal") or "").strip()
+                if not goal:
+                    return self._error(HTTPStatus.BAD_REQUEST, "goal 不能为空")
+                job = q.submit(
+                    goal,
+                    priority=int(body.get("priority") or 0),
+                    options={
+                        "fault_inject": bool(body.get("fault_inject")),
+                        "deadline_s": float(body.get("deadline_s") or 0),
+                    },
+                )
+                self.server.pool.notify()
+                return self._send_json(job.as_dict(), HTTPStatus.CREATED)
+            if len(parts) == 3 and parts[0] == "jobs" and parts[2] == "cancel":
+                return self._send_json(q.request_cancel(parts[1]).as_dict())
+        except KeyError:
+            return self._error(HTTPStatus.NOT_FOUND, "job 不存在")
+        except (ValueError, TypeError) as e:  # malformed body or field types
+            return self._error(HTTPStatus.BAD_REQUEST, str(e))
+        self._error(HTTPStatus.NOT_FOUND, "未知路径")
+
+    # --- endpoints ---------------------------------------------------------------------------
+
+    def _stream_events(self, job_id: str, after: int) -> None:
+        q = self.server.queue
+        q.get(job_id)  # 404 before committing to a stream
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        try:
+            while True:
+                for ev in q.events(job_id, after=after):
+                    after = ev["seq"]
+                    self.wfile.write(f"id: {ev['seq']}\ndata: {json.dumps(ev, ensure_ascii=False)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+                if q.get(job_id).status in TERMINAL_STATUSES and not q.events(job_id, after=after, limit=1):
+                    return
+                time.sleep(0.5)
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+    def _artifacts(self, job_id: str, rel: str) -> None:
+        job = self.server.queue.get(job_id)
+        if not job.workdir:
+            return self._send_json([])
+        root = Path(job.workdir).resolve()
+        if not rel:
+            files = [
+                {"path": p.relative_to(root).as_posix(), "size": p.stat().st_size}
+                for p in sorted(root.rglob("*"))
+                if p.is_file() and "__pycache__" not in p.parts
+            ]
+            return self._send_json(files)
+        p = (root / rel).resolve()
+        if not str(p).startswith(str(root)) or not p.is_file():
+            return self._error(HTTPStatus.NOT_FOUND, "文件不存在")
+        body = p.read_bytes()
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import threading
+import traceback
+from pathlib import Path
+
+from ev_agent.config import Settings
+from ev_agent.llm import build_router
+from ev_agent.runner import ReviewQueue, build_graph, execute_run
+from ev_agent.schema import TeamState
+from ev_agent.utils.artifact_store import ArtifactStore
+from ev_agent.utils.fix_memory import FixMemory
+from ev_agent.utils.qa_cache import QACache
+from ev_agent.utils.run_log import make_run_id
+
+from .job_queue import Job, JobQueue
+
+
+class WorkerPool:
+    """
+    Threads that claim jobs from the JobQueue and run them through the team graph.
+
+    Everything expensive is built once per process and shared across jobs: the compiled team
+    graph, the model router (and with it the pooled, rate-limited LLM clients) and the artifact store.
+    Each job gets its own workdir under `<service_dir>/jobs/<job_id>`.
+    """
+
+    def __init__(self, settings: Settings, queue: JobQueue, *, workers: int, poll_s: float = 0.5) -> None:
+        self.settings = settings
+        self.queue = queue
+        self.workers = max(1, workers)
+        self.poll_s = poll_s
+        self.router = build_router(settings)
+        self.store = ArtifactStore(settings.artifact_dir) if settings.artifact_dir else None
+        self.qa_cache = QACache(settings.qa_cache_path) if settings.qa_cache_path else None
+        self.fix_memory = FixMemory(settings.fix_memory_path) if settings.fix_memory_path else None
+        self.jobs_dir = settings.service_dir / "jobs"
+        # Async review: jobs finish at QA pass; review notes are merged into the result later.
+        self.reviews = ReviewQueue(self.router) if settings.review_mode == "async" else None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    def start(self) -> None:
+        for i in range(self.workers):
+            t = threading.Thread(target=self._loop, args=(f"worker-{i}",), name=f"ev-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def notify(self) -> None:
+        """Wake idle workers early (e.g. right after a submit)."""
+        self._wake.set()
+
+    def stop(self, timeout_s: float | None = None) -> None:
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout_s)
+        if self.reviews is not None:
+            self.reviews.shutdown(wait=False)
+        self.router.close()
+
+    def _loop(self, name: str) -> None:
+        while not self._stop.is_set():
+            job = self.queue.claim_next(name)
+            if job is None:
+                self._wake.wait(self.poll_s)
+                self._wake.clear()
+                continue
+            self.run_job(job)
+
+    def workdir_for(self, job: Job) -> Path:
+        return (self.jobs_dir / job.id).resolve()
+
+    def run_job(self, job: Job) -> None:
+        workdir = self.workdir_for(job)
+        workdir.mkdir(parents=True, exist_ok=True)
+        run_id = f"{make_run_id()}_{job.id[:8]}"
+        self.queue.set_run(job.id, run_id=run_id, workdir=str(workdir))
+        published = 0
+
+        def on_step(s: TeamState) -> None:
+            nonlocal published
+            for e in s.trace:
+                if e.seq >= published:
+                    self.queue.add_event(job.id, "trace", e.as_dict())
+                    published = e.seq + 1
+
+        try:
+            graph = build_graph(
+                self.settings,
+                router=self.router,
+                workdir=workdir,
+                store=self.store,
+                qa_cache=self.qa_cache,
+                fix_memory=self.fix_memory,
+                fault_inject=bool(job.options.get("fault_inject")),
+            )
+            result = execute_run(
+                graph,
+                job.goal,
+                workdir=workdir,
+                log_dir=self.settings.log_dir,
+                run_id=run_id,
+                on_step=on_step,
+                should_stop=lambda: self.queue.is_cancel_requested(job.id),
+                review_queue=self.reviews,
+                deadline_s=float(job.options.get("deadline_s") or self.settings.run_deadline_s),
+            )
+        except Exception as e:
+            self.queue.finish(job.id, "failed", error=f"{type(e).__name__}: {e}\n{traceback.format_exc()}")
+            return
+        finally:
+            if self.store is not None:
+                self.store.prune_raw()  # decompressed copies unused for a while
+
+        s = result.state
+        summary = {
+            "run_id": result.run_id,
+            "qa_passed": not s.error_log,
+            "iterations": s.iteration,
+            "stop_reason": s.stop_reason,
+            "files": s.code_paths(),
+            "error_log": s.error_log,
+            "diagnostics": [d.model_dump() for d in s.diagnostics],
+            "review_notes": s.review_notes,
+            "log_path": str(result.log_paths.jsonl_path) if result.log_paths else None,
+        }
+        if result.cancelled:
+            self.queue.finish(job.id, "cancelled", result=summary)
+            return
+        if result.review is not None:
+            summary["review_pending"] = True
+        self.queue.finish(job.id, "succeeded" if summary["qa_passed"] else "failed", result=summary)
+        if result.review is not None:
+            result.review.add_done_callback(lambda f: self._review_done(job.id, f))
+
+    def _review_done(self, job_id: str, future) -> None:
+        e = future.exception()
+        if e is not None:
+            self.queue.update_result(job_id, {"review_pending": False, "review_error": f"{type(e).__name__}: {e}"})
+            self.queue.add_event(job_id, "review_failed", {"error": str(e)})
+            return
+        notes = future.result().review_notes
+        self.queue.update_result(job_id, {"review_pending": False, "review_notes": notes})
+        self.queue.add_event(job_id, "review", {"review_notes": notes})
@@ -1,16 +1,28 @@
 from __future__ import annotations
 
 import json
+import sys
 import time
 from pathlib import Path
 
 import streamlit as st
 
+# `streamlit run ev_agent/ui/streamlit_app.py` only puts this file's directory on sys.path.
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from ev_agent.utils.log_index import LogIndex  # noqa: E402
+from ev_agent.utils.run_log import open_log, read_trace  # noqa: E402
+
+
+@st.cache_resource
+def get_index(log_dir: str) -> LogIndex:
+    return LogIndex(Path(log_dir))
+
 
 def read_jsonl(path: Path, limit: int = 5000) -> list[dict]:
     if not path.exists():
         return []
-    lines = path.read_text(encoding="utf-8", errors="replace").splitlines()
+    with open_log(path) as f:
+        lines = f.read().splitlines()
     if len(lines) > limit:
         lines = lines[-limit:]
     out: list[dict] = []
@@ -43,13 +55,16 @@ st.set_page_config(page_title="EV-Agent Monitor", layout="wide")
 st.title("EV-Agent 可视化面板")
 
 log_dir = Path(st.sidebar.text_input("EV_LOG_DIR", value="logs")).resolve()
-log_dir.mkdir(parents=True, exist_ok=True)
-log_files = sorted(log_dir.glob("run_*.jsonl"), key=lambda p: p.stat().st_mtime, reverse=True)
+index = get_index(str(log_dir))
+# Incremental: only unfinished runs are re-read, and only their new lines.
+index.ingest()
+runs = [r for r in index.list_runs(limit=500) if r["log_path"]]
 
 selected = st.sidebar.selectbox(
     "选择运行日志",
-    options=[str(p) for p in log_files],
-    index=0 if log_files else None,
+    options=[r["log_path"] for r in runs],
+    format_func=lambda p: next(f"{r['run_id']} · {r['status']} · {r['goal'][:24]}" for r in runs if r["log_path"] == p),
+    index=0 if runs else None,
     placeholder="没有找到 run_*.jsonl（请先运行 python -m ev_agent.run ...）",
 )
 
@@ -87,12 +102,19 @@ st.caption(f"log: `{log_path}`")
 if workdir_path:
     st.caption(f"workdir: `{workdir_path}`")
 
-tabs = st.tabs(["Trace", "QA", "Files", "Review"])
+tabs = st.tabs(["Trace", "QA", "Files", "Review", "统计"])
 
 with tabs[0]:
     trace = state.get("trace") or []
     st.subheader("Trace（最近）")
     st.dataframe(trace[-200:], use_container_width=True)
+    trace_path = log_path.with_name(log_path.name.replace(".jsonl", ".trace.jsonl"))
+    trace_total = int(state.get("trace_total") or 0)
+    if trace_path.exists() and trace_total > len(trace):
+        st.subheader(f"完整 Trace 历史（共 {trace_total} 条）")
+        page_size = 200
+        page = st.number_input("页码", min_value=1, max_value=max(1, -(-trace_total // page_size)), value=1)
+        st.dataframe(read_trace(trace_path, offset=(page - 1) * page_size, limit=page_size), use_container_width=True)
     st.subheader("每一步文件变更摘要（added / modified / removed）")
     rows = []
     for e in events:
@@ -115,8 +137,15 @@ with tabs[1]:
     st.subheader("QA 报告 / 报错")
     err = state.get("error_log") or ""
     qa_report = state.get("qa_report") or ""
+    diagnostics = state.get("diagnostics") or []
     if err:
         st.error("当前存在 error_log（会触发重试或失败退出）")
+    if diagnostics:
+        st.dataframe(
+            [{k: d.get(k) for k in ("category", "file", "line", "message", "check")} for d in diagnostics],
+            use_container_width=True,
+        )
+    if err:
         st.code(err)
     st.text_area("qa_report", value=qa_report, height=280)
 
@@ -156,6 +185,22 @@ with tabs[3]:
     st.subheader("Reviewer 输出")
     st.text_area("review_notes", value=state.get("review_notes") or "", height=320)
 
+with tabs[4]:
+    days = st.slider("时间窗口（天）", min_value=1, max_value=90, value=7)
+    since = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(time.time() - days * 86400))
+    summary = index.summary(since=since)
+    s1, s2, s3, s4 = st.columns(4)
+    s1.metric("runs", summary["runs"])
+    s2.metric("qa_passed", f"{summary['passed']}/{summary['runs']}")
+    s3.metric("avg iterations", f"{summary['avg_iterations'] or 0:.2f}")
+    s4.metric("avg duration", f"{summary['avg_duration_s'] or 0:.1f}s")
+    st.subheader("各节点耗时（秒）")
+    st.dataframe(index.node_latency(since=since), use_container_width=True)
+    st.subheader("QA 失败类别")
+    st.dataframe(index.qa_categories(since=since), use_container_width=True)
+    min_iters = st.number_input("迭代次数不少于", min_value=1, value=3)
+    st.dataframe(index.runs_by_iterations(int(min_iters), since=since), use_container_width=True)
+
 if auto:
     time.sleep(interval)
     st.rerun()
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+import zlib
+from pathlib import Path
+from typing import IO
+
+from .files import ChangeSet, write_code_files
+
+try:  # Optional: zstd gives much better ratio/speed; zlib keeps the store usable without it.
+    import zstandard as _zstd
+except ImportError:  # pragma: no cover - depends on environment
+    _zstd = None
+
+try:  # Reflinks need ioctl (POSIX); elsewhere files are simply written.
+    import fcntl as _fcntl
+except ImportError:  # pragma: no cover - depends on environment
+    _fcntl = None
+
+Manifest = dict[str, str]  # rel_path -> sha256
+
+RAW_GRACE_S = 3600.0  # raw copies used more recently than this are kept
+FICLONE = 0x40049409  # linux/fs.h: share a file's extents copy-on-write (btrfs, XFS, bcachefs, ...)
+
+
+class ArtifactStore:
+    """
+    Local content-addressed store for generated code.
+
+    Layout under `root`:
+    - objects/ab/<sha256>.zst|.zz   compressed blobs (deduped across iterations and runs)
+    - raw/ab/<sha256>               decompressed read-only copies, the source of reflinks
+    - manifests/<run_id>/iter_NNN.json   {rel_path: sha256} per coder iteration
+
+    Workdir files are independent and writable: `clone_to` reflinks them from `raw/` where the
+    filesystem supports copy-on-write clones (disk blocks stay shared until a file is edited),
+    and callers write a plain copy otherwise. `raw/` is a cache: copies unused for a while are
+    removed by `prune_raw` and recreated on demand.
+    """
+
+    def __init__(self, root: Path, *, level: int = 3) -> None:
+        self.root = root.resolve()
+        self.level = level
+        self._reflinks: bool | None = None  # None until the first clone attempt tells
+        for d in ("objects", "raw", "manifests"):
+            (self.root / d).mkdir(parents=True, exist_ok=True)
+
+    # --- blobs -------------------------------------------------------------------------------
+
+    def _object_path(self, sha: str, ext: str) -> Path:
+        return self.root / "objects" / sha[:2] / f"{sha}{ext}"
+
+    def raw_path(self, sha: str) -> Path:
+        """Path of the decompressed blob, created from the compressed object on first use."""
+        p = self.root / "raw" / sha[:2] / sha
+        if p.exists():
+            os.utime(p)  # last use, for `prune_raw`
+        else:
+            _atomic_write(p, self.get_bytes(sha), read_only=True, exist_ok=True)
+        return p
+
+    def clone_to(self, sha: str, dst: Path) -> bool:
+        """
+        Reflink blob `sha` to `dst` (a writable, independent file). Returns False without touching
+        `dst` when this filesystem cannot clone; the caller then writes the content itself.
+        """
+        if self._reflinks is False or _fcntl is None:
+            return False
+        with self.raw_path(sha).open("rb") as src, dst.open("wb") as out:
+            ok = _reflink(src, out)
+        if not ok:
+            dst.unlink(missing_ok=True)
+        if self._reflinks is None:
+            self._reflinks = ok
+        return ok
+
+    def has(self, sha: str) -> bool:
+        return any(self._object_path(sha, ext).exists() for ext in (".zst", ".zz"))
+
+    def put(self, content: str | bytes) -> str:
+        data = content.encode("utf-8") if isinstance(content, str) else content
+        sha = hashlib.sha256(data).hexdigest()
+        if not self.has(sha):
+            if _zstd is not None:
+                blob, ext = _zstd.ZstdCompressor(level=self.level).compress(data), ".zst"
+            else:
+                blob, ext = zlib.compress(data, min(self.level * 2, 9)), ".zz"
+            _atomic_write(self._object_path(sha, ext), blob, exist_ok=True)
+        return sha
+
+    def get_bytes(self, sha: str) -> bytes:
+        zst = self._object_path(sha, ".zst")
+        if zst.exists():
+            if _zstd is None:
+                raise RuntimeError(f"对象 {sha} 使用 zstd 压缩，但未安装 zstandard")
+            return _zstd.ZstdDecompressor().decompress(zst.read_bytes())
+        zz = self._object_path(sha, ".zz")
+        if zz.exists():
+            return zlib.decompress(zz.read_bytes())
+        raise KeyError(f"artifact 不存在: {sha}")
+
+    def get(self, sha: str) -> str:
+        return self.get_bytes(sha).decode("utf-8")
+
+    # --- manifests ---------------------------------------------------------------------------
+
+    def put_files(self, code_files: dict[str, str]) -> Manifest:
+        return {path: self.put(content) for path, content in code_files.items()}
+
+    def read_files(self, manifest: Manifest) -> dict[str, str]:
+        return {path: self.get(sha) for path, sha in manifest.items()}
+
+    def _manifest_path(self, run_id: str, iteration: int) -> Path:
+        return self.root / "manifests" / run_id / f"iter_{iteration:03d}.json"
+
+    def save_manifest(self, run_id: str, iteration: int, manifest: Manifest) -> Path:
+        p = self._manifest_path(run_id, iteration)
+        _atomic_write(p, json.dumps(manifest, ensure_ascii=False, indent=1, sort_keys=True).encode("utf-8"))
+        return p
+
+    def load_manifest(self, run_id: str, iteration: int) -> Manifest:
+        return json.loads(self._manifest_path(run_id, iteration).read_text(encoding="utf-8"))
+
+    def list_manifests(self, run_id: str) -> list[int]:
+        d = self.root / "manifests" / run_id
+        return sorted(int(p.stem[5:]) for p in d.glob("iter_*.json")) if d.exists() else []
+
+    # --- workdirs ----------------------------------------------------------------------------
+
+    def materialize(
+        self,
+        manifest: Manifest,
+        workdir: Path,
+        *,
+        previous: list[str] | tuple[str, ...] = (),
+        atomic: bool = False,
+    ) -> ChangeSet:
+        """Write the manifest's files into `workdir` (unchanged files are left untouched)."""
+        return write_code_files(workdir, self.read_files(manifest), previous=previous, atomic=atomic, store=self)
+
+    # --- maintenance -------------------------------------------------------------------------
+
+    def prune_raw(self, *, min_age_s: float = RAW_GRACE_S) -> int:
+        """Delete raw copies not used for `min_age_s` (reflinked workdir files keep their data)."""
+        cutoff = time.time() - min_age_s
+        removed = 0
+        for p in (self.root / "raw").rglob("*"):
+            try:
+                if not p.is_file() or p.stat().st_mtime > cutoff:
+                    continue
+                p.chmod(0o644)  # read-only files cannot be unlinked on Windows
+                p.unlink()
+                removed += 1
+            except FileNotFoundError:
+                continue
+        return removed
+
+    def stats(self) -> dict[str, int]:
+        objs = [p for p in (self.root / "objects").rglob("*") if p.is_file()]
+        return {"objects": len(objs), "compressed_bytes": sum(p.stat().st_size for p in objs)}
+
+
+def _reflink(src: IO[bytes], dst: IO[bytes]) -> bool:
+    try:
+        _fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    except OSError:  # EOPNOTSUPP / EINVAL / EXDEV: no copy-on-write clones here
+        return False
+    return True
+
+
+def _atomic_write(path: Path, data: bytes, *, read_only: bool = False, exist_ok: bool = False) -> None:
+    """
+    Write via a unique temp file + rename. With `exist_ok` (content-addressed blobs: every writer
+    has the same bytes) an existing destination counts as success, also when another writer wins the race.
+    """
+    if exist_ok and path.exists():
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp, 0o444 if read_only else 0o644)
+        os.replace(tmp, path)
+    except OSError:
+        Path(tmp).unlink(missing_ok=True)
+        if exist_ok and path.exists():
+            return
+        raise
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+# Run-level deadline carried in a contextvar, so every LLM request and QA subprocess started on
+# behalf of a run (however deep in the call stack) can size its timeout from the remaining budget.
+# Threads started by nodes must copy the context (`contextvars.copy_context().run`) to inherit it.
+
+_DEADLINE: contextvars.ContextVar[float | None] = contextvars.ContextVar("ev_run_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The run's deadline passed; raised instead of starting (or continuing) work."""
+
+
+@contextmanager
+def run_deadline(seconds: float | None) -> Iterator[None]:
+    """Set a deadline `seconds` from now for the enclosed code (None / <= 0: no deadline)."""
+    token = _DEADLINE.set(time.monotonic() + seconds if seconds and seconds > 0 else None)
+    try:
+        yield
+    finally:
+        _DEADLINE.reset(token)
+
+
+def remaining() -> float | None:
+    """Seconds left before the current deadline, or None without one."""
+    at = _DEADLINE.get()
+    return None if at is None else at - time.monotonic()
+
+
+def check_deadline() -> None:
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(f"运行超过截止时间（超出 {-left:.1f}s）")
+
+
+def timeout_for(default: float | None) -> float | None:
+    """`default` capped by the remaining budget; raises DeadlineExceeded when nothing is left."""
+    left = remaining()
+    if left is None:
+        return default
+    check_deadline()
+    return left if default is None else min(default, left)
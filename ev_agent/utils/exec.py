@@ -1,9 +1,24 @@
 from __future__ import annotations
 
+import re
 import subprocess
 from dataclasses import dataclass
 from pathlib import Path
 
+from ev_agent.schema import Diagnostic
+
+from .deadline import DeadlineExceeded, remaining, timeout_for
+
+# Upper bound for one compileall pass; a run deadline shortens it further.
+COMPILEALL_TIMEOUT_S = 300.0
+
+_COMPILING_RE = re.compile(r"^Compiling '(?P<path>.+)'\.\.\.$")
+_FILE_LINE_RE = re.compile(r'File "(?P<path>[^"]+)", line (?P<line>\d+)')
+# Syntax errors print a traceback ending in "SyntaxError: msg"; "Sorry: IndentationError: msg (b.py, line 2)"
+# is the one-line form compileall uses for some errors.
+_EXC_RE = re.compile(r"^(?:\*\*\* )?(?:Sorry: )?(?P<exc>[A-Z]\w*(?:Error|Exception)): (?P<msg>.*?)(?: \([^()]+, line (?P<line>\d+)\))?$")
+_SYNTAX_EXCEPTIONS = {"SyntaxError", "IndentationError", "TabError"}
+
 
 @dataclass(frozen=True)
 class CmdResult:
@@ -12,10 +27,51 @@ class CmdResult:
     stderr: str
 
 
-def run_compileall(workdir: Path) -> CmdResult:
+def run_compileall(workdir: Path, *, timeout_s: float | None = COMPILEALL_TIMEOUT_S) -> CmdResult:
     # compileall does not import modules; it only compiles source to bytecode.
     cmd = ["python", "-m", "compileall", str(workdir)]
-    p = subprocess.run(cmd, capture_output=True, text=True)
+    try:
+        p = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout_for(timeout_s))
+    except subprocess.TimeoutExpired as e:
+        left = remaining()
+        if left is not None and left <= 0:
+            raise DeadlineExceeded("QA 检查因运行截止时间被中止") from e
+        out = e.stdout.decode(errors="replace") if isinstance(e.stdout, bytes) else e.stdout or ""
+        return CmdResult(-1, out, f"compileall 超时（{e.timeout:.0f}s）")
     return CmdResult(p.returncode, p.stdout, p.stderr)
 
 
+def compileall_diagnostics(res: CmdResult, workdir: Path) -> list[Diagnostic]:
+    """Structured findings of a compileall run (empty when it passed)."""
+    if res.returncode == 0:
+        return []
+    if res.returncode < 0:
+        return [Diagnostic(category="timeout", check="compileall", message=res.stderr.strip() or "timeout")]
+    root = str(Path(workdir).resolve())
+
+    def rel(path: str) -> str:
+        return path[len(root) :].lstrip("/\\") if path.startswith(root) else path
+
+    found: list[Diagnostic] = []
+    file, line = "", 0
+    for ln in (res.stdout + "\n" + res.stderr).splitlines():
+        if m := _COMPILING_RE.match(ln):
+            file, line = rel(m.group("path")), 0
+        elif m := _FILE_LINE_RE.search(ln):
+            file, line = rel(m.group("path")), int(m.group("line"))
+        elif m := _EXC_RE.match(ln.strip()):
+            exc = m.group("exc")
+            found.append(
+                Diagnostic(
+                    category="syntax" if exc in _SYNTAX_EXCEPTIONS else "error",
+                    check="compileall",
+                    message=f"{exc}: {m.group('msg')}",
+                    file=file,
+                    line=int(m.group("line") or line),
+                )
+            )
+            line = 0
+    if not found:
+        last = next((ln.strip() for ln in reversed(res.stderr.splitlines() or res.stdout.splitlines()) if ln.strip()), "")
+        found.append(Diagnostic(category="error", check="compileall", message=last or f"returncode={res.returncode}"))
+    return found
@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import ast
+import builtins
+import io
+import re
+import sys
+import tokenize
+from dataclasses import dataclass
+
+# Rule-based repairs for mechanical syntax failures (no model call). Each rule gets the source and
+# the current SyntaxError and returns a changed source or None; `repair_source` applies rules one
+# at a time and re-checks with compile() until the file compiles or no rule makes progress. A rewrite
+# only counts as progress if the error it targeted is gone or has moved to other code (the same
+# message on the same source text, merely renumbered by the edit, does not count).
+
+MAX_ROUNDS = 8
+BRACKET_TAIL_LINES = 5  # only close brackets opened this close to the end of the file
+
+_CLOSERS = {"(": ")", "[": "]", "{": "}"}
+_NEVER_CLOSED_RE = re.compile(r"'([(\[{])' was never closed")
+_INDENT_RE = re.compile(r"^[ \t]*")
+# Python 3.12+ tokenizes f-strings into parts; older versions have a single STRING token.
+_FSTRING_START = getattr(tokenize, "FSTRING_START", -1)
+_FSTRING_END = getattr(tokenize, "FSTRING_END", -1)
+
+
+@dataclass(frozen=True)
+class FastFixResult:
+    source: str
+    rules: tuple[str, ...]  # rules that changed the source, in order
+    ok: bool  # the result compiles
+
+
+def _check(source: str, path: str) -> SyntaxError | None:
+    try:
+        compile(source, path, "exec", dont_inherit=True)
+    except SyntaxError as e:
+        return e
+    except ValueError as e:  # e.g. null bytes
+        return SyntaxError(str(e))
+    return None
+
+
+def _same_error(a: SyntaxError, b: SyntaxError) -> bool:
+    # No line number: an edit above the error shifts it without touching it.
+    return (type(a), a.msg, (a.text or "").strip()) == (type(b), b.msg, (b.text or "").strip())
+
+
+def _string_lines(source: str) -> set[int] | None:
+    """1-based lines inside multi-line string literals (past their first line); None if untokenizable."""
+    inside: set[int] = set()
+    fstring_starts: list[int] = []
+    try:
+        for tok in tokenize.generate_tokens(io.StringIO(source).readline):
+            if tok.type == tokenize.STRING:
+                inside.update(range(tok.start[0] + 1, tok.end[0] + 1))
+            elif tok.type == _FSTRING_START:
+                fstring_starts.append(tok.start[0])
+            elif tok.type == _FSTRING_END and fstring_starts:
+                inside.update(range(fstring_starts.pop() + 1, tok.end[0] + 1))
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        return None
+    return inside
+
+
+def _indent(line: str) -> str:
+    return _INDENT_RE.match(line).group(0)
+
+
+def strip_fences(source: str, err: SyntaxError) -> str | None:
+    """Drop Markdown code fence lines (```python ... ```) left inside a file, but not inside strings."""
+    lines = source.splitlines(keepends=True)
+    fences = {i for i, ln in enumerate(lines, 1) if ln.lstrip().startswith("```")}
+    if not fences:
+        return None
+    # Tokenize with the fences blanked (they are not Python tokens); line numbers stay the same.
+    blanked = "".join("\n" if i in fences else ln for i, ln in enumerate(lines, 1))
+    in_strings = _string_lines(blanked)
+    if in_strings is None:
+        return None  # cannot tell string content from code; leave the file alone
+    drop = fences - in_strings
+    if not drop:
+        return None
+    return "".join(ln for i, ln in enumerate(lines, 1) if i not in drop)
+
+
+def expand_tabs(source: str, err: SyntaxError) -> str | None:
+    """Mixed tabs/spaces: expand tabs in leading whitespace to 4 columns."""
+    if not isinstance(err, TabError) and "tab" not in (err.msg or ""):
+        return None
+    lines = source.splitlines(keepends=True)
+    return "".join(_indent(ln).expandtabs(4) + ln[len(_indent(ln)) :] for ln in lines)
+
+
+def fix_indentation(source: str, err: SyntaxError) -> str | None:
+    """Unexpected indent / missing block indent / unindent that matches no outer level."""
+    if not isinstance(err, IndentationError) or not err.lineno:
+        return None
+    lines = source.splitlines(keepends=True)
+    i = err.lineno - 1
+    if not 0 <= i < len(lines):
+        return None
+    prev = next((ln for ln in reversed(lines[:i]) if ln.strip()), "")
+    body = lines[i][len(_indent(lines[i])) :]
+    msg = err.msg or ""
+    if "unexpected indent" in msg:
+        lines[i] = _indent(prev) + body
+    elif "expected an indented block" in msg:
+        # Indent the run of lines that sits at the same level, up to the next blank line.
+        level = _indent(lines[i])
+        target = _indent(prev).expandtabs(4) + "    "
+        j = i
+        while j < len(lines) and lines[j].strip() and _indent(lines[j]) == level:
+            lines[j] = target + lines[j][len(level) :]
+            j += 1
+    elif "unindent does not match" in msg:
+        width = len(_indent(lines[i]).expandtabs(4))
+        levels = {len(_indent(ln).expandtabs(4)) for ln in lines[:i] if ln.strip()}
+        lines[i] = " " * max((w for w in levels if w <= width), default=0) + body
+    else:
+        return None
+    return "".join(lines)
+
+
+def close_brackets(source: str, err: SyntaxError) -> str | None:
+    """Close brackets left open at the very end of a file (typical of truncated output)."""
+    if not _NEVER_CLOSED_RE.search(err.msg or ""):
+        return None
+    stack: list[tuple[str, int]] = []
+    try:
+        for tok in tokenize.generate_tokens(io.StringIO(source).readline):
+            if tok.type == tokenize.OP and tok.string in _CLOSERS:
+                stack.append((tok.string, tok.start[0]))
+            elif tok.type == tokenize.OP and tok.string in _CLOSERS.values() and stack:
+                stack.pop()
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        pass
+    lines = source.splitlines()
+    last = max((i for i, ln in enumerate(lines) if ln.strip()), default=-1)
+    if not stack or last < 0 or any(line - 1 < last - BRACKET_TAIL_LINES for _b, line in stack):
+        return None
+    lines[last] = lines[last].rstrip() + "".join(_CLOSERS[b] for b, _line in reversed(stack))
+    return "\n".join(lines) + "\n"
+
+
+def add_stdlib_imports(source: str) -> str | None:
+    """`import x` for stdlib modules used as `x.attr` but never bound (compiles, then NameErrors at runtime)."""
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return None
+    bound: set[str] = set(dir(builtins))
+    used: set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            bound.update((a.asname or a.name).split(".")[0] for a in node.names)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            bound.add(node.name)
+        elif isinstance(node, ast.arg):
+            bound.add(node.arg)
+        elif isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load):
+            bound.add(node.id)
+        elif isinstance(node, ast.ExceptHandler) and node.name:
+            bound.add(node.name)
+        elif isinstance(node, (ast.Global, ast.Nonlocal)):
+            bound.update(node.names)
+        elif isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name):
+            used.add(node.value.id)
+    missing = sorted(m for m in used - bound if m in sys.stdlib_module_names and not m.startswith("_"))
+    if not missing:
+        return None
+    # After the module docstring and `from __future__` imports.
+    at = 0
+    for node in tree.body:
+        is_doc = isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str)
+        if is_doc or (isinstance(node, ast.ImportFrom) and node.module == "__future__"):
+            at = node.end_lineno or at
+            continue
+        break
+    lines = source.splitlines(keepends=True)
+    return "".join(lines[:at] + [f"import {m}\n" for m in missing] + lines[at:])
+
+
+SYNTAX_RULES = (
+    ("strip_fences", strip_fences),
+    ("expand_tabs", expand_tabs),
+    ("fix_indentation", fix_indentation),
+    ("close_brackets", close_brackets),
+)
+
+
+def repair_source(source: str, path: str, *, add_imports: bool = False) -> FastFixResult:
+    """`add_imports`: also add missing stdlib imports (only for files QA actually flagged)."""
+    applied: list[str] = []
+    err = _check(source, path)
+    for _ in range(MAX_ROUNDS):
+        if err is None:
+            break
+        for name, rule in SYNTAX_RULES:
+            fixed = rule(source, err)
+            if fixed is None or fixed == source:
+                continue
+            new_err = _check(fixed, path)
+            if new_err is not None and _same_error(new_err, err):
+                continue  # the rewrite did not touch the failure; keep the original text
+            source, err = fixed, new_err
+            applied.append(name)
+            break
+        else:
+            break  # no rule made progress
+    if add_imports and err is None and path.endswith(".py"):
+        fixed = add_stdlib_imports(source)
+        if fixed is not None and _check(fixed, path) is None:
+            source = fixed
+            applied.append("add_stdlib_imports")
+    return FastFixResult(source, tuple(applied), err is None)
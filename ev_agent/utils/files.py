@@ -1,17 +1,176 @@
 from __future__ import annotations
 
+import hashlib
+import os
+import shutil
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import TYPE_CHECKING, Iterable
 
+if TYPE_CHECKING:
+    from .artifact_store import ArtifactStore
 
-def write_code_files(workdir: Path, code_files: dict[str, str]) -> None:
+
+@dataclass(frozen=True)
+class ChangeSet:
+    """What `write_code_files` did to the workdir (paths relative to it)."""
+
+    added: tuple[str, ...] = ()
+    modified: tuple[str, ...] = ()
+    removed: tuple[str, ...] = ()
+    unchanged: tuple[str, ...] = ()
+    hashes: dict[str, str] = field(default_factory=dict)  # rel_path -> sha256 of content
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.added or self.modified or self.removed)
+
+    def as_dict(self) -> dict[str, list[str]]:
+        # Same shape as run_log.diff_fingerprints so both can be logged/compared uniformly.
+        return {"added": list(self.added), "modified": list(self.modified), "removed": list(self.removed)}
+
+
+def write_code_files(
+    workdir: Path,
+    code_files: dict[str, str],
+    *,
+    previous: Iterable[str] = (),
+    atomic: bool = False,
+    store: ArtifactStore | None = None,
+) -> ChangeSet:
+    """
+    Sync `code_files` into `workdir`, touching only what changed.
+
+    - Files whose on-disk bytes already match are left alone (mtime and __pycache__ stay valid).
+    - Paths in `previous` (the last generation) that are no longer in `code_files` are deleted.
+    - `atomic=True` builds the full tree in a sibling staging dir (unchanged files hardlinked)
+      and swaps it in with two directory renames, so readers never observe a half-written
+      project. Between the renames the workdir briefly does not exist; a crash there leaves the
+      previous tree in the backup dir, which `recover_workdir` (run first) puts back.
+    - With a `store`, files are reflinked from its content-addressed blobs where the filesystem
+      supports it (still writable, independent files) and written otherwise.
+    """
+    recover_workdir(workdir)
     workdir.mkdir(parents=True, exist_ok=True)
+    root = workdir.resolve()
+
+    added: list[str] = []
+    modified: list[str] = []
+    unchanged: list[str] = []
+    hashes: dict[str, str] = {}
     for rel_path, content in sorted(code_files.items(), key=lambda kv: kv[0].lower()):
-        p = (workdir / rel_path).resolve()
-        if not str(p).startswith(str(workdir.resolve())):
-            raise ValueError(f"Refuse to write outside workdir: {rel_path}")
-        p.parent.mkdir(parents=True, exist_ok=True)
-        tmp = p.with_suffix(p.suffix + ".tmp")
+        p = _safe_path(root, rel_path)
+        data = content.encode("utf-8")
+        hashes[rel_path] = hashlib.sha256(data).hexdigest()
+        if not p.exists():
+            added.append(rel_path)
+        elif p.stat().st_size == len(data) and p.read_bytes() == data:
+            unchanged.append(rel_path)
+        else:
+            modified.append(rel_path)
+
+    removed = sorted(
+        rel for rel in set(previous) - set(code_files) if _safe_path(root, rel).is_file()
+    )
+    changes = ChangeSet(
+        added=tuple(added),
+        modified=tuple(modified),
+        removed=tuple(removed),
+        unchanged=tuple(unchanged),
+        hashes=hashes,
+    )
+    if not changes.changed:
+        return changes
+
+    if atomic:
+        _commit_staged(root, code_files, changes, store)
+        return changes
+
+    for rel_path in [*added, *modified]:
+        _place(_safe_path(root, rel_path), code_files[rel_path], store)
+    for rel_path in removed:
+        p = _safe_path(root, rel_path)
+        p.unlink(missing_ok=True)
+        _prune_empty_dirs(root, p.parent)
+    return changes
+
+
+def _safe_path(root: Path, rel_path: str) -> Path:
+    p = (root / rel_path).resolve()
+    if not str(p).startswith(str(root)):
+        raise ValueError(f"Refuse to write outside workdir: {rel_path}")
+    return p
+
+
+def _place(p: Path, content: str, store: ArtifactStore | None) -> None:
+    # Always tmp + rename: readers never see a half-written file.
+    p.parent.mkdir(parents=True, exist_ok=True)
+    tmp = p.with_suffix(p.suffix + ".tmp")
+    if store is None or not store.clone_to(store.put(content), tmp):
         tmp.write_text(content, encoding="utf-8", newline="\n")
-        tmp.replace(p)
+    tmp.replace(p)
+
+
+def _prune_empty_dirs(root: Path, d: Path) -> None:
+    while d != root and str(d).startswith(str(root)):
+        try:
+            d.rmdir()
+        except OSError:
+            return
+        d = d.parent
+
+
+def _staging_dirs(root: Path) -> tuple[Path, Path]:
+    return root.parent / f".{root.name}.staging", root.parent / f".{root.name}.old"
+
+
+def recover_workdir(workdir: Path) -> bool:
+    """
+    Undo an interrupted staged swap: when the workdir is missing but its backup exists (a crash
+    between the two renames), the backup becomes the workdir again. Returns True if it did.
+    """
+    root = Path(workdir).resolve()
+    _staging, backup = _staging_dirs(root)
+    if root.exists() or not backup.is_dir():
+        return False
+    backup.rename(root)
+    return True
+
+
+def _commit_staged(
+    root: Path,
+    code_files: dict[str, str],
+    changes: ChangeSet,
+    store: ArtifactStore | None,
+) -> None:
+    staging, backup = _staging_dirs(root)
+    for d in (staging, backup):
+        if d.exists():
+            shutil.rmtree(d)
 
+    skip = set(changes.added) | set(changes.modified) | set(changes.removed)
+    # Carry over everything else (unchanged files, __pycache__, user files) via hardlinks.
+    for src in root.rglob("*"):
+        if src.is_dir():
+            continue
+        rel = src.relative_to(root).as_posix()
+        if rel in skip:
+            continue
+        dst = staging / rel
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copy2(src, dst)
+    for rel_path in [*changes.added, *changes.modified]:
+        _place(staging / rel_path, code_files[rel_path], store)
 
+    # Directory renames are atomic individually, but the swap is two of them back to back: roll
+    # back if the second fails; after a crash in between, `recover_workdir` restores the backup.
+    root.rename(backup)
+    try:
+        staging.rename(root)
+    except BaseException:
+        backup.rename(root)
+        raise
+    shutil.rmtree(backup, ignore_errors=True)
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import difflib
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+from ev_agent.schema import Diagnostic
+
+from .exec import CmdResult, compileall_diagnostics
+
+# Error-signature fix memory: QA failures are normalized into a signature (exception type, message
+# template, offending source line) and the patch hunks that made them go away are kept per
+# signature, so a later run can re-apply a known fix without a model round-trip.
+
+_EXC_MSG_RE = re.compile(r"^(?P<exc>[A-Z]\w*(?:Error|Exception|Warning)): (?P<msg>.*)$")
+_QUOTED_RE = re.compile(r"'[^']*'|\"[^\"]*\"")
+_NUMBER_RE = re.compile(r"\b\d+\b")
+
+HUNK_CONTEXT = 2  # unchanged lines kept around each change, used to locate it again
+HUNK_WINDOW = 3  # a hunk must touch lines within this distance of the error line
+MAX_HUNK_LINES = 40  # bigger hunks are rewrites, not fixes
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fixes (
+    signature TEXT NOT NULL,
+    patch_id TEXT NOT NULL,
+    exc TEXT NOT NULL,
+    template TEXT NOT NULL,
+    context TEXT NOT NULL,
+    hunks TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    applied INTEGER NOT NULL DEFAULT 0,
+    succeeded INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (signature, patch_id)
+);
+"""
+
+
+@dataclass(frozen=True)
+class ErrorSignature:
+    key: str
+    exc: str
+    template: str  # message with quoted strings and numbers masked
+    context: str  # the offending source line, stripped
+    path: str  # workdir-relative file
+    line: int
+
+    def describe(self) -> str:
+        return f"{self.exc}: {self.template} @ `{self.context}`"
+
+
+Hunk = dict[str, list[str]]  # {"before": lines incl. context, "after": lines incl. context}
+
+
+@dataclass(frozen=True)
+class KnownFix:
+    signature: str
+    patch_id: str
+    hunks: list[Hunk]
+    succeeded: int
+    failed: int
+
+
+def qa_diagnostics(diagnostics: list[Diagnostic], error_log: str, workdir: Path) -> list[Diagnostic]:
+    """`diagnostics`, or for states written before they existed, the findings parsed from `error_log`."""
+    if diagnostics or not error_log:
+        return list(diagnostics)
+    return compileall_diagnostics(CmdResult(1, error_log, ""), workdir)
+
+
+def _source_line(workdir: Path, path: str, line: int) -> str:
+    try:
+        lines = (Path(workdir) / path).read_text(encoding="utf-8").splitlines()
+    except (OSError, UnicodeDecodeError):
+        return ""
+    return lines[line - 1].strip() if 0 < line <= len(lines) else ""
+
+
+def error_signature(diagnostics: list[Diagnostic], workdir: Path) -> ErrorSignature | None:
+    """The first located QA error, normalized; None if nothing is recognizable."""
+    for d in diagnostics:
+        m = _EXC_MSG_RE.match(d.message)
+        if d.category not in ("syntax", "error") or not d.file or not d.line or not m:
+            continue
+        exc, msg = m.group("exc"), m.group("msg")
+        context = _source_line(workdir, d.file, d.line)
+        template = _NUMBER_RE.sub("N", _QUOTED_RE.sub("'…'", msg)).strip()
+        key = hashlib.sha256(f"{exc}\0{template}\0{context}".encode("utf-8")).hexdigest()[:32]
+        return ErrorSignature(key, exc, template, context, d.file.replace("\\", "/"), d.line)
+    return None
+
+
+def diff_hunks(before: str, after: str, *, near_line: int) -> list[Hunk]:
+    """Hunks turning `before` into `after` that touch lines around `near_line` (1-based)."""
+    a, b = before.splitlines(), after.splitlines()
+    hunks: list[Hunk] = []
+    for group in difflib.SequenceMatcher(None, a, b, autojunk=False).get_grouped_opcodes(HUNK_CONTEXT):
+        i1, i2, j1, j2 = group[0][1], group[-1][2], group[0][3], group[-1][4]
+        changed = [(o[1], o[2]) for o in group if o[0] != "equal"]
+        near = any(lo - HUNK_WINDOW <= near_line - 1 < max(hi, lo + 1) + HUNK_WINDOW for lo, hi in changed)
+        if near and (i2 - i1) <= MAX_HUNK_LINES and (j2 - j1) <= MAX_HUNK_LINES:
+            hunks.append({"before": a[i1:i2], "after": b[j1:j2]})
+    return hunks
+
+
+def apply_hunks(text: str, hunks: list[Hunk], *, near_line: int) -> str | None:
+    """Apply hunks by content (not line numbers); the match closest to `near_line` wins. None if any misses."""
+    lines = text.splitlines()
+    for h in hunks:
+        before = h["before"]
+        if not before:
+            return None
+        starts = [i for i in range(len(lines) - len(before) + 1) if lines[i : i + len(before)] == before]
+        if not starts:
+            return None
+        i = min(starts, key=lambda s: abs(s - (near_line - 1)))
+        lines[i : i + len(before)] = h["after"]
+    return "\n".join(lines) + ("\n" if text.endswith("\n") else "")
+
+
+def format_hunks(hunks: list[Hunk]) -> str:
+    out: list[str] = []
+    for h in hunks:
+        out += ["@@"] + [f"-{ln}" for ln in h["before"]] + [f"+{ln}" for ln in h["after"]]
+    return "\n".join(out)
+
+
+class FixMemory:
+    """Known fixes per error signature on SQLite (WAL); safe to share between threads and runs."""
+
+    def __init__(self, db_path: Path) -> None:
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def lookup(self, signature: ErrorSignature) -> list[KnownFix]:
+        """Fixes for this signature, best track record first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT patch_id, hunks, succeeded, failed FROM fixes WHERE signature = ? "
+                "ORDER BY succeeded - failed DESC, created_at DESC",
+                (signature.key,),
+            ).fetchall()
+        return [KnownFix(signature.key, r[0], json.loads(r[1]), r[2], r[3]) for r in rows]
+
+    def learn(self, signature: ErrorSignature, hunks: list[Hunk]) -> str:
+        blob = json.dumps(hunks, ensure_ascii=False)
+        patch_id = hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO fixes (signature, patch_id, exc, template, context, hunks, created_at, succeeded) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, 1) "
+                "ON CONFLICT (signature, patch_id) DO UPDATE SET succeeded = succeeded + 1",
+                (
+                    signature.key,
+                    patch_id,
+                    signature.exc,
+                    signature.template,
+                    signature.context,
+                    blob,
+                    datetime.utcnow().isoformat(),
+                ),
+            )
+        return patch_id
+
+    def record(self, signature_key: str, patch_id: str, *, applied: bool = False, ok: bool | None = None) -> None:
+        col = "applied" if applied else ("succeeded" if ok else "failed")
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE fixes SET {col} = {col} + 1 WHERE signature = ? AND patch_id = ?",
+                (signature_key, patch_id),
+            )
@@ -2,6 +2,27 @@ from __future__ import annotations
 
 import json
 import re
+from dataclasses import dataclass
+from typing import Iterator
+
+_DECODER = json.JSONDecoder()
+# Only these characters can change scanner state; everything else is skipped by the regex engine.
+_SCAN_RE = re.compile(r'[{}"\\]')
+_VALID_ESCAPES = set('"\\/bfnrtu')
+_CTRL_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+_FILES_KEY_RE = re.compile(r'"files"\s*:\s*\[')
+_PATH_RE = re.compile(r'"path"\s*:\s*"((?:[^"\\]|\\.)*)"')
+# Brace positions the last-resort decode tries: each failed attempt can scan to the end of the text,
+# so this bounds the work on long, brace-heavy, malformed output to a linear multiple of its size.
+MAX_DECODE_STARTS = 16
+
+
+@dataclass(frozen=True)
+class CoderPayload:
+    obj: dict  # {"files": [...], "notes": "..."}
+    repaired: bool  # defects (trailing commas, raw newlines, bad escapes) were fixed first
+    truncated: bool  # output was cut off; `obj` only holds the complete `files` entries
+    partial_path: str | None = None  # file that was cut mid-way, when its path is known
 
 
 def extract_first_json_object(text: str) -> dict:
@@ -11,61 +32,189 @@ def extract_first_json_object(text: str) -> dict:
     Supported:
     - ```json { ... } ```
     - raw { ... } with extra text around
+
+    Raises ValueError (json.JSONDecodeError included) when nothing parses, also for input nested
+    too deeply for the decoder.
     """
+    try:
+        return _extract_first_json_object(text)
+    except RecursionError as e:
+        raise ValueError("JSON 嵌套层级过深，无法解析") from e
+
+
+def _extract_first_json_object(text: str) -> dict:
     # Prefer fenced json blocks
     fenced = re.search(r"```json\s*([\s\S]*?)\s*```", text, flags=re.IGNORECASE)
     if fenced:
         candidate = fenced.group(1).strip()
         return json.loads(candidate)
 
-    # Fallback: locate a valid JSON object by scanning for balanced braces.
-    starts = [m.start() for m in re.finditer(r"\{", text)]
-    if not starts:
+    first = text.find("{")
+    if first < 0:
         raise ValueError("未找到 JSON 对象")
 
-    for i in starts:
-        frag = _extract_balanced_object(text, i)
-        if frag is None:
-            continue
+    # Fast path: the C decoder parses one value starting at the first brace and ignores the rest.
+    try:
+        obj, _ = _DECODER.raw_decode(text, first)
+        if isinstance(obj, dict):
+            return obj
+    except json.JSONDecodeError:
+        pass
+
+    # Fallback: locate a valid JSON object among balanced-brace candidates (single scan).
+    for frag in iter_json_object_candidates(text):
         try:
-            return json.loads(frag)
+            obj = json.loads(frag)
         except Exception:
             continue
+        if isinstance(obj, dict):
+            return obj
+
+    # Last resort for prose with stray quotes/braces that desync the scanner: let the C decoder
+    # try the first few '{' (see MAX_DECODE_STARTS).
+    for i, m in enumerate(re.finditer(r"\{", text)):
+        if i >= MAX_DECODE_STARTS:
+            break
+        try:
+            obj, _ = _DECODER.raw_decode(text, m.start())
+        except json.JSONDecodeError:
+            continue
+        if isinstance(obj, dict):
+            return obj
 
     raise ValueError("找到疑似 JSON，但解析失败（可能包含多余文本或不完整）")
 
 
-def _extract_balanced_object(s: str, start_idx: int) -> str | None:
+def iter_json_object_candidates(text: str) -> Iterator[str]:
+    """
+    Yield balanced `{...}` substrings in order of their opening brace, scanning the text once.
+
+    String/escape state is tracked only inside braces (quotes in surrounding prose are ignored),
+    so braces inside JSON strings don't count. Each top-level object is yielded first, followed by
+    the objects nested in it; if the text ends with unclosed braces, the complete objects found
+    inside them are still yielded.
+    """
+    stack: list[int] = []
+    nested: list[tuple[int, int]] = []
+    in_str = False
+    skip_to = -1  # index just past an escaped character
+    for m in _SCAN_RE.finditer(text):
+        j = m.start()
+        if j < skip_to:
+            continue
+        ch = text[j]
+        if in_str:
+            if ch == "\\":
+                skip_to = j + 2
+            elif ch == '"':
+                in_str = False
+            continue
+        if ch == '"':
+            if stack:
+                in_str = True
+        elif ch == "{":
+            stack.append(j)
+        elif ch == "}" and stack:
+            start = stack.pop()
+            if stack:
+                nested.append((start, j + 1))
+                continue
+            yield text[start : j + 1]
+            for s, e in sorted(nested):
+                yield text[s:e]
+            nested.clear()
+    for s, e in sorted(nested):
+        yield text[s:e]
+
+
+def parse_coder_payload(text: str) -> CoderPayload:
+    """
+    Parse coder output, degrading gracefully:
+    1) strict extraction; 2) extraction after `repair_json_text`;
+    3) salvage of the complete `files` entries from a truncated object.
+    An object without a `files` list (e.g. a lone file entry of a truncated payload) doesn't count.
+    """
+    fixed = ""
+    for repaired in (False, True):
+        if repaired:
+            fixed = repair_json_text(text)
+        try:
+            obj = extract_first_json_object(fixed if repaired else text)
+        except ValueError:  # json.JSONDecodeError is a ValueError
+            continue
+        if isinstance(obj.get("files"), list):
+            return CoderPayload(obj, repaired=repaired, truncated=False)
+
+    files, partial_path = salvage_files(fixed)
+    if not files:
+        raise ValueError("JSON 无法解析（缺少 files 列表），且未能从截断输出中恢复任何完整文件")
+    return CoderPayload({"files": files, "notes": ""}, repaired=True, truncated=True, partial_path=partial_path)
+
+
+def repair_json_text(text: str) -> str:
     """
-    Return the smallest substring starting at start_idx that forms a balanced JSON object.
-    Handles strings/escapes so braces inside strings don't count.
+    Fix common model JSON defects in one pass, starting at the first '{':
+    - raw newlines/tabs/control characters inside strings
+    - invalid escapes inside strings (e.g. a regex `\\d` emitted without doubling the backslash)
+    - trailing commas before '}' / ']'
+    Truncation is left alone (see `salvage_files`).
     """
-    if start_idx < 0 or start_idx >= len(s) or s[start_idx] != "{":
-        return None
-    depth = 0
+    start = text.find("{")
+    if start < 0:
+        return text
+    out: list[str] = []
     in_str = False
     esc = False
-    for j in range(start_idx, len(s)):
-        ch = s[j]
+    for ch in text[start:]:
         if in_str:
             if esc:
                 esc = False
+                out.append("\\" + ch if ch in _VALID_ESCAPES else "\\\\" + ch)
             elif ch == "\\":
                 esc = True
             elif ch == '"':
                 in_str = False
+                out.append(ch)
+            elif ch in _CTRL_ESCAPES:
+                out.append(_CTRL_ESCAPES[ch])
+            elif ch < " ":
+                out.append(f"\\u{ord(ch):04x}")
+            else:
+                out.append(ch)
             continue
-        else:
-            if ch == '"':
-                in_str = True
-                continue
-            if ch == "{":
-                depth += 1
-            elif ch == "}":
-                depth -= 1
-                if depth == 0:
-                    return s[start_idx : j + 1]
-            # ignore other chars
-    return None
+        if ch == '"':
+            in_str = True
+        elif ch in "}]":
+            i = len(out) - 1
+            while i >= 0 and out[i].isspace():
+                i -= 1
+            if i >= 0 and out[i] == ",":
+                del out[i]
+        out.append(ch)
+    return "".join(out)
 
 
+def salvage_files(text: str) -> tuple[list[dict], str | None]:
+    """
+    Recover the complete `{"path", "content"}` entries of a (possibly truncated) `files` array.
+    Returns (files, partial_path) where partial_path names the entry that was cut off, if any.
+    """
+    m = _FILES_KEY_RE.search(text)
+    if not m:
+        return [], None
+    files: list[dict] = []
+    pos = m.end()
+    n = len(text)
+    while pos < n:
+        while pos < n and (text[pos].isspace() or text[pos] == ","):
+            pos += 1
+        if pos >= n or text[pos] == "]":
+            return files, None
+        try:
+            obj, pos = _DECODER.raw_decode(text, pos)
+        except (json.JSONDecodeError, RecursionError):
+            pm = _PATH_RE.search(text, pos, min(n, pos + 400))
+            return files, (json.loads(f'"{pm.group(1)}"') if pm else None)
+        if isinstance(obj, dict) and isinstance(obj.get("path"), str) and isinstance(obj.get("content"), str):
+            files.append(obj)
+    return files, None
@@ -0,0 +1,372 @@
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import shutil
+import sqlite3
+import sys
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+# Cross-run index over a log directory: run snapshots (`run_*.jsonl`) are ingested incrementally
+# (a byte cursor per file, complete lines only) into runs / steps / qa_results tables, so listing
+# runs and aggregating over them never re-reads raw logs. A log whose size matches its cursor costs
+# one stat(); records after the terminal one (the async review) are still indexed as steps but do
+# not change the run's outcome. Raw logs of old runs can be gzipped or deleted while their rows stay.
+
+INDEX_NAME = "index.sqlite3"
+TERMINAL_EVENTS = ("final", "cancelled", "exception")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cursors (
+    path TEXT PRIMARY KEY,
+    offset INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    log_path TEXT,
+    goal TEXT NOT NULL DEFAULT '',
+    workdir TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL DEFAULT 'running',
+    started_at TEXT NOT NULL,
+    ended_at TEXT,
+    last_ts TEXT NOT NULL,
+    trace_total INTEGER NOT NULL DEFAULT 0,
+    steps INTEGER NOT NULL DEFAULT 0,
+    iterations INTEGER NOT NULL DEFAULT 0,
+    qa_passed INTEGER,
+    stop_reason TEXT NOT NULL DEFAULT '',
+    files INTEGER NOT NULL DEFAULT 0,
+    duration_s REAL NOT NULL DEFAULT 0,
+    raw TEXT NOT NULL DEFAULT 'jsonl'
+);
+CREATE INDEX IF NOT EXISTS runs_started ON runs (started_at);
+CREATE TABLE IF NOT EXISTS steps (
+    run_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    ts TEXT NOT NULL,
+    event TEXT NOT NULL,
+    node TEXT NOT NULL DEFAULT '',
+    message TEXT NOT NULL DEFAULT '',
+    iteration INTEGER NOT NULL DEFAULT 0,
+    duration_s REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (run_id, idx)
+);
+CREATE INDEX IF NOT EXISTS steps_node_ts ON steps (node, ts);
+CREATE TABLE IF NOT EXISTS qa_results (
+    run_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    ts TEXT NOT NULL,
+    iteration INTEGER NOT NULL DEFAULT 0,
+    passed INTEGER NOT NULL,
+    category TEXT,
+    file TEXT,
+    line INTEGER,
+    message TEXT
+);
+CREATE INDEX IF NOT EXISTS qa_run ON qa_results (run_id, idx);
+CREATE INDEX IF NOT EXISTS qa_category_ts ON qa_results (category, ts);
+"""
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def _seconds_between(a: str, b: str) -> float:
+    try:
+        return max(0.0, (datetime.fromisoformat(b) - datetime.fromisoformat(a)).total_seconds())
+    except ValueError:
+        return 0.0
+
+
+def _days_ago(days: float) -> str:
+    return (datetime.utcnow() - timedelta(days=days)).isoformat()
+
+
+class LogIndex:
+    """SQLite (WAL) index over one log directory; safe to share between threads."""
+
+    def __init__(self, log_dir: Path, db_path: Path | None = None) -> None:
+        self.log_dir = Path(log_dir)
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path or self.log_dir / INDEX_NAME
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # --- ingestion -------------------------------------------------------------------------------
+
+    def ingest(self) -> int:
+        """Index new records of every run log; returns the number of records read."""
+        read = 0
+        for path in self.log_dir.glob("run_*.jsonl"):
+            if not path.name.endswith(".trace.jsonl"):
+                read += self._ingest_file(path)
+        return read
+
+    def _offset(self, path: Path) -> int:
+        row = self._conn.execute("SELECT offset FROM cursors WHERE path = ?", (str(path),)).fetchone()
+        return row["offset"] if row else 0
+
+    def _ingest_file(self, path: Path) -> int:
+        with self._lock:
+            try:
+                size = path.stat().st_size
+            except FileNotFoundError:
+                return 0
+            if size == self._offset(path):
+                return 0
+            # The write lock is taken before the cursor is read again, so concurrent ingests (threads
+            # sharing this instance, or other processes) never parse the same bytes twice.
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                offset = self._offset(path)
+                if size < offset:  # rewritten: index it again from the start
+                    self._forget(str(path))
+                    offset = 0
+                with path.open("rb") as f:
+                    f.seek(offset)
+                    chunk = f.read(max(size - offset, 0))
+                end = chunk.rfind(b"\n") + 1  # a run still writing may leave a partial last line
+                records = []
+                for ln in chunk[:end].splitlines():
+                    try:
+                        records.append(json.loads(ln))
+                    except ValueError:
+                        continue
+                for rec in records:
+                    self._ingest_record(path, rec)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO cursors (path, offset) VALUES (?, ?)", (str(path), offset + end)
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(records)
+
+    def _forget(self, log_path: str) -> None:
+        for (run_id,) in self._conn.execute("SELECT run_id FROM runs WHERE log_path = ?", (log_path,)).fetchall():
+            for table in ("runs", "steps", "qa_results"):
+                self._conn.execute(f"DELETE FROM {table} WHERE run_id = ?", (run_id,))
+        self._conn.execute("DELETE FROM cursors WHERE path = ?", (log_path,))
+
+    def _ingest_record(self, path: Path, rec: dict[str, Any]) -> None:
+        state = rec.get("state") or {}
+        run_id = rec.get("run_id") or state.get("run_id") or path.stem.removeprefix("run_")
+        ts = rec.get("ts") or ""
+        event = rec.get("event") or "step"
+        run = self._conn.execute(
+            "SELECT status, last_ts, trace_total, steps FROM runs WHERE run_id = ?", (run_id,)
+        ).fetchone()
+        if run is None:
+            self._conn.execute(
+                "INSERT INTO runs (run_id, log_path, started_at, last_ts) VALUES (?, ?, ?, ?)",
+                (run_id, str(path), ts, ts),
+            )
+            status, last_ts, seen, idx = "running", ts, 0, 0
+        else:
+            status, last_ts, seen, idx = run["status"], run["last_ts"], run["trace_total"], run["steps"]
+
+        # Trace events logged by this step name the node that ran.
+        fresh = [e for e in state.get("trace") or [] if e.get("seq", 0) >= seen]
+        node = fresh[0].get("node", "") if fresh else ""
+        message = fresh[-1].get("message", "") if fresh else ""
+        iteration = int(state.get("iteration") or 0)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO steps (run_id, idx, ts, event, node, message, iteration, duration_s) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (run_id, idx, ts, event, node, message, iteration, _seconds_between(last_ts, ts) if idx else 0.0),
+        )
+        if any(e.get("node") == "qa" for e in fresh):
+            self._ingest_qa(run_id, idx, ts, iteration, state)
+
+        updates: dict[str, Any] = {
+            "last_ts": ts,
+            "trace_total": max(seen, int(state.get("trace_total") or 0)),
+            "steps": idx + 1,
+        }
+        if status != "running":
+            # After the terminal snapshot (e.g. the async review): a step, not a new outcome.
+            cols = ", ".join(f"{k} = ?" for k in updates)
+            self._conn.execute(f"UPDATE runs SET {cols} WHERE run_id = ?", (*updates.values(), run_id))
+            return
+
+        # A cancelled or crashed run did not pass, whatever its last QA said.
+        passed = None if event == "start" else event not in ("cancelled", "exception") and not state.get("error_log")
+        updates.update(
+            iterations=iteration,
+            qa_passed=None if passed is None else int(passed),
+            stop_reason=state.get("stop_reason") or "",
+            files=len(rec.get("code_files") or []),
+        )
+        if state.get("user_goal"):
+            updates["goal"] = state["user_goal"]
+        if rec.get("workdir"):
+            updates["workdir"] = rec["workdir"]
+        if event in TERMINAL_EVENTS:
+            updates.update(status=event, ended_at=ts)
+        cols = ", ".join(f"{k} = ?" for k in updates)
+        self._conn.execute(f"UPDATE runs SET {cols} WHERE run_id = ?", (*updates.values(), run_id))
+        self._conn.execute(
+            "UPDATE runs SET duration_s = (julianday(last_ts) - julianday(started_at)) * 86400 WHERE run_id = ?",
+            (run_id,),
+        )
+
+    def _ingest_qa(self, run_id: str, idx: int, ts: str, iteration: int, state: dict[str, Any]) -> None:
+        error_log = state.get("error_log") or ""
+        rows = [
+            (d.get("category"), d.get("file") or None, d.get("line") or None, d.get("message"))
+            for d in state.get("diagnostics") or []
+        ]
+        if error_log and not rows:
+            # Logs written before structured diagnostics: compileall ends its report with the exception.
+            lines = [ln.strip() for ln in error_log.splitlines() if ln.strip()]
+            rows = [(None, None, None, lines[-1][:500] if lines else "")]
+        for category, file, line, message in rows or [(None, None, None, None)]:
+            self._conn.execute(
+                "INSERT INTO qa_results (run_id, idx, ts, iteration, passed, category, file, line, message) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (run_id, idx, ts, iteration, int(not error_log), category, file, line, message),
+            )
+
+    # --- queries ---------------------------------------------------------------------------------
+
+    def _query(self, sql: str, params: tuple = ()) -> list[dict[str, Any]]:
+        with self._lock:
+            return [dict(r) for r in self._conn.execute(sql, params)]
+
+    def list_runs(self, *, limit: int = 200, offset: int = 0) -> list[dict[str, Any]]:
+        return self._query("SELECT * FROM runs ORDER BY started_at DESC LIMIT ? OFFSET ?", (limit, offset))
+
+    def summary(self, *, since: str | None = None) -> dict[str, Any]:
+        row = self._query(
+            "SELECT COUNT(*) AS runs, SUM(qa_passed) AS passed, AVG(iterations) AS avg_iterations, "
+            "AVG(duration_s) AS avg_duration_s FROM runs WHERE status != 'running' AND started_at >= ?",
+            (since or "",),
+        )[0]
+        return {**row, "passed": row["passed"] or 0}
+
+    def node_latency(self, *, since: str | None = None) -> list[dict[str, Any]]:
+        """Per-node step latency (count, avg, p50, p95, max seconds) over steps since `since` (ISO time)."""
+        rows = self._query(
+            "SELECT node, duration_s FROM steps WHERE node != '' AND idx > 0 AND ts >= ? ORDER BY node, duration_s",
+            (since or "",),
+        )
+        by_node: dict[str, list[float]] = {}
+        for r in rows:
+            by_node.setdefault(r["node"], []).append(r["duration_s"])
+        return [
+            {
+                "node": node,
+                "count": len(v),
+                "avg_s": sum(v) / len(v),
+                "p50_s": _percentile(v, 0.5),
+                "p95_s": _percentile(v, 0.95),
+                "max_s": v[-1],
+            }
+            for node, v in by_node.items()
+        ]
+
+    def runs_by_iterations(self, min_iterations: int, *, since: str | None = None) -> list[dict[str, Any]]:
+        return self._query(
+            "SELECT run_id, goal, iterations, qa_passed, stop_reason, started_at FROM runs "
+            "WHERE iterations >= ? AND started_at >= ? ORDER BY iterations DESC, started_at DESC",
+            (min_iterations, since or ""),
+        )
+
+    def qa_categories(self, *, since: str | None = None) -> list[dict[str, Any]]:
+        return self._query(
+            "SELECT COALESCE(category, 'unknown') AS category, COUNT(*) AS count, COUNT(DISTINCT run_id) AS runs "
+            "FROM qa_results WHERE passed = 0 AND ts >= ? GROUP BY 1 ORDER BY count DESC",
+            (since or "",),
+        )
+
+    # --- retention -------------------------------------------------------------------------------
+
+    def _finished_before(self, days: float, raw: tuple[str, ...]) -> list[sqlite3.Row]:
+        marks = ", ".join("?" for _ in raw)
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT run_id, log_path FROM runs WHERE status != 'running' AND ended_at < ? AND raw IN ({marks})",
+                (_days_ago(days), *raw),
+            ).fetchall()
+
+    def compact(self, older_than_days: float) -> int:
+        """Gzip the raw logs (snapshots + trace) of runs finished more than `older_than_days` ago."""
+        count = 0
+        for row in self._finished_before(older_than_days, ("jsonl",)):
+            log_path = Path(row["log_path"])
+            for src in (log_path, _trace_path(log_path)):
+                if src.exists():
+                    with src.open("rb") as f_in, gzip.open(f"{src}.gz", "wb") as f_out:
+                        shutil.copyfileobj(f_in, f_out)
+                    src.unlink()
+            with self._lock:
+                self._conn.execute(
+                    "UPDATE runs SET log_path = ?, raw = 'gzip' WHERE run_id = ?", (f"{log_path}.gz", row["run_id"])
+                )
+            count += 1
+        return count
+
+    def delete_raw(self, older_than_days: float) -> int:
+        """Delete the raw logs of runs finished more than `older_than_days` ago; their index rows stay."""
+        count = 0
+        for row in self._finished_before(older_than_days, ("jsonl", "gzip")):
+            log_path = Path(row["log_path"])
+            for p in (log_path, _trace_path(log_path)):
+                p.unlink(missing_ok=True)
+            with self._lock:
+                self._conn.execute("UPDATE runs SET log_path = NULL, raw = 'deleted' WHERE run_id = ?", (row["run_id"],))
+            count += 1
+        return count
+
+
+def _trace_path(log_path: Path) -> Path:
+    # run_<id>.jsonl -> run_<id>.trace.jsonl (also for the .jsonl.gz form)
+    return log_path.with_name(log_path.name.replace(".jsonl", ".trace.jsonl", 1))
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(prog="ev-agent-log-index", description="增量索引运行日志，并查看跨运行的统计")
+    p.add_argument("--log-dir", type=Path, default=None, help="日志目录（默认取 EV_LOG_DIR）")
+    p.add_argument("--since-days", type=float, default=7.0, help="统计的时间窗口（天）")
+    p.add_argument("--min-iterations", type=int, default=3, help="列出迭代次数不少于该值的运行")
+    p.add_argument("--compact-days", type=float, default=None, help="把早于该天数的原始日志压缩为 .gz")
+    p.add_argument("--delete-days", type=float, default=None, help="删除早于该天数的原始日志（索引保留）")
+    args = p.parse_args()
+
+    if args.log_dir is None:
+        from ev_agent.config import load_settings
+
+        args.log_dir = load_settings().log_dir
+    index = LogIndex(args.log_dir)
+    out: dict[str, Any] = {"ingested": index.ingest()}
+    if args.compact_days is not None:
+        out["compacted"] = index.compact(args.compact_days)
+    if args.delete_days is not None:
+        out["deleted"] = index.delete_raw(args.delete_days)
+    since = _days_ago(args.since_days)
+    out["summary"] = index.summary(since=since)
+    out["node_latency"] = index.node_latency(since=since)
+    out["qa_categories"] = index.qa_categories(since=since)
+    out["runs_by_iterations"] = index.runs_by_iterations(args.min_iterations, since=since)
+    json.dump(out, sys.stdout, ensure_ascii=False, indent=2)
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
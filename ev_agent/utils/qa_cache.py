@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import platform
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from .exec import CmdResult
+
+# Bump when the QA checks (or how their report is built) change; old entries then stop matching.
+# The interpreter version is part of it because compileall's verdict depends on the grammar.
+QA_CONFIG_VERSION = f"compileall:1:py{platform.python_version()}"
+
+_WORKDIR_MARK = "{workdir}"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS qa_results (
+    key TEXT PRIMARY KEY,
+    returncode INTEGER NOT NULL,
+    report TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+def project_key(workdir: Path, *, version: str = QA_CONFIG_VERSION) -> str:
+    """sha256 over the sorted (relative path, content sha256) of every project file, plus `version`."""
+    h = hashlib.sha256(version.encode("utf-8"))
+    for p in sorted(workdir.rglob("*")):
+        if not p.is_file() or "__pycache__" in p.parts:
+            continue
+        digest = hashlib.sha256(p.read_bytes()).hexdigest()
+        h.update(f"\0{p.relative_to(workdir).as_posix()}\0{digest}".encode("utf-8"))
+    return h.hexdigest()
+
+
+class QACache:
+    """
+    Persistent QA verdicts on SQLite (WAL), keyed by `project_key`; safe to share between threads.
+    Reports are stored with the workdir path masked, so a hit from another run reads naturally.
+    """
+
+    def __init__(self, db_path: Path) -> None:
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def get(self, key: str, workdir: Path) -> CmdResult | None:
+        with self._lock:
+            row = self._conn.execute("SELECT returncode, report FROM qa_results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE qa_results SET hits = hits + 1 WHERE key = ?", (key,))
+        report = json.loads(row[1].replace(_WORKDIR_MARK, _json_str(str(workdir))))
+        return CmdResult(row[0], report["stdout"], report["stderr"])
+
+    def put(self, key: str, workdir: Path, result: CmdResult) -> None:
+        report = json.dumps({"stdout": result.stdout, "stderr": result.stderr}, ensure_ascii=False)
+        report = report.replace(_json_str(str(workdir)), _WORKDIR_MARK)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO qa_results (key, returncode, report, created_at) VALUES (?, ?, ?, ?)",
+                (key, result.returncode, report, datetime.utcnow().isoformat()),
+            )
+
+    def stats(self) -> str:
+        return f"{self.hits} hits / {self.misses} misses"
+
+
+def _json_str(s: str) -> str:
+    # The path as it appears inside a JSON string (backslashes on Windows are escaped).
+    return json.dumps(s, ensure_ascii=False)[1:-1]
@@ -1,11 +1,13 @@
 from __future__ import annotations
 
+import gzip
 import hashlib
 import json
 from dataclasses import dataclass
 from datetime import datetime
+from itertools import islice
 from pathlib import Path
-from typing import Any
+from typing import IO, Any, Iterator
 
 from ev_agent.schema import TeamState
 
@@ -14,9 +16,10 @@ from ev_agent.schema import TeamState
 class RunLogPaths:
     run_id: str
     jsonl_path: Path
+    trace_path: Path  # full trace history, one event per line in `seq` order
 
 
-FileFingerprints = dict[str, dict[str, Any]]  # rel_path -> {"size": int, "sha256": str}
+FileFingerprints = dict[str, dict[str, Any]]  # rel_path -> {"size": int, "mtime_ns": int, "sha256": str}
 
 
 def make_run_id() -> str:
@@ -25,14 +28,24 @@ def make_run_id() -> str:
 
 def init_run_log(log_dir: Path, run_id: str) -> RunLogPaths:
     log_dir.mkdir(parents=True, exist_ok=True)
-    return RunLogPaths(run_id=run_id, jsonl_path=log_dir / f"run_{run_id}.jsonl")
+    return RunLogPaths(
+        run_id=run_id,
+        jsonl_path=log_dir / f"run_{run_id}.jsonl",
+        trace_path=log_dir / f"run_{run_id}.trace.jsonl",
+    )
 
 
-def fingerprint_workdir(workdir: Path, *, max_bytes: int = 8_000_000) -> FileFingerprints:
+def fingerprint_workdir(
+    workdir: Path,
+    *,
+    max_bytes: int = 8_000_000,
+    prev: FileFingerprints | None = None,
+) -> FileFingerprints:
     """
     Compute a lightweight fingerprint of files under workdir.
     - No full content stored in logs
     - sha256 computed from file bytes (streaming). If file is huge, hash only first/last chunks.
+    - Files whose size and mtime match `prev` reuse its hash (unchanged writes keep mtimes).
     """
     out: FileFingerprints = {}
     if not workdir.exists():
@@ -45,9 +58,13 @@ def fingerprint_workdir(workdir: Path, *, max_bytes: int = 8_000_000) -> FileFin
         if "__pycache__" in rel:
             continue
         try:
-            size = p.stat().st_size
-            sha = _sha256_file(p, max_bytes=max_bytes)
-            out[rel] = {"size": size, "sha256": sha}
+            st = p.stat()
+            old = (prev or {}).get(rel)
+            if old and old.get("size") == st.st_size and old.get("mtime_ns") == st.st_mtime_ns:
+                sha = old["sha256"]
+            else:
+                sha = _sha256_file(p, max_bytes=max_bytes)
+            out[rel] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha}
         except Exception:
             continue
     return out
@@ -90,20 +107,22 @@ def append_snapshot(
     prev_fingerprints: FileFingerprints | None = None,
     extra: dict[str, Any] | None = None,
 ) -> FileFingerprints:
+    dumped = state.model_dump(exclude={"code_files", "coder_prefetch", "fix_memory_state", "trace"})
+    dumped["trace"] = [e.as_dict() for e in state.trace]
     payload: dict[str, Any] = {
         "ts": datetime.utcnow().isoformat(),
         "run_id": paths.run_id,
-        "state": state.model_dump(exclude={"code_files"}),
-        "code_files": list(state.code_files.keys()),
+        "state": dumped,
+        "code_files": state.code_paths(),
     }
     cur_fp: FileFingerprints | None = None
     if workdir is not None:
-        cur_fp = fingerprint_workdir(workdir)
+        cur_fp = fingerprint_workdir(workdir, prev=prev_fingerprints)
         payload["workdir_fingerprints"] = cur_fp
         if prev_fingerprints is not None:
             payload["workdir_changes"] = diff_fingerprints(prev_fingerprints, cur_fp)
     if state.trace:
-        payload["last_trace"] = state.trace[-1]
+        payload["last_trace"] = state.trace[-1].as_dict()
     if extra:
         payload.update(extra)
     with paths.jsonl_path.open("a", encoding="utf-8", newline="\n") as f:
@@ -111,3 +130,54 @@ def append_snapshot(
     return cur_fp or {}
 
 
+def open_log(path: Path) -> IO[str]:
+    """Open a run log or trace spill for reading as text, plain or gzipped (compacted) alike."""
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    return path.open("r", encoding="utf-8", errors="replace")
+
+
+def _records(lines) -> Iterator[dict[str, Any]]:
+    for ln in lines:
+        try:
+            yield json.loads(ln)
+        except ValueError:
+            continue  # blank, or the partial last line of a run still writing
+
+
+def spill_trace(paths: RunLogPaths, state: TeamState, next_seq: int) -> int:
+    """
+    Append events with seq >= next_seq to the trace file; returns the next seq to spill.
+    Call at least once per step: state only retains the run's newest trace events.
+    """
+    fresh = [e for e in state.trace if e.seq >= next_seq]
+    if not fresh:
+        return next_seq
+    with paths.trace_path.open("a", encoding="utf-8", newline="\n") as f:
+        for e in fresh:
+            f.write(json.dumps(e.as_dict(), ensure_ascii=False) + "\n")
+    return fresh[-1].seq + 1
+
+
+def read_trace(
+    trace_path: Path,
+    *,
+    offset: int = 0,
+    limit: int = 100,
+    node: str | None = None,
+) -> list[dict[str, Any]]:
+    """Page through a run's full trace history (optionally only one node's events)."""
+    if not trace_path.exists():
+        return []
+    with open_log(trace_path) as f:
+        events = _records(f)
+        if node is not None:
+            events = (e for e in events if e.get("node") == node)
+        return list(islice(events, offset, offset + limit))
+
+
+def count_trace(trace_path: Path) -> int:
+    if not trace_path.exists():
+        return 0
+    with open_log(trace_path) as f:
+        return sum(1 for ln in f if ln.strip())
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import os
+
+from ev_agent.utils.artifact_store import ArtifactStore
+
+
+def test_materialized_files_are_writable_and_independent(tmp_path):
+    store = ArtifactStore(tmp_path / "store")
+    manifest = store.put_files({"main.py": "print(1)\n", "pkg/util.py": "X = 1\n"})
+    workdir = tmp_path / "game"
+
+    changes = store.materialize(manifest, workdir)
+    assert set(changes.added) == {"main.py", "pkg/util.py"}
+
+    main = workdir / "main.py"
+    assert os.access(main, os.W_OK)
+    with main.open("a", encoding="utf-8") as f:  # an in-place edit, as an editor or tool would do
+        f.write("print(2)\n")
+    assert store.get(manifest["main.py"]) == "print(1)\n"
+    assert store.raw_path(manifest["main.py"]).read_text(encoding="utf-8") == "print(1)\n"
+
+
+def test_manifest_round_trip(tmp_path):
+    store = ArtifactStore(tmp_path / "store")
+    first = store.put_files({"main.py": "a\n"})
+    second = store.put_files({"main.py": "b\n", "util.py": "c\n"})
+    store.save_manifest("run1", 2, second)
+    store.save_manifest("run1", 1, first)
+
+    assert store.list_manifests("run1") == [1, 2]
+    assert store.list_manifests("missing") == []
+    assert store.read_files(store.load_manifest("run1", 2)) == {"main.py": "b\n", "util.py": "c\n"}
+
+
+def test_prune_raw_keeps_recently_used_copies(tmp_path):
+    store = ArtifactStore(tmp_path / "store")
+    sha = store.put("x = 1\n")
+    raw = store.raw_path(sha)
+    assert store.prune_raw() == 0
+    os.utime(raw, (0, 0))
+    assert store.prune_raw() == 1 and not raw.exists()
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import json
+
+from ev_agent.agents.nodes import coder_node
+from ev_agent.schema import TeamState
+
+
+class ScriptedLLM:
+    def __init__(self, replies: list[str]) -> None:
+        self.replies = list(replies)
+        self.calls = 0
+
+    def chat(self, messages, *, temperature: float | None = None) -> str:
+        self.calls += 1
+        return self.replies.pop(0)
+
+
+def test_cut_file_under_subdirectory_completes_in_one_continuation(tmp_path):
+    first = json.dumps({"files": [{"path": "main.py", "content": "print('hi')\n"}]})
+    first = first[: -len("]}")] + ', {"path": "game/sprites/snake.py", "content": "class Sn'
+    rest = json.dumps({"files": [{"path": "game/sprites/snake.py", "content": "class Snake:\n    pass\n"}], "notes": ""})
+    llm = ScriptedLLM([first, rest])
+
+    state = coder_node(TeamState(user_goal="snake"), llm, workdir=tmp_path)
+
+    assert llm.calls == 2
+    assert (tmp_path / "sprites" / "snake.py").read_text(encoding="utf-8") == "class Snake:\n    pass\n"
+    assert not any("never completed" in e.message for e in state.trace)
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from ev_agent.utils.fast_fix import repair_source, strip_fences
+
+
+def _err(source: str) -> SyntaxError:
+    try:
+        compile(source, "m.py", "exec")
+    except SyntaxError as e:
+        return e
+    raise AssertionError("source compiles")
+
+
+def test_fences_around_code_are_stripped():
+    res = repair_source("```python\nprint(1)\n```\n", "main.py")
+    assert res.ok and res.rules == ("strip_fences",)
+    assert res.source == "print(1)\n"
+
+
+def test_fences_inside_a_string_are_kept():
+    source = 'HELP = """\n```python\nrun()\n```\n"""\n```\nprint(HELP)\n'
+    fixed = strip_fences(source, _err(source))
+    assert fixed == 'HELP = """\n```python\nrun()\n```\n"""\nprint(HELP)\n'
+    assert compile(fixed, "m.py", "exec")
+
+
+def test_rewrite_that_only_renumbers_the_error_is_discarded():
+    # Stripping the fence moves the syntax error up one line but does not fix it.
+    source = "```python\nx = 1\ndef f(:\n    pass\n```\n"
+    res = repair_source(source, "main.py")
+    assert not res.ok
+    assert res.rules == ()
+    assert res.source == source
+
+
+def test_rewrite_that_moves_the_error_to_other_code_is_kept():
+    source = "if x:\nprint(1)\ny = (\n"
+    res = repair_source(source, "main.py")
+    assert res.rules[0] == "fix_indentation"
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from ev_agent.utils import files
+from ev_agent.utils.files import recover_workdir, write_code_files
+
+
+def test_failed_swap_rolls_back(tmp_path, monkeypatch):
+    workdir = tmp_path / "game"
+    write_code_files(workdir, {"main.py": "v1\n"}, atomic=True)
+    real_rename = Path.rename
+
+    def rename(self, target):
+        if self.name.endswith(".staging"):
+            raise OSError("disk gone")
+        return real_rename(self, target)
+
+    monkeypatch.setattr(Path, "rename", rename)
+    with pytest.raises(OSError):
+        write_code_files(workdir, {"main.py": "v2\n"}, previous=["main.py"], atomic=True)
+    assert (workdir / "main.py").read_text() == "v1\n"
+
+
+def test_crash_between_renames_is_recovered(tmp_path):
+    workdir = tmp_path / "game"
+    write_code_files(workdir, {"main.py": "v1\n", "util.py": "u\n"}, atomic=True)
+    _staging, backup = files._staging_dirs(workdir.resolve())
+    workdir.rename(backup)  # what a crash right after the first rename leaves behind
+
+    assert recover_workdir(workdir)
+    assert (workdir / "util.py").read_text() == "u\n"
+    assert not backup.exists()
+    assert not recover_workdir(workdir)
+
+
+def test_write_recovers_before_syncing(tmp_path):
+    workdir = tmp_path / "game"
+    write_code_files(workdir, {"main.py": "v1\n", "util.py": "u\n"}, atomic=True)
+    workdir.rename(files._staging_dirs(workdir.resolve())[1])
+
+    changes = write_code_files(workdir, {"main.py": "v2\n", "util.py": "u\n"}, previous=["main.py", "util.py"])
+    assert changes.modified == ("main.py",) and changes.unchanged == ("util.py",)
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import pytest
+
+from ev_agent.utils import json_extract
+from ev_agent.utils.json_extract import extract_first_json_object, parse_coder_payload
+
+
+def test_deeply_nested_input_raises_value_error():
+    text = '{"a":' * 100_000
+    with pytest.raises(ValueError):
+        extract_first_json_object(text)
+    with pytest.raises(ValueError):
+        parse_coder_payload(text)
+
+
+def test_last_resort_decode_is_bounded(monkeypatch):
+    calls = 0
+    raw_decode = json_extract._DECODER.raw_decode
+
+    class CountingDecoder:
+        def raw_decode(self, s, idx=0):
+            nonlocal calls
+            calls += 1
+            return raw_decode(s, idx)
+
+    monkeypatch.setattr(json_extract, "_DECODER", CountingDecoder())
+    text = "x " + '{"a":[' * 400 + "1," * 20_000
+    with pytest.raises(ValueError):
+        extract_first_json_object(text)
+    assert calls <= json_extract.MAX_DECODE_STARTS + 1  # + the fast path
+
+
+def test_object_after_prose_with_stray_braces_is_found():
+    assert extract_first_json_object('see {x} and "{" then {"files": []}') == {"files": []}
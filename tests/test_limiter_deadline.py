@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import time
+
+import httpx
+import pytest
+
+from ev_agent.llm.base import ChatMessage
+from ev_agent.llm.limiter import BackendLimiter, RateLimitedLLM
+from ev_agent.utils.deadline import DeadlineExceeded, remaining, run_deadline
+
+
+class SlowBackend:
+    """Times out the way an httpx client does when its request timeout is capped by the deadline."""
+
+    def _wait_out(self) -> None:
+        time.sleep(max(remaining() or 0.0, 0.0) + 0.01)
+        raise httpx.ReadTimeout("timed out")
+
+    def chat(self, messages, *, temperature: float | None = None) -> str:
+        self._wait_out()
+        return ""
+
+    def stream(self, messages, *, temperature: float | None = None):
+        self._wait_out()
+        yield ""
+
+
+MESSAGES = [ChatMessage("user", "hi")]
+
+
+def test_chat_timeout_at_deadline_raises_deadline_exceeded():
+    llm = RateLimitedLLM(SlowBackend(), BackendLimiter("slow"), max_attempts=1)
+    with run_deadline(0.2), pytest.raises(DeadlineExceeded):
+        llm.chat(MESSAGES)
+
+
+def test_stream_timeout_at_deadline_raises_deadline_exceeded():
+    llm = RateLimitedLLM(SlowBackend(), BackendLimiter("slow"), max_attempts=1)
+    with run_deadline(0.2), pytest.raises(DeadlineExceeded):
+        list(llm.stream(MESSAGES))
+
+
+def test_backend_timeout_without_deadline_is_reraised():
+    llm = RateLimitedLLM(SlowBackend(), BackendLimiter("slow"), max_attempts=1)
+    with pytest.raises(httpx.ReadTimeout):
+        llm.chat(MESSAGES)
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import json
+import threading
+import urllib.error
+import urllib.request
+from types import SimpleNamespace
+
+import pytest
+
+from ev_agent.service.job_queue import JobQueue
+from ev_agent.service.server import ServiceServer
+
+
+@pytest.fixture
+def base_url(tmp_path):
+    pool = SimpleNamespace(workers=0, notify=lambda: None)
+    server = ServiceServer(("127.0.0.1", 0), JobQueue(tmp_path / "jobs.sqlite3"), pool)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def _post(url: str, body: bytes) -> tuple[int, dict]:
+    req = urllib.request.Request(url, data=body, method="POST")
+    try:
+        with urllib.request.urlopen(req, timeout=5) as r:
+            return r.status, json.loads(r.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+@pytest.mark.parametrize("body", [b"[]", b'"x"', b"{not json", b"\xff\xfe", b'{"goal": "g", "priority": [1]}'])
+def test_malformed_job_body_is_a_bad_request(base_url, body):
+    status, out = _post(f"{base_url}/jobs", body)
+    assert status == 400
+    assert out["error"]
+
+
+def test_valid_job_is_created(base_url):
+    status, out = _post(f"{base_url}/jobs", json.dumps({"goal": "snake"}).encode("utf-8"))
+    assert status == 201
+    assert out["goal"] == "snake"
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from ev_agent.agents import speculative
+from ev_agent.config import ModelRoute
+from ev_agent.llm.base import ChatMessage
+from ev_agent.llm.router import RoutedLLM
+
+
+class RecordingBackend:
+    def __init__(self) -> None:
+        self.temperatures: list[float] = []
+
+    def chat(self, messages, *, temperature: float = 0.2) -> str:
+        self.temperatures.append(temperature)
+        return "ok"
+
+    def stream(self, messages, *, temperature: float = 0.2):
+        self.temperatures.append(temperature)
+        yield "ok"
+
+
+def test_stage_keeps_the_route_temperature():
+    backend = RecordingBackend()
+    llm = RoutedLLM(backend, ModelRoute(node="pm", backend="test", temperature=0.7))
+
+    stage = speculative._start(llm, [ChatMessage("user", "hi")])
+
+    assert speculative._finish(stage) == "ok"
+    assert backend.temperatures == [0.7]
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import json
+
+from langgraph.graph import END, StateGraph
+
+from ev_agent.chains.team_graph import CONFIG_KEY, ESCALATED_TEMPERATURE, RunContext, _coder, _node
+from ev_agent.llm.mock import MockLLM
+from ev_agent.llm.router import ModelRouter
+from ev_agent.schema import Diagnostic, TeamGraphState, TeamState, TraceEvent
+
+
+def _log_twice(s: TeamState, _ctx) -> TeamState:
+    for _ in range(2):
+        s.trace.append(TraceEvent(s.trace_total, "", "n", "step", 0))
+        s.trace_total += 1
+    return s
+
+
+def _graph():
+    g = StateGraph(TeamGraphState)
+    for i in range(3):
+        g.add_node(f"n{i}", _node(_log_twice))
+    g.set_entry_point("n0")
+    g.add_edge("n0", "n1")
+    g.add_edge("n1", "n2")
+    g.add_edge("n2", END)
+    return g.compile()
+
+
+def _ctx(tmp_path, trace_limit: int) -> RunContext:
+    mock = MockLLM()
+    return RunContext(router=ModelRouter.fixed(mock, mock), workdir=tmp_path, max_iters=1, trace_limit=trace_limit)
+
+
+def test_trace_limit_is_per_run(tmp_path):
+    graph = _graph()  # one compiled graph shared by both runs, like get_team_graph()
+    small = graph.invoke(TeamState().model_dump(), {"configurable": {CONFIG_KEY: _ctx(tmp_path, 4)}})
+    unbounded = graph.invoke(TeamState().model_dump(), {"configurable": {CONFIG_KEY: _ctx(tmp_path, 0)}})
+
+    assert [e.seq for e in small["trace"]] == [2, 3, 4, 5]
+    assert small["trace_total"] == 6
+    assert [e.seq for e in unbounded["trace"]] == list(range(6))
+
+
+class RecordingCoder:
+    def __init__(self) -> None:
+        self.calls: list[tuple[str, float | None]] = []
+
+    def chat(self, messages, *, temperature: float | None = None) -> str:
+        self.calls.append((messages[-1].content, temperature))
+        return json.dumps({"files": [{"path": "main.py", "content": "print('fixed')\n"}], "notes": ""})
+
+
+def test_escalated_per_file_coder_gets_temperature_and_history(tmp_path):
+    coder = RecordingCoder()
+    ctx = RunContext(
+        router=ModelRouter.fixed(coder, coder), workdir=tmp_path, max_iters=3, coder_mode="per_file"
+    )
+    (tmp_path / "main.py").write_text("def f(:\n", encoding="utf-8")
+    state = TeamState(
+        architecture="- main.py",
+        code_files={"main.py": "def f(:\n"},
+        error_log="SyntaxError: invalid syntax",
+        diagnostics=[Diagnostic(category="syntax", check="compileall", message="SyntaxError", file="main.py", line=1)],
+        attempts=[{"iteration": 1, "error": "k", "code": "c", "summary": "SyntaxError @ def f(:"}],
+        escalation=1,
+    )
+
+    out = _coder(state, ctx)
+
+    assert out.error_log == ""
+    assert [t for _p, t in coder.calls] == [ESCALATED_TEMPERATURE]
+    assert "SyntaxError @ def f(:" in coder.calls[0][0]
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from ev_agent.config import ModelRoute
+from ev_agent.llm.base import ChatMessage
+from ev_agent.llm.router import RoutedLLM
+from ev_agent.llm.usage import MeteredLLM, RunUsage
+
+
+class RecordingBackend:
+    def __init__(self) -> None:
+        self.temperatures: list[float] = []
+
+    def chat(self, messages, *, temperature: float = 0.2) -> str:
+        self.temperatures.append(temperature)
+        return "ok"
+
+    def stream(self, messages, *, temperature: float = 0.2):
+        self.temperatures.append(temperature)
+        yield "o"
+        yield "k"
+
+
+def test_metered_stream_keeps_the_route_temperature():
+    backend = RecordingBackend()
+    usage = RunUsage()
+    llm = MeteredLLM(RoutedLLM(backend, ModelRoute(node="coder", backend="test", temperature=0.9)), usage)
+
+    assert "".join(llm.stream([ChatMessage("user", "hi")])) == "ok"
+    assert backend.temperatures == [0.9]
+    assert usage.calls == 1
+
+
+def test_metered_stream_forwards_an_explicit_temperature():
+    backend = RecordingBackend()
+    llm = MeteredLLM(RoutedLLM(backend, ModelRoute(node="coder", backend="test", temperature=0.9)), RunUsage())
+
+    list(llm.stream([ChatMessage("user", "hi")], temperature=0.4))
+    assert backend.temperatures == [0.4]